@@ -1,12 +1,15 @@
 
+import time
+IMPORT_START = time.perf_counter()
+
 import pygame
 import os
 import sys
 import random
-import csv
-import time
-import textwrap
-from collections import namedtuple
+import atexit
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 
 # Configuration & Paths
 
@@ -28,50 +31,73 @@ FPS = 60
 CARD_W, CARD_H = 160, 230
 
 
-# Game values
+# Game values, rules and round flow live in the headless engine
 
-STARTING_BALANCE = 300
-BASE_BETS = {1: 100, 2: 200, 3: 500}  # tutorial rounds start higher
+from engine import LEVELS, SKILLS, GameState, LEVEL_UP, GAME_OVER
+import engine
+import strategy_tables
+from results_log import ensure_csv, log_round, close_log
+from round_history import RoundHistory
+from text_cache import text_cache, render_text
+from tweens import Animator, Tween
+from card_atlas import CardSheet
+from audio import NullAudio, create_audio
+from frame_profiler import FrameProfiler
+from game_client import Connection, RemoteRules, ServerError
+from replay import (SessionRecorder, load_session, is_skill_code, skill_from_code,
+                    DEAL, HIT, STAND, DOUBLE, BET_UP, BET_DOWN, RESTART, RESET)
 
 
-LEVELS = {
-    1: {"decks": 1, "dealer_hits_soft_17": False, "blackjack_payout": 1.5, "threshold": 500},
-    2: {"decks": 2, "dealer_hits_soft_17": True, "blackjack_payout": 1.33, "threshold": 1200},
-    3: {"decks": 4, "dealer_hits_soft_17": True, "blackjack_payout": 1.2, "threshold": 2500}
-}
+# Startup
+# Nothing is loaded at import. main() first does what the intro screen needs (pygame,
+# the window, fonts and the table background), then loads the rest (music, sounds,
+# card images, strategy tables) on a background thread while the intro is showing.
+# Every phase is timed; LUCKYLOOP_STARTUP_REPORT=1 prints the timings.
 
-ENCOUNTER_CHANCE = 0.18
+STARTUP_REPORT = bool(os.environ.get("LUCKYLOOP_STARTUP_REPORT"))
 
-SKILLS = {
-    "Luck Charm": {"desc": "+5% illustrative win chance for this level", "type":"win_chance", "value":0.05},
-    "Card Peek": {"desc": "Reveal dealer's hole card for the level", "type":"peek", "value":None},
-    "Extra Double": {"desc": "Allow one extra double-down this level", "type":"extra_double", "value":1},
-    "Reward Booster": {"desc": "Multiply win rewards by 1.5 this level", "type":"reward_mult", "value":1.5},
-    "Safety Net": {"desc": "First loss that would drop below 0 is halved", "type":"safety_net", "value":None}
-}
+# LUCKYLOOP_AUDIO=off runs without sound (no mixer at all), e.g. on headless machines
+AUDIO_ENABLED = os.environ.get("LUCKYLOOP_AUDIO", "on") != "off"
 
-ENCOUNTERS = [
-    {"name":"Lucky Deck", "effect":{"decks_delta":-1}, "desc":"Fewer decks this round — easier!"},
-    {"name":"Dealer Mistake", "effect":{"dealer_stands_early":True}, "desc":"Dealer stands early this round"},
-    {"name":"High Stakes", "effect":{"payout_mult":2, "house_edge":0.05}, "desc":"Double payout but house edge increases"},
-    {"name":"Bonus Card", "effect":{"player_extra_card":True}, "desc":"Player draws an extra card automatically"},
-    {"name":"Foggy Table", "effect":{"dealer_hits_soft_12":True}, "desc":"Dealer hits more aggressively this round"},
-]
+class StartupTimer:
+    def __init__(self, t0):
+        self.t0 = t0
+        self.phases = []          # (name, thread, started at, seconds)
+        self.first_frame = None   # seconds from import to the first frame shown
 
-CSV_FILE = "results.csv"
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, threading.current_thread().name, start - self.t0, time.perf_counter() - start))
 
+    def frame_shown(self):
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter() - self.t0
 
-# Initialize Pygame
+    def report(self, file=sys.stderr):
+        print("Startup timings (ms since import):", file=file)
+        for name, thread, at, dt in sorted(self.phases, key=lambda p: p[2]):
+            print(f"  {at*1000:8.1f}  {dt*1000:8.1f}  {name} [{thread}]", file=file)
+        if self.first_frame is not None:
+            print(f"  first frame at {self.first_frame*1000:.1f} ms", file=file)
 
-pygame.init()
+startup = StartupTimer(IMPORT_START)
 
-# audio setup
+# set up by init_display()
 AUDIO_AVAILABLE = False
-try:
-    pygame.mixer.init()
-    AUDIO_AVAILABLE = True
-except Exception:
-    pass
+screen = None
+clock = None
+FONT = BIG_FONT = TITLE_FONT = None
+TABLE_IMG = None
+
+audio = NullAudio()
+
+# set up by load_assets()
+card_sheet = None
+CARD_BACK = None
 
 
 # Background music files
@@ -82,94 +108,30 @@ music_files = [
     "Lowtone Music - This Casino _ Funk Jazz Groove.mp3"
 ]
 music_paths = [os.path.join(MUSIC_FOLDER, f) for f in music_files]
-current_music_index = 0
 
 MUSIC_END_EVENT = pygame.USEREVENT + 1
 
-def play_next_song(fade_ms=1000):
-    global current_music_index
-    if not music_paths:
-        return
-    pygame.mixer.music.load(music_paths[current_music_index])
-    pygame.mixer.music.play(fade_ms=fade_ms)
-    current_music_index = (current_music_index + 1) % len(music_paths)
-
-if AUDIO_AVAILABLE and music_paths:
-    pygame.mixer.music.set_volume(0.3)
-    pygame.mixer.music.set_endevent(MUSIC_END_EVENT)
-    play_next_song()
-
 # Card dealing sound effect
 CARD_SLIDE_SOUND_FILE = os.path.join(MUSIC_FOLDER, "Dealing-cards-sound.mp3")
-SND_CARD_SLIDE = None
-if AUDIO_AVAILABLE and os.path.exists(CARD_SLIDE_SOUND_FILE):
-    try:
-        SND_CARD_SLIDE = pygame.mixer.Sound(CARD_SLIDE_SOUND_FILE)
-        SND_CARD_SLIDE.set_volume(0.4)
-    except Exception:
-        SND_CARD_SLIDE = None
 
+# optional sounds: effect name -> (file, volume)
+SOUND_FILES = {
+    "card": (CARD_SLIDE_SOUND_FILE, 0.4),
+    "ding": (os.path.join(SND_FOLDER, "ding.wav"), 1.0),
+    "buzz": (os.path.join(SND_FOLDER, "buzz.wav"), 1.0),
+    "levelup": (os.path.join(SND_FOLDER, "levelup.wav"), 1.0),
+}
 
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("LuckyLoop+ Blackjack")
-clock = pygame.time.Clock()
+def play_sound(name):
+    # sound effects are muted in turbo mode
+    if not turbo.on:
+        audio.play(name)
 
-FONT = pygame.font.SysFont("arial", 20)
-BIG_FONT = pygame.font.SysFont("arial", 36, bold=True)
-TITLE_FONT = pygame.font.SysFont("arial", 64, bold=True)
+# Cards come from the prebuilt atlas (card_atlas.py), rebuilt if the card files
+# changed; set LUCKYLOOP_CARDS=lazy to decode each card the first time it's drawn
+CARD_LOADING = os.environ.get("LUCKYLOOP_CARDS", "atlas")
 
-# loading table background
-TABLE_IMG = None
-if os.path.exists(TABLE_BG_FILENAME):
-    try:
-        TABLE_IMG = pygame.image.load(TABLE_BG_FILENAME).convert()
-        TABLE_IMG = pygame.transform.smoothscale(TABLE_IMG, (SCREEN_WIDTH, SCREEN_HEIGHT))
-    except Exception:
-        TABLE_IMG = None
-
-# load optional sounds
-def load_sound(fname):
-    if not AUDIO_AVAILABLE:
-        return None
-    p = os.path.join(SND_FOLDER, fname)
-    if os.path.exists(p):
-        try:
-            return pygame.mixer.Sound(p)
-        except Exception:
-            return None
-    return None
-
-SND_DING = load_sound("ding.wav")
-SND_LOSE = load_sound("buzz.wav")
-SND_LEVEL = load_sound("levelup.wav")
-
-# Card loader
-RANK_MAP = {
-    1: "ace", 2:"2", 3:"3", 4:"4", 5:"5", 6:"6", 7:"7",
-    8:"8", 9:"9", 10:"10", 11:"jack", 12:"queen", 13:"king"
-}
-SUITS = ["hearts", "spades", "diamonds", "clubs"]
-
-def find_card_file(rank_name, suit):
-    candidates = []
-    if rank_name in ("jack","queen","king"):
-        candidates.append(f"{rank_name}_of_{suit}2.png")
-    candidates.append(f"{rank_name}_of_{suit}.png")
-    for fname in candidates:
-        p = os.path.join(CARD_FOLDER_PATH, fname)
-        if os.path.exists(p):
-            return p
-    return None
-
-def load_card_image(rank_name, suit):
-    path = find_card_file(rank_name, suit)
-    if path:
-        try:
-            img = pygame.image.load(path).convert_alpha()
-            img = pygame.transform.smoothscale(img, (CARD_W, CARD_H))
-            return img
-        except Exception as e:
-            print("Error loading:", path, e)
+def placeholder_card(rank_name, suit):
     surf = pygame.Surface((CARD_W, CARD_H), pygame.SRCALPHA)
     surf.fill((240,240,240))
     pygame.draw.rect(surf, (30,30,30), surf.get_rect(), 2, border_radius=8)
@@ -177,411 +139,477 @@ def load_card_image(rank_name, suit):
     surf.blit(txt, (10,10))
     return surf
 
-# Preload card images
+# card images by "rank_of_suit", filled in as cards are first drawn
 CARD_IMAGES = {}
-for r_idx in range(1,14):
-    for s in SUITS:
-        key = f"{RANK_MAP[r_idx]}_of_{s}"
-        CARD_IMAGES[key] = load_card_image(RANK_MAP[r_idx], s)
 
-# card back
-CARD_BACK = None
-for name in ("card_back.png", "back.png", "cardback.png"):
-    p = os.path.join(CARD_FOLDER_PATH, name)
-    if os.path.exists(p):
-        CARD_BACK = pygame.transform.smoothscale(pygame.image.load(p).convert_alpha(), (CARD_W, CARD_H))
-        break
-if CARD_BACK is None:
-    CARD_BACK = pygame.Surface((CARD_W, CARD_H))
-    CARD_BACK.fill((12, 60, 12))
-    pygame.draw.rect(CARD_BACK, (255,255,255), CARD_BACK.get_rect(), 2, border_radius=8)
-
-
-# Card helpers
-
-Card = namedtuple("Card", ["rank","suit","value"])
-def make_card(ridx, suit):
-    name = RANK_MAP[ridx]
-    if name == "ace": v = 11
-    elif name in ("jack","queen","king"): v = 10
-    else: v = int(name)
-    return Card(name, suit, v)
-
-class Shoe:
-    def __init__(self, decks=1):
-        self.decks = max(1, decks)
-        self.reset()
-    def reset(self):
-        self.cards = []
-        for _ in range(self.decks):
-            for r in range(1,14):
-                for s in SUITS:
-                    self.cards.append(make_card(r,s))
-        random.shuffle(self.cards)
-    def draw(self):
-        if not self.cards:
-            self.reset()
-        return self.cards.pop()
-
-def hand_value(cards):
-    total = 0; aces = 0
-    for c in cards:
-        if c.rank == "ace":
-            aces += 1; total += 11
-        elif c.rank in ("jack","queen","king"):
-            total += 10
+
+def init_display():
+    # what the first frame needs
+    global AUDIO_AVAILABLE, audio, screen, clock, FONT, BIG_FONT, TITLE_FONT, TABLE_IMG
+    with startup.phase("pygame init"):
+        pygame.init()
+
+    # audio setup
+    with startup.phase("audio device"):
+        if AUDIO_ENABLED:
+            try:
+                pygame.mixer.init()
+                AUDIO_AVAILABLE = True
+            except Exception:
+                pass
         else:
-            total += int(c.rank)
-    while total > 21 and aces:
-        total -= 10; aces -= 1
-    return total
-
-
-# CSV logging into R Studio
-def ensure_csv():
-    if not os.path.exists(CSV_FILE):
-        with open(CSV_FILE, "w", newline="") as f:
-            w = csv.writer(f)
-            w.writerow([
-                "Round",
-                "Level",
-                "Skill",
-                "Encounter",
-                "PlayerValue",
-                "DealerValue",
-                "Result",
-                "Reward",
-                "Balance",
-                "PersistentSkills"
-            ])
-def log_round(rnd, level, skill, encounter, pv, dv, result, reward, balance, persistent_skills=None):
-    with open(CSV_FILE, "a", newline="") as f:
-        csv.writer(f).writerow([
-            rnd,
-            level,
-            skill or "",
-            encounter or "",
-            pv,
-            dv,
-            result,
-            reward,
-            balance,
-            ",".join(persistent_skills) if persistent_skills else ""
-        ])
-
-ensure_csv()
+            pygame.mixer.quit()
+        audio = create_audio(AUDIO_AVAILABLE)
+
+    with startup.phase("window"):
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("LuckyLoop+ Blackjack")
+        clock = pygame.time.Clock()
+        renderer.screen = screen
+
+    with startup.phase("fonts"):
+        FONT = pygame.font.SysFont("arial", 20)
+        BIG_FONT = pygame.font.SysFont("arial", 36, bold=True)
+        TITLE_FONT = pygame.font.SysFont("arial", 64, bold=True)
+
+    # loading table background
+    with startup.phase("table background"):
+        TABLE_IMG = None
+        if os.path.exists(TABLE_BG_FILENAME):
+            try:
+                TABLE_IMG = pygame.image.load(TABLE_BG_FILENAME).convert()
+                TABLE_IMG = pygame.transform.smoothscale(TABLE_IMG, (SCREEN_WIDTH, SCREEN_HEIGHT))
+            except Exception:
+                TABLE_IMG = None
+
+def load_assets():
+    # everything else; main() runs this on a background thread during the intro
+    global card_sheet, CARD_BACK
+    with startup.phase("music"):
+        audio.start_music(music_paths, volume=0.3, end_event=MUSIC_END_EVENT)
+
+    with startup.phase("sound effects"):
+        for name, (path, volume) in SOUND_FILES.items():
+            audio.load_effect(name, path, volume)
+
+    with startup.phase("card images"):
+        card_sheet = CardSheet(CARD_FOLDER_PATH, (CARD_W, CARD_H), lazy=CARD_LOADING == "lazy")
+        # card back
+        back = card_sheet.back()
+        if back is None:
+            back = pygame.Surface((CARD_W, CARD_H))
+            back.fill((12, 60, 12))
+            pygame.draw.rect(back, (255,255,255), back.get_rect(), 2, border_radius=8)
+        CARD_BACK = back
+
+    # CSV logging into R Studio (buffered, written by a background thread)
+    with startup.phase("results log"):
+        ensure_csv()
+
+    # autoplay strategy tables (rebuilt only if the rules changed)
+    with startup.phase("strategy tables"):
+        strategy_tables.load_tables()
+
+class AssetLoader(threading.Thread):
+    def __init__(self):
+        super().__init__(name="asset-loader", daemon=True)
+        self.error = None
+
+    def run(self):
+        try:
+            load_assets()
+        except BaseException as e:
+            self.error = e
 
+    def wait(self):
+        # block until everything is loaded, raising anything the loader hit
+        with startup.phase("waiting for assets"):
+            self.join()
+        if self.error is not None:
+            raise self.error
 
-# Game state
+def init_game():
+    # the whole startup in the calling thread (for tools and tests)
+    init_display()
+    load_assets()
 
-class GameState:
-    def __init__(self, persistent_skills=None):
-        # skills persist between games
-        self.active_skills = persistent_skills or []
-        
-        # round-specific values
-        self.balance = STARTING_BALANCE
-        self.level = 1
-        self.round_no = 0
-        self.level_round_no = 0
-        self.max_rounds_per_level = 5
-        self.shoe = Shoe(LEVELS[self.level]["decks"])
-        self.player_skill = None
-        self.skill_used_flags = {}
-        self.encounter = None
-        self.game_over = False
-        self.player_cards = []
-        self.dealer_cards = []
-        self.current_bet = BASE_BETS.get(self.level, 15)
-        self.in_round = False
-        self.reveal_dealer = False
-        self.local_shoe = None
-
-    def start_level(self, level):
-        self.level = level
-        self.level_round_no = 0
-        conf = LEVELS[level]
-        self.shoe = Shoe(conf["decks"])
-        self.player_skill = None
-        self.skill_used_flags = {}
-        self.encounter = None
-        self.game_over = False
-        self.current_bet = BASE_BETS.get(self.level, 15)
-        self.in_round = False
-        self.reveal_dealer = False
+
+# Game state
 
 game = GameState()
 
+# per-round stats for the HUD (kept in memory for the whole session)
+history = RoundHistory()
 
 
-# Encounters
 
-def roll_encounter():
-    if random.random() < ENCOUNTER_CHANCE:
-        return random.choice(ENCOUNTERS)
-    return None
+# Sliding card animation
+# Card slides are tweens on the animator, which the main loop advances once per frame.
+# The engine deals and plays instantly; the table only shows cards once they land, and
+# sounds and screens that follow a round wait in the same queue until then.
+
+animator = Animator()
+
+class TableView:
+    # how far the animations have got: cards laid out (moving or landed) and landed
+    # per hand, whether the hole card is face up, and whether the HUD should wait for
+    # a round's cards to land before it shows the result
+    def __init__(self):
+        self.placed = {"player": 0, "dealer": 0}
+        self.shown = {"player": 0, "dealer": 0}
+        self.reveal = False
+        self.hud_frozen = False
+
+    def new_round(self, reveal=False):
+        self.__init__()
+        self.reveal = reveal
+
+view = TableView()
+
+PLAYER_DECK_POS = (SCREEN_WIDTH + 50, SCREEN_HEIGHT//2)
+DEALER_DECK_POS = (SCREEN_WIDTH + 50, -50)
+
+def slide_card(img, hand, index, speed=25):
+    # queue the card at index in hand ("player" / "dealer") sliding in from the deck;
+    # the move takes as long as the old fixed-step animation did at FPS frames a second
+    if turbo.on:
+        view.placed[hand] = view.shown[hand] = index + 1
+        return
+    start = PLAYER_DECK_POS if hand == "player" else DEALER_DECK_POS
+    positions = player_card_positions if hand == "player" else dealer_card_positions
+    end = positions(index + 1)[index]
+    steps = max(1, int(max(abs(end[0] - start[0]), abs(end[1] - start[1])) / speed))
 
+    def on_start():
+        view.placed[hand] = index + 1
+        # Play card sound once at start of animation
+        play_sound("card")
 
-# Sliding card animation
+    def on_done():
+        view.shown[hand] = index + 1
 
-def slide_card(img, start_pos, end_pos, speed=25):
-    x, y = start_pos
-    ex, ey = end_pos
-    dx = (ex - x)
-    dy = (ey - y)
-    steps = max(1, int(max(abs(dx), abs(dy)) / speed))
-    
-    # Play card sound once at start of animation
-    if AUDIO_AVAILABLE and SND_CARD_SLIDE:
-        SND_CARD_SLIDE.play()
-
-    for i in range(steps):
-        t = (i+1)/steps
-        xi = int(x + dx * t)
-        yi = int(y + dy * t)
-        # draw background & HUD
-        if TABLE_IMG:
-            screen.blit(TABLE_IMG, (0,0))
-        else:
-            screen.fill((18,130,77))
-        draw_hud(game)
-        # draw the moving card on top
-        screen.blit(img, (xi, yi))
-        pygame.display.flip()
-        clock.tick(FPS)
+    animator.add(Tween(start, end, steps / 60, img, on_start, on_done))
 
 
 
 # Round flow
+# The engine changes the state; these wrappers add the animations, sounds, logging and screens.
+# rules is the engine itself, or game_client.RemoteRules when the game is played on a
+# server (LUCKYLOOP_SERVER), which has the same functions.
+
+rules = engine
 
 def deal_new_round(state: GameState):
+    recorder.add(DEAL)
     if state.game_over:
         return
-    if state.balance < state.current_bet:
-            state.game_over = True
-            show_game_over(state)
-            return
-    # increment both global and level-specific round counters
-    state.round_no += 1
-    state.level_round_no += 1
-
-    # get level configuration
-    conf = LEVELS[state.level]
-
-    # roll random encounter
-    enc = roll_encounter()
-    state.encounter = enc
-
-    # determine decks for this round
-    decks = conf["decks"]
-    if enc and enc["effect"].get("decks_delta"):
-        decks = max(1, decks + enc["effect"]["decks_delta"])
-    local_shoe = Shoe(decks)
-    state.local_shoe = local_shoe
-
-    # draw initial cards
-    p1 = local_shoe.draw()
-    p2 = local_shoe.draw()
-    d1 = local_shoe.draw()
-    d2 = local_shoe.draw()
-
-    state.player_cards = []
-    state.dealer_cards = []
-
-    # helper to animate cards once with sound per card
-    def animate_card(card, start_pos, end_pos, is_player=True, back=False):
-        if back:
-            img = CARD_BACK
-        else:
-            img = card_image_for(card)
-        slide_card(img, start_pos, end_pos, speed=35)
-        if is_player:
-            state.player_cards.append(card)
-        else:
-            state.dealer_cards.append(card)
+    if not rules.deal_round(state):
+        show_game_over(state)
+        return
 
-    # initial four cards
-    animate_card(p1, (SCREEN_WIDTH + 50, SCREEN_HEIGHT//2), player_card_positions(1)[0])
-    animate_card(d1, (SCREEN_WIDTH + 50, -50), dealer_card_positions(1)[0], is_player=False, back=True)
-    animate_card(p2, (SCREEN_WIDTH + 50, SCREEN_HEIGHT//2), player_card_positions(2)[1])
-    animate_card(d2, (SCREEN_WIDTH + 50, -50), dealer_card_positions(2)[1], is_player=False)
+    # animate the dealt cards once with sound per card (dealer's first card face down)
+    view.new_round(reveal=state.reveal_dealer)
+    slide_card(card_image_for(state.player_cards[0]), "player", 0, speed=35)
+    slide_card(CARD_BACK, "dealer", 0, speed=35)
+    slide_card(card_image_for(state.player_cards[1]), "player", 1, speed=35)
+    slide_card(card_image_for(state.dealer_cards[1]), "dealer", 1, speed=35)
 
     # optional extra card when encounter
-    if enc and enc["effect"].get("player_extra_card"):
-        card = local_shoe.draw()
-        state.player_cards.append(card)
-        img = card_image_for(card)
-        start = (SCREEN_WIDTH + 50, SCREEN_HEIGHT//2)
-        end = player_card_positions(len(state.player_cards))[-1]
-        slide_card(img, start, end, speed=35)
-
-    # reset bet
-    state.in_round = True
-    state.reveal_dealer = (state.player_skill == "Card Peek")
-
-    # play card deal sound 
-    if AUDIO_AVAILABLE and SND_DING:
-        SND_DING.play()
+    for i in range(2, len(state.player_cards)):
+        slide_card(card_image_for(state.player_cards[i]), "player", i, speed=35)
 
     # checking if I exceeded max rounds per level
-    if state.level_round_no > state.max_rounds_per_level:
-        if state.balance >= conf["threshold"]:
-            # advance to next level if possible
-            if state.level < max(LEVELS.keys()):
-                state.start_level(state.level + 1)
-                choose_skill_ui(state)
-            else:
-                # no higher level; just reset rounds for replay
-                state.level_round_no = 0
-        else:
-            # game over
-            state.game_over = True
+    status = rules.check_level_rounds(state)
+
+    def after_deal():
+        # play card deal sound
+        play_sound("ding")
+        if status == LEVEL_UP:
+            choose_skill_ui(state)
+        elif status == GAME_OVER:
             show_game_over(state)
+    animator.call(after_deal)
 
 
 
 
 def card_image_for(card):
     key = f"{card.rank}_of_{card.suit}"
-    return CARD_IMAGES.get(key, CARD_BACK)
+    img = CARD_IMAGES.get(key)
+    if img is None:
+        img = CARD_IMAGES[key] = card_sheet.image(key) or placeholder_card(card.rank, card.suit)
+    return img
 
 def player_hit(state: GameState):
-    if not state.in_round: return
-    card = state.local_shoe.draw()
-    state.player_cards.append(card)
-    img = card_image_for(card)
-    start = (SCREEN_WIDTH + 50, SCREEN_HEIGHT//2)
-    end = player_card_positions(len(state.player_cards))[-1]
-    slide_card(img, start, end, speed=30)
-    if hand_value(state.player_cards) > 21:
+    recorder.add(HIT)
+    draw_player_card(state)
+
+def draw_player_card(state: GameState):
+    card = rules.hit(state)
+    if card is None: return
+    slide_card(card_image_for(card), "player", len(state.player_cards) - 1, speed=30)
+    if state.player_cards.bust:
         resolve_round(state)
 
 def player_double(state: GameState):
-    if not state.in_round: return
-    if state.balance >= state.current_bet:  # player must have enough to DOUBLE the bet
-        state.balance -= state.current_bet     # deduct extra
-        state.current_bet *= 2
-        player_hit(state)
+    recorder.add(DOUBLE)
+    if rules.double_down(state):
+        draw_player_card(state)
         if state.in_round:
             resolve_round(state)
 
 def player_stand(state: GameState):
+    recorder.add(STAND)
     if not state.in_round: return
     resolve_round(state)
 
 def dealer_play_and_resolve(state: GameState):
-    conf = LEVELS[state.level]
-    dealer_hits_soft_17 = conf["dealer_hits_soft_17"]
-    if state.encounter and state.encounter["effect"].get("dealer_stands_early"):
-        stop_threshold = 14
-    elif state.encounter and state.encounter["effect"].get("dealer_hits_soft_12"):
-        stop_threshold = 18
-    else:
-        stop_threshold = None
-    while True:
-        dv = hand_value(state.dealer_cards)
-        if stop_threshold is not None:
-            if dv >= stop_threshold: break
-            else:
-                card = state.local_shoe.draw()
-                state.dealer_cards.append(card)
-                img = card_image_for(card)
-                start = (SCREEN_WIDTH + 50, -50)
-                end = dealer_card_positions(len(state.dealer_cards))[-1]
-                slide_card(img, start, end, speed=30)
-                continue
-        if dv < 17:
-            card = state.local_shoe.draw()
-            state.dealer_cards.append(card)
-            img = card_image_for(card)
-            start = (SCREEN_WIDTH + 50, -50)
-            end = dealer_card_positions(len(state.dealer_cards))[-1]
-            slide_card(img, start, end, speed=30)
-            continue
-        if dv == 17 and dealer_hits_soft_17:
-            if random.random() < 0.5:
-                card = state.local_shoe.draw()
-                state.dealer_cards.append(card)
-                img = card_image_for(card)
-                start = (SCREEN_WIDTH + 50, -50)
-                end = dealer_card_positions(len(state.dealer_cards))[-1]
-                slide_card(img, start, end, speed=30)
-                continue
-        break
+    def slide_dealer_card(card):
+        slide_card(card_image_for(card), "dealer", len(state.dealer_cards) - 1, speed=30)
+    rules.dealer_play(state, on_card=slide_dealer_card)
 
 def resolve_round(state: GameState):
     # dealer plays
     dealer_play_and_resolve(state)
-    pv = hand_value(state.player_cards)
-    dv = hand_value(state.dealer_cards)
-    conf = LEVELS[state.level]
-    result = "push"; reward = 0
-    p_black = (len(state.player_cards)==2 and pv==21)
-    d_black = (len(state.dealer_cards)==2 and dv==21)
-
-    reward_mult = 1.0
-    if state.player_skill:
-        sk = SKILLS.get(state.player_skill)
-        if sk and sk["type"] == "reward_mult":
-            reward_mult *= sk["value"]
-    if state.encounter and state.encounter["effect"].get("payout_mult"):
-        reward_mult *= state.encounter["effect"]["payout_mult"]
-
-    if p_black and not d_black:
-        result = "win"; reward = int(round(state.current_bet * conf["blackjack_payout"] * reward_mult))
-    elif d_black and not p_black:
-        result = "loss"; reward = -state.current_bet
-    elif pv > 21:
-        result = "loss"; reward = -state.current_bet
-    elif dv > 21:
-        result = "win"; reward = state.current_bet
-    else:
-        if pv > dv:
-            result = "win"; reward = state.current_bet
-        elif pv < dv:
-            result = "loss"; reward = -state.current_bet
-        else:
-            result = "push"; reward = 0
-
-    # safety net
-    if state.player_skill == "Safety Net" and result == "loss" and (state.balance + reward) < 0:
-        reward = int(reward / 2)
-
-    reward = int(round(reward * reward_mult))
-
-    state.balance += reward
-
-    # log
-    log_round(
-    state.round_no,
-    state.level,
-    state.player_skill or "",
-    (state.encounter["name"] if state.encounter else ""),
-    pv, dv, result, reward, state.balance,
-    persistent_skills=state.active_skills
-)
-    # sounds
-    if AUDIO_AVAILABLE:
-        if result == "win" and SND_DING: SND_DING.play()
-        if result == "loss" and SND_LOSE: SND_LOSE.play()
-
-    # level up
-    next_level = state.level
-    if state.balance >= LEVELS[state.level]["threshold"] and state.level < max(LEVELS.keys()):
-        next_level = state.level + 1
-
-    state.in_round = False
-    state.reveal_dealer = True
-
-    if next_level != state.level:
-        if AUDIO_AVAILABLE and SND_LEVEL: SND_LEVEL.play()
-        state.start_level(next_level)
-        choose_skill_ui(state)
-
-    if state.balance <= 0:
-        state.game_over = True
-        show_game_over(state)
+    res = rules.settle_round(state)
+    history.record(res, state.run_id)
+
+    # log (rounds replayed from a recording are already in the log)
+    if playback is None or not playback.applying:
+        log_round(
+        res.round_no,
+        res.level,
+        res.skill,
+        res.encounter,
+        res.pv, res.dv, res.result, res.reward, res.balance,
+        persistent_skills=state.active_skills,
+        run_id=state.run_id
+    )
+    recorder.round_logged(res, state)
+    leveled = rules.advance_level(state)
+    bankrupt = rules.check_bankrupt(state)
+
+    # the result is shown once the dealer's cards have landed
+    view.hud_frozen = True
+    def after_round():
+        view.reveal = True
+        view.hud_frozen = False
+        # sounds
+        if res.result == "win": play_sound("ding")
+        if res.result == "loss": play_sound("buzz")
+
+        # level up
+        if leveled:
+            play_sound("levelup")
+            choose_skill_ui(state)
+
+        if bankrupt:
+            show_game_over(state)
+    animator.call(after_round)
+
+def bet_up(state: GameState):
+    recorder.add(BET_UP)
+    rules.raise_bet(state)
+
+def bet_down(state: GameState):
+    recorder.add(BET_DOWN)
+    rules.lower_bet(state)
+
+def pick_skill(state: GameState, skill):
+    recorder.skill(skill)
+    rules.choose_skill(state, skill)
+
+def restart_game(state: GameState):
+    # from the game over screen: the balance resets, unlocked skills are kept
+    recorder.add(RESTART)
+    rules.restart(state)
+    choose_skill_ui(state)
+
+def reset_game(state: GameState):
+    # R: start over with nothing kept
+    recorder.add(RESET)
+    rules.restart(state, keep_skills=False)
+    choose_skill_ui(state)
+
+def autoplay_step(state: GameState):
+    # one strategy-table decision; queued behind the animations so every move is seen
+    if not state.in_round:
         return
+    action = strategy_tables.decide(state)
+    if action == "hit":
+        player_hit(state)
+    elif action == "double":
+        player_double(state)
+        return
+    else:
+        player_stand(state)
+    if state.in_round:
+        animator.call(lambda: autoplay_step(state))
+
+
+# Turbo autoplay
+# T plays strategy-table rounds through the same functions as above, as many per frame
+# as TURBO_ROUNDS_PER_FRAME or the frame budget allow. Animations are played out
+# instantly, sounds are muted, the skill screen keeps the skill turbo started with and
+# the game over screen restarts straight away. The table is redrawn a few times a
+# second with the progress in place of the hint line.
+
+TURBO_ROUNDS_PER_FRAME = None   # None = as many as fit in TURBO_FRAME_BUDGET
+TURBO_FRAME_BUDGET = 0.012      # seconds of each frame spent playing rounds
+TURBO_REFRESH = 0.25            # seconds between screen updates
+
+class Turbo:
+    def __init__(self):
+        self.on = False
+        self.skill = None
+        self.rounds = 0
+        self.games = 0
+        self.started = 0.0
+        self.last_draw = 0.0
+
+    def toggle(self, state: GameState):
+        self.on = not self.on
+        if self.on:
+            animator.finish()
+            self.skill = state.player_skill
+            self.rounds = self.games = 0
+            self.started = time.perf_counter()
+            self.last_draw = 0.0
+
+    def play_round(self, state: GameState):
+        if not state.in_round:
+            deal_new_round(state)
+            animator.finish()
+        while state.in_round:
+            action = strategy_tables.decide(state)
+            if action == "hit":
+                player_hit(state)
+            elif action == "double":
+                player_double(state)
+                break
+            else:
+                player_stand(state)
+        animator.finish()
+        self.rounds += 1
+
+    def run(self, state: GameState):
+        # play this frame's rounds
+        t0 = time.perf_counter()
+        n = 0
+        while True:
+            self.play_round(state)
+            n += 1
+            if TURBO_ROUNDS_PER_FRAME:
+                if n >= TURBO_ROUNDS_PER_FRAME:
+                    break
+            elif time.perf_counter() - t0 >= TURBO_FRAME_BUDGET:
+                break
+
+    def due(self):
+        # whether the screen should be redrawn this frame
+        now = time.perf_counter()
+        if now - self.last_draw < TURBO_REFRESH:
+            return False
+        self.last_draw = now
+        return True
+
+    def status(self):
+        rate = self.rounds / max(1e-9, time.perf_counter() - self.started)
+        return f"TURBO (T to stop): {self.rounds:,} rounds, {rate:,.0f}/s, {self.games} games over"
+
+turbo = Turbo()
+
+
+# Session record and replay (replay.py)
+# LUCKYLOOP_RECORD=<.json file or folder> saves the seed and every action of the session at
+# exit; LUCKYLOOP_REPLAY=<session file> plays one back. Keys and clicks only skip
+# animations until the replay ends, then the game carries on from there (and can be
+# recorded again). LUCKYLOOP_SEED fixes the seed of an ordinary session.
+
+RECORD_PATH = os.environ.get("LUCKYLOOP_RECORD")
+REPLAY_PATH = os.environ.get("LUCKYLOOP_REPLAY")
+REPLAY_DELAY = 0.35   # seconds between replayed actions once the cards have landed
+
+recorder = SessionRecorder(None, enabled=False)
+
+class Playback:
+    def __init__(self, session):
+        self.codes = session["actions"]
+        self.skills = session["skills"]
+        self.pos = 0
+        self.idle = 0.0
+        self.applying = False   # an action from the recording is being played
+
+    @property
+    def active(self):
+        return self.pos < len(self.codes)
+
+    def next(self):
+        code = self.codes[self.pos]
+        self.pos += 1
+        return code
+
+    def expect(self, kind):
+        # whether the next action is what the screen now showing records ("skill" or a
+        # code); anything else means the replay went off course, so it stops there
+        if not self.active:
+            return False
+        code = self.codes[self.pos]
+        if is_skill_code(code) if kind == "skill" else code == kind:
+            return True
+        print(f"Replay stopped at action {self.pos}: found {code!r}, the game expected {kind}")
+        self.pos = len(self.codes)
+        return False
+
+    def update(self, state: GameState, dt):
+        # one action each time the table has been still for REPLAY_DELAY
+        if not self.active or animator.busy:
+            self.idle = 0.0
+            return
+        self.idle += dt
+        if self.idle < REPLAY_DELAY:
+            return
+        self.idle = 0.0
+        code = self.next()
+        self.applying = True
+        try:
+            if is_skill_code(code):
+                pick_skill(state, skill_from_code(code, self.skills))
+            else:
+                REPLAY_ACTIONS[code](state)
+        finally:
+            self.applying = False
+
+    def status(self):
+        return f"REPLAY: action {self.pos:,} of {len(self.codes):,} (keys and clicks skip animations)"
+
+REPLAY_ACTIONS = {DEAL: deal_new_round, HIT: player_hit, STAND: player_stand, DOUBLE: player_double,
+                  BET_UP: bet_up, BET_DOWN: bet_down, RESTART: restart_game, RESET: reset_game}
+
+playback = None
+
+def save_recording():
+    path = recorder.save(RECORD_PATH)
+    if path:
+        print("Session saved to", path)
+
+
+# Game server (server.py)
+# LUCKYLOOP_SERVER=<host:port or Unix socket path> plays the game on a LuckyLoop+
+# server: the cards, encounters and results come from there, and this window only
+# shows them. Recording is done by the server (server.py --record).
+
+SERVER_ADDRESS = os.environ.get("LUCKYLOOP_SERVER")
+
+def connect_to_server(state: GameState):
+    global rules
+    try:
+        rules = RemoteRules(Connection(SERVER_ADDRESS))
+    except (OSError, ServerError) as e:
+        print("ERROR: cannot play on the game server at", SERVER_ADDRESS, f"({e})")
+        pygame.quit(); sys.exit()
+    rules.start(state)
+    atexit.register(rules.close)
 
 
 
@@ -589,36 +617,47 @@ def resolve_round(state: GameState):
 
 def centered(x): return SCREEN_WIDTH//2 - x//2
 
-def draw_text_wrapped_center(surface, text, rect, font, color=(255,255,255)):
-    wrapper = textwrap.TextWrapper(width=30)
-    lines = wrapper.wrap(text)
+def wrapped_center_blits(text, rect, font, color=(255,255,255)):
+    # [(surface, pos)] for text wrapped and centered in rect
+    lines = text_cache.wrapped(font, text, color, 30)
     h = len(lines) * font.get_linesize()
     start_y = rect.y + (rect.height - h)//2
-    for i, ln in enumerate(lines):
-        surf = font.render(ln, True, color)
+    blits = []
+    for i, surf in enumerate(lines):
         surf_x = rect.x + (rect.width - surf.get_width())//2
-        surface.blit(surf, (surf_x, start_y + i*font.get_linesize()))
+        blits.append((surf, (surf_x, start_y + i*font.get_linesize())))
+    return blits
 
-def draw_button(rect, text, color=(60,120,60), text_color=(255,255,255)):
-    pygame.draw.rect(screen, color, rect, border_radius=10)
-    pygame.draw.rect(screen, (0,0,0), rect, 2, border_radius=10)
-    txt = FONT.render(text, True, text_color)
-    screen.blit(txt, (rect.x + (rect.width - txt.get_width())//2, rect.y + (rect.height - txt.get_height())//2))
+def draw_text_wrapped_center(surface, text, rect, font, color=(255,255,255)):
+    surface.blits(wrapped_center_blits(text, rect, font, color), doreturn=False)
 
-# card positions
+def draw_button(rect, text, color=(60,120,60), text_color=(255,255,255), surface=None):
+    surface = surface or screen
+    pygame.draw.rect(surface, color, rect, border_radius=10)
+    pygame.draw.rect(surface, (0,0,0), rect, 2, border_radius=10)
+    txt = render_text(FONT, text, text_color)
+    surface.blit(txt, (rect.x + (rect.width - txt.get_width())//2, rect.y + (rect.height - txt.get_height())//2))
+
+# card positions (cached per hand size)
+@lru_cache(maxsize=None)
 def player_card_positions(n):
     center_x = SCREEN_WIDTH//2
     base_y = SCREEN_HEIGHT - CARD_H - 60
     total_w = (n*CARD_W) + ((n-1)*20)
     start_x = center_x - total_w//2
-    return [(start_x + i*(CARD_W+20), base_y) for i in range(n)]
+    return tuple((start_x + i*(CARD_W+20), base_y) for i in range(n))
 
+@lru_cache(maxsize=None)
 def dealer_card_positions(n):
     center_x = SCREEN_WIDTH//2
     base_y = 60
     total_w = (n*CARD_W) + ((n-1)*20)
     start_x = center_x - total_w//2
-    return [(start_x + i*(CARD_W+20), base_y) for i in range(n)]
+    return tuple((start_x + i*(CARD_W+20), base_y) for i in range(n))
+
+# one drop shadow shared by every player card
+CARD_SHADOW = pygame.Surface((CARD_W, CARD_H), pygame.SRCALPHA)
+CARD_SHADOW.fill((0,0,0,80))
 
 # HUD & buttons
 BTN_W, BTN_H = 160, 56
@@ -630,59 +669,320 @@ BTN_NEXT = pygame.Rect(SCREEN_WIDTH - BTN_W - 40, 40, BTN_W, 48)
 BTN_BET_UP = pygame.Rect(BTN_X, SCREEN_HEIGHT - 290, 80, 40)
 BTN_BET_DOWN = pygame.Rect(BTN_X + 90, SCREEN_HEIGHT - 290, 80, 40)
 
+# HUD panels
+INFO_X = SCREEN_WIDTH - 320
+STATS_PANEL = pygame.Rect(20, 300, 320, 120)
+SKILL_PANEL = pygame.Rect(20, SCREEN_HEIGHT - 220, 420, 200)
+
+
+class Sparkline:
+    # balance sparkline kept on its own surface; each new round only draws one
+    # segment (scrolling the surface once it is full), and the whole line is only
+    # redrawn when a balance falls outside the current vertical range
+    def __init__(self, size, step=4, color=(255,215,100)):
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.step = step
+        self.color = color
+        self.max_points = size[0] // step + 1
+        self.drawn = 0      # history.rounds when last drawn
+        self.points = 0     # points currently on the surface
+        self.lo = self.hi = 0
+        self.last_y = 0
+
+    def _y(self, balance):
+        h = self.surface.get_height() - 2
+        return 1 + int(h - (balance - self.lo) * h / max(1, self.hi - self.lo))
+
+    def redraw(self, history):
+        values = history.balances(self.max_points)
+        self.surface.fill((0,0,0,0))
+        self.drawn = history.rounds
+        self.points = len(values)
+        if not values:
+            return
+        # leave headroom so the next rounds usually fit without a redraw
+        lo, hi = min(values), max(values)
+        pad = max(50, (hi - lo) // 4)
+        self.lo, self.hi = lo - pad, hi + pad
+        pts = [(i * self.step, self._y(v)) for i, v in enumerate(values)]
+        if len(pts) > 1:
+            pygame.draw.lines(self.surface, self.color, False, pts, 2)
+        self.last_y = pts[-1][1]
+
+    def update(self, history):
+        new = history.rounds - self.drawn
+        if new <= 0:
+            return
+        values = history.balances(new)
+        if new > len(values) or self.points == 0 or any(v < self.lo or v > self.hi for v in values):
+            self.redraw(history)
+            return
+        for v in values:
+            if self.points >= self.max_points:
+                self.surface.scroll(-self.step, 0)
+                w = self.surface.get_width()
+                self.surface.fill((0,0,0,0), pygame.Rect(w - self.step, 0, self.step, self.surface.get_height()))
+                x = (self.max_points - 1) * self.step
+            else:
+                x = self.points * self.step
+                self.points += 1
+            y = self._y(v)
+            pygame.draw.line(self.surface, self.color, (x - self.step, self.last_y), (x, y), 2)
+            self.last_y = y
+        self.drawn = history.rounds
+
+sparkline = Sparkline((STATS_PANEL.width - 24, 56))
+
+def stats_panel_blits(history):
+    x, y = STATS_PANEL.x + 12, STATS_PANEL.y
+    if not history.rounds:
+        return [(render_text(FONT, "No rounds played yet", (200,200,200)), (x, y + 10))]
+    sparkline.update(history)
+    return [
+        (render_text(FONT, f"Win rate: {history.win_rate*100:.0f}%   EV/round: ${history.ev_per_round:.0f}", (255,255,255)), (x, y + 8)),
+        (render_text(FONT, f"Max drawdown: ${history.max_drawdown}", (255,255,255)), (x, y + 32)),
+        (sparkline.surface, (x, y + 58)),
+    ]
+
+
+# Renderer
+# The background, panels and buttons never change, so they are composited once into
+# two layers. Everything else (HUD text, cards, hint) is an item with a key; an item is
+# only re-rendered when its key changes, and then just the screen areas it covered
+# and now covers are repainted and sent to the display with display.update(rects).
+
+class Renderer:
+    # items are painted in this order, between the background and the button layer
+    # ("buttons") and on top of it
+    LAYERS = ("encounter", "info", "bet", "stats", "skill", "buttons",
+              "dealer", "player", "moving", "hint", "profiler")
+    # frame profiler phase that painting each layer is counted under
+    PHASE = {"dealer": "dealer", "player": "player", "moving": "animations", "hint": "hint",
+             "profiler": "present"}
+
+    def __init__(self, target):
+        self.screen = target
+        self.background = None
+        self.items = {}      # name -> (key, [(surface, pos)], rect)
+        self.dirty = []
+        self.full = True
+
+    def build_layers(self):
+        bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        if TABLE_IMG:
+            bg.blit(TABLE_IMG, (0,0))
+        else:
+            bg.fill((18,130,77))
+        pygame.draw.rect(bg, (10,10,30), (0,0,SCREEN_WIDTH,60))
+        bg.blit(render_text(TITLE_FONT, "LuckyLoop+", (255,215,100)), (20, 6))
+        pygame.draw.rect(bg, (30,30,40), (INFO_X, 80, 300, 200), border_radius=10)
+        pygame.draw.rect(bg, (30,30,40), STATS_PANEL, border_radius=10)
+        pygame.draw.rect(bg, (40,40,60), SKILL_PANEL, border_radius=10)
+        bg.blit(render_text(FONT, "Active Skill", (200,200,200)), (SKILL_PANEL.x + 12, SKILL_PANEL.y + 8))
+        self.background = bg
+
+        buttons = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        draw_button(BTN_BET_UP, "+", color=(50,200,50), surface=buttons)
+        draw_button(BTN_BET_DOWN, "-", color=(200,50,50), surface=buttons)
+        draw_button(BTN_NEXT, "Next Round", color=(70,130,70), surface=buttons)
+        draw_button(BTN_HIT, "Hit", color=(80,80,200), surface=buttons)
+        draw_button(BTN_STAND, "Stand", color=(200,80,80), surface=buttons)
+        draw_button(BTN_DOUBLE, "Double", color=(200,160,80), surface=buttons)
+        self.items["buttons"] = (None, [(buttons, (0,0))], buttons.get_bounding_rect())
+
+    def invalidate(self):
+        # something else drew over the window (a menu screen); repaint it all next frame
+        self.full = True
+
+    def set(self, name, key, build):
+        # build() -> [(surface, pos)], only called when key differs from the last one
+        old = self.items.get(name)
+        if old is not None and old[0] == key:
+            return
+        blits = build()
+        rect = None
+        for surf, pos in blits:
+            r = surf.get_rect(topleft=pos)
+            rect = r if rect is None else rect.union(r)
+        if old is not None and old[2]:
+            self.dirty.append(old[2])
+        if rect:
+            self.dirty.append(rect)
+        self.items[name] = (key, blits, rect)
+
+    def remove(self, name):
+        old = self.items.pop(name, None)
+        if old is not None and old[2]:
+            self.dirty.append(old[2])
+
+    def _paint(self, area):
+        self.screen.set_clip(area)
+        profiler.mark("present")
+        self.screen.blit(self.background, area, area)
+        profiler.mark("hud")
+        for name in self.LAYERS:
+            item = self.items.get(name)
+            if item and item[2] and item[2].colliderect(area):
+                self.screen.blits(item[1], doreturn=False)
+                profiler.mark(self.PHASE.get(name, "hud"))
+        self.screen.set_clip(None)
+
+    def present(self):
+        if self.background is None:
+            self.build_layers()
+        if self.full:
+            self.full = False
+            self.dirty = []
+            self._paint(self.screen.get_rect())
+            pygame.display.flip()
+            return
+        if not self.dirty:
+            return
+        bounds = self.screen.get_rect()
+        rects = []
+        for r in self.dirty:
+            r = r.clip(bounds)
+            if not r.w or not r.h:
+                continue
+            # merge overlapping areas so nothing is painted twice
+            i = 0
+            while i < len(rects):
+                if r.colliderect(rects[i]):
+                    r.union_ip(rects.pop(i))
+                    i = 0
+                else:
+                    i += 1
+            rects.append(r)
+        self.dirty = []
+        for r in rects:
+            self._paint(r)
+        pygame.display.update(rects)
+
+renderer = Renderer(None)
+
+
+# Frame profiler
+# F3 shows how long each frame's work took (p50/p95/p99), dropped frames and the
+# average time per phase; LUCKYLOOP_FRAME_LOG=frames.csv writes every frame to a file.
+
+FRAME_LOG = os.environ.get("LUCKYLOOP_FRAME_LOG")
+PROFILER_REFRESH = 0.5   # seconds between overlay updates
+
+profiler = FrameProfiler(budget=1/FPS)
+show_profiler = False
+
+def toggle_profiler():
+    global show_profiler
+    show_profiler = not show_profiler
+    profiler.enabled = show_profiler or bool(FRAME_LOG)
+
+def profiler_blits():
+    s = profiler.summary()
+    lines = [f"Frame work p50 {s['p50_ms']:.2f}  p95 {s['p95_ms']:.2f}  p99 {s['p99_ms']:.2f} ms",
+             f"Dropped {s['dropped']} of {s['frames']} frames"]
+    phases = sorted(s["phase_ms"].items(), key=lambda kv: -kv[1])
+    for k in range(0, len(phases), 2):
+        lines.append("    ".join(f"{p} {ms:.2f}" for p, ms in phases[k:k+2]))
+    panel = pygame.Surface((380, 10 + 22*len(lines)), pygame.SRCALPHA)
+    panel.fill((0,0,0,170))
+    # numbers change every refresh, so these skip the text cache
+    for i, ln in enumerate(lines):
+        panel.blit(FONT.render(ln, True, (120,255,120)), (8, 5 + i*22))
+    return [(panel, (20, 70))]
 
-def draw_hud(state: GameState):
-    # background
-    if TABLE_IMG:
-        screen.blit(TABLE_IMG, (0,0))
+def draw_profiler_overlay():
+    if show_profiler:
+        renderer.set("profiler", int(time.perf_counter() / PROFILER_REFRESH), profiler_blits)
     else:
-        screen.fill((18,130,77))
+        renderer.remove("profiler")
+
 
-    # top banner
-    banner = pygame.Rect(0,0,SCREEN_WIDTH,60)
-    pygame.draw.rect(screen, (10,10,30), banner)
-    title = TITLE_FONT.render("LuckyLoop+", True, (255,215,100))
-    screen.blit(title, (20, 6))
+def text_item(name, text, pos, color=(255,255,255)):
+    renderer.set(name, text, lambda: [(render_text(FONT, text, color), pos)])
 
+def draw_hud(state: GameState):
     # encounter banner if any
     if state.encounter:
         enc_text = f"Encounter: {state.encounter['name']} - {state.encounter['desc']}"
-        txt = FONT.render(enc_text, True, (255,200,0))
-        screen.blit(txt, (SCREEN_WIDTH//2 - txt.get_width()//2, 20))
+        def encounter_blits():
+            txt = render_text(FONT, enc_text, (255,200,0))
+            return [(txt, (SCREEN_WIDTH//2 - txt.get_width()//2, 20))]
+        renderer.set("encounter", enc_text, encounter_blits)
+    else:
+        renderer.remove("encounter")
 
     # right info panel
-    info_x = SCREEN_WIDTH - 320
-    pygame.draw.rect(screen, (30,30,40), (info_x, 80, 300, 200), border_radius=10)
-    screen.blit(FONT.render(f"Balance: ${state.balance}", True, (255,255,255)), (info_x + 12, 90))
-    screen.blit(FONT.render(f"Level: {state.level}", True, (255,255,255)), (info_x + 12, 120))
-    screen.blit(FONT.render(f"Round: {state.level_round_no}", True, (255,255,255)), (info_x + 12, 150))
-    screen.blit(FONT.render(f"Skill: {state.player_skill or 'None'}", True, (255,255,255)), (info_x + 12, 180))
-    screen.blit(FONT.render(f"Goal: ${LEVELS[state.level]['threshold']}", True, (255,255,255)), (info_x + 12, 210))
+    info = (f"Balance: ${state.balance}", f"Level: {state.level}", f"Round: {state.level_round_no}",
+            f"Skill: {state.player_skill or 'None'}", f"Goal: ${LEVELS[state.level]['threshold']}")
+    renderer.set("info", info, lambda: [(render_text(FONT, t, (255,255,255)), (INFO_X + 12, 90 + i*30))
+                                        for i, t in enumerate(info)])
     # Current Bet Display
-    screen.blit(FONT.render(f"Bet: ${state.current_bet}", True, (255,255,255)), (BTN_X, SCREEN_HEIGHT - 330))
-
-# Draw + / - buttons
-    draw_button(BTN_BET_UP, "+", color=(50,200,50))
-    draw_button(BTN_BET_DOWN, "-", color=(200,50,50))
-
-    # left panel for active skill
-    left_panel = pygame.Rect(20, SCREEN_HEIGHT - 220, 420, 200)
-    pygame.draw.rect(screen, (40,40,60), left_panel, border_radius=10)
-    screen.blit(FONT.render("Active Skill", True, (200,200,200)), (left_panel.x + 12, left_panel.y + 8))
-    if state.player_skill:
-        desc_rect = pygame.Rect(left_panel.x + 10, left_panel.y + 40, left_panel.width - 20, left_panel.height - 48)
-        draw_text_wrapped_center(screen, SKILLS[state.player_skill]["desc"], desc_rect, FONT, (240,240,240))
-
-    # buttons
-    draw_button(BTN_NEXT, "Next Round", color=(70,130,70))
-    draw_button(BTN_HIT, "Hit", color=(80,80,200))
-    draw_button(BTN_STAND, "Stand", color=(200,80,80))
-    draw_button(BTN_DOUBLE, "Double", color=(200,160,80))
+    text_item("bet", f"Bet: ${state.current_bet}", (BTN_X, SCREEN_HEIGHT - 330))
+
+    # session stats + balance sparkline
+    renderer.set("stats", history.rounds, lambda: stats_panel_blits(history))
+
+    # active skill description
+    skill = state.player_skill
+    desc_rect = pygame.Rect(SKILL_PANEL.x + 10, SKILL_PANEL.y + 40, SKILL_PANEL.width - 20, SKILL_PANEL.height - 48)
+    renderer.set("skill", skill, lambda: wrapped_center_blits(SKILLS[skill]["desc"], desc_rect, FONT, (240,240,240))
+                 if skill else [])
+
+def draw_table(state: GameState):
+    # cards are laid out for every card dealt so far, but drawn only once they landed
+    # (the dealer's first card stays face down until the dealer's turn has been shown)
+    hidden = not view.reveal and (state.in_round or view.hud_frozen)
+    placed, shown = view.placed["dealer"], view.shown["dealer"]
+    dealer = state.dealer_cards.cards[:shown]
+    def dealer_blits():
+        pos = dealer_card_positions(placed)
+        return [(CARD_BACK if i == 0 and hidden else card_image_for(c), pos[i]) for i, c in enumerate(dealer)]
+    renderer.set("dealer", (tuple(dealer), placed, hidden), dealer_blits)
+    profiler.mark("dealer")
+
+    # player, with drop shadows
+    placed, shown = view.placed["player"], view.shown["player"]
+    player = state.player_cards.cards[:shown]
+    def player_blits():
+        pos = player_card_positions(placed)
+        blits = []
+        for i, c in enumerate(player):
+            blits.append((CARD_SHADOW, (pos[i][0]+6, pos[i][1]+6)))
+            blits.append((card_image_for(c), pos[i]))
+        return blits
+    renderer.set("player", (tuple(player), placed), player_blits)
+
+    profiler.mark("player")
+
+    # the card on its way in
+    tween = animator.current
+    if tween:
+        renderer.set("moving", (id(tween.image), tween.pos), lambda: [(tween.image, tween.pos)])
+    else:
+        renderer.remove("moving")
+    profiler.mark("animations")
+
+    # bottom hint
+    if turbo.on:
+        text_item("hint", turbo.status(), (40, SCREEN_HEIGHT - 40), (255,215,100))
+    elif playback and playback.active:
+        text_item("hint", playback.status(), (40, SCREEN_HEIGHT - 40), (255,215,100))
+    elif state.in_round:
+        text_item("hint", "Your turn — Hit / Stand / Double", (40, SCREEN_HEIGHT - 40))
+    else:
+        text_item("hint", "Click Next Round to play (N = autoplay a round, T = turbo)", (40, SCREEN_HEIGHT - 40), (220,220,220))
+    profiler.mark("hint")
 
 
 # Skill selection screen
 
 def choose_skill_ui(state: GameState):
+    if playback and playback.expect("skill"):
+        pick_skill(state, skill_from_code(playback.next(), playback.skills))
+        return
+    if turbo.on:
+        pick_skill(state, turbo.skill)
+        return
     skill_keys = list(SKILLS.keys())
     btns = []
     w = 420; h = 90
@@ -694,50 +994,59 @@ def choose_skill_ui(state: GameState):
         btns.append((r,k))
     running = True
     while running:
+        profiler.start_frame("skill screen")
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT: pygame.quit(); sys.exit()
             if ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
                 mx,my = ev.pos
                 for r,k in btns:
                     if r.collidepoint(mx,my):
-                        state.player_skill = k
-                        state.skill_used_flags = {}
+                        pick_skill(state, k)
                         running = False
             if ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
-                state.player_skill = None
+                pick_skill(state, None)
                 running = False
+        profiler.mark("events")
         # draw
         if TABLE_IMG: screen.blit(TABLE_IMG,(0,0))
         else: screen.fill((6,10,20))
-        draw_big = BIG_FONT.render(f"Choose a Skill for Level {state.level}", True, (240,240,240))
+        draw_big = render_text(BIG_FONT, f"Choose a Skill for Level {state.level}", (240,240,240))
         screen.blit(draw_big, (centered(draw_big.get_width()), 40))
         for r,k in btns:
             pygame.draw.rect(screen, (60,60,100), r, border_radius=12)
             pygame.draw.rect(screen, (0,0,0), r, 2, border_radius=12)
             draw_text_wrapped_center(screen, f"{k}: {SKILLS[k]['desc']}", pygame.Rect(r.x+8, r.y+8, r.width-16, r.height-16), FONT, (230,230,230))
-        hint = FONT.render("Click a skill to choose it (Esc = no skill).", True, (200,200,200))
+        hint = render_text(FONT, "Click a skill to choose it (Esc = no skill).", (200,200,200))
         screen.blit(hint, (centered(hint.get_width()), start_y + len(btns)*(h+gap) + 8))
+        profiler.mark("draw")
         pygame.display.flip()
+        profiler.mark("flip")
+        profiler.end_frame()
         clock.tick(FPS)
+    renderer.invalidate()
 
 
 # Intro screen 
 def intro_screen():
     # prepare text
-    title_surface = TITLE_FONT.render("LuckyLoop+", True, (255,215,100))
-    subtitle = BIG_FONT.render("A Blackjack Roguelike by Maria Abato", True, (220,220,220))
-    prompt = FONT.render("Press any key or click to start", True, (200,200,200))
+    title_surface = render_text(TITLE_FONT, "LuckyLoop+", (255,215,100))
+    subtitle = render_text(BIG_FONT, "A Blackjack Roguelike by Maria Abato", (220,220,220))
+    prompt = render_text(FONT, "Press any key or click to start", (200,200,200))
     fade_alpha = 255
     fade_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
     fade_surface.fill((0,0,0))
 
     while True:
+        profiler.start_frame("intro")
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT:
                 pygame.quit(); sys.exit()
             if ev.type == pygame.KEYDOWN or (ev.type == pygame.MOUSEBUTTONDOWN and ev.button==1):
+                renderer.invalidate()
                 return
 
+        profiler.mark("events")
+
         # background
         if TABLE_IMG:
             screen.blit(TABLE_IMG, (0,0))
@@ -753,26 +1062,40 @@ def intro_screen():
             fade_surface.set_alpha(fade_alpha)
             screen.blit(fade_surface, (0,0))
 
+        profiler.mark("draw")
         pygame.display.flip()
+        profiler.mark("flip")
+        profiler.end_frame()
+        startup.frame_shown()
         clock.tick(FPS)
 def show_game_over(state: GameState):
+    if turbo.on:
+        turbo.games += 1
+        restart_game(state)
+        return
+    if playback and playback.expect(RESTART):
+        playback.next()
+        restart_game(state)
+        return
     fade_alpha = 0
     fade_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
     fade_surface.fill((0, 0, 0))
     
     running = True
     while running:
+        profiler.start_frame("game over")
         for ev in pygame.event.get():
             if ev.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
             if ev.type == pygame.KEYDOWN or (ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1):
-                # Restart the game
-                persistent_skills = state.active_skills  # keep unlocked/stacked skills
-                state.__init__(persistent_skills=persistent_skills)  # reset balance but keep skills
-                choose_skill_ui(state)  # optionally let player pick a new skill
+                # Restart the game (balance resets, unlocked skills are kept),
+                # then optionally let the player pick a new skill
+                restart_game(state)
                 running = False
 
+        profiler.mark("events")
+
         # Draw background
         if TABLE_IMG:
             screen.blit(TABLE_IMG, (0, 0))
@@ -780,7 +1103,7 @@ def show_game_over(state: GameState):
             screen.fill((18, 30, 50))
 
         # Game Over banner
-        go_text = TITLE_FONT.render("GAME OVER", True, (255, 50, 50))
+        go_text = render_text(TITLE_FONT, "GAME OVER", (255, 50, 50))
         screen.blit(go_text, (centered(go_text.get_width()), 150))
 
         # Final stats
@@ -790,11 +1113,11 @@ def show_game_over(state: GameState):
             f"Rounds Completed This Level: {state.level_round_no}/{state.max_rounds_per_level}"
         ]
         for i, txt in enumerate(stats_text):
-            surf = BIG_FONT.render(txt, True, (255, 215, 100))
+            surf = render_text(BIG_FONT, txt, (255, 215, 100))
             screen.blit(surf, (centered(surf.get_width()), 260 + i*60))
 
         # Prompt to restart
-        prompt = FONT.render("Press any key or click to restart", True, (220, 220, 220))
+        prompt = render_text(FONT, "Press any key or click to restart", (220, 220, 220))
         screen.blit(prompt, (centered(prompt.get_width()), SCREEN_HEIGHT - 120))
 
         # Optional fade-in effect
@@ -803,8 +1126,12 @@ def show_game_over(state: GameState):
             fade_surface.set_alpha(fade_alpha)
             screen.blit(fade_surface, (0, 0))
 
+        profiler.mark("draw")
         pygame.display.flip()
+        profiler.mark("flip")
+        profiler.end_frame()
         clock.tick(FPS)
+    renderer.invalidate()
 
 
 
@@ -819,41 +1146,91 @@ def main():
         print("Make sure your card PNGs are at that relative path from this script.")
         pygame.quit(); sys.exit()
 
+    # window first, then the rest loads while the intro is up
+    init_display()
+    loader = AssetLoader()
+    loader.start()
+
+    # every shuffle, encounter and coin flip comes from one seeded stream, so a
+    # session can be recorded and replayed
+    global recorder, playback
     state = game
-    intro_screen()
+    if SERVER_ADDRESS:
+        connect_to_server(state)
+    else:
+        if REPLAY_PATH:
+            session = load_session(REPLAY_PATH)
+            seed = session["seed"]
+            playback = Playback(session)
+        else:
+            seed = int(os.environ.get("LUCKYLOOP_SEED") or random.randrange(2**32))
+        state.__init__(rng=random.Random(seed))
+        recorder = SessionRecorder(seed, enabled=bool(RECORD_PATH))
+        if RECORD_PATH:
+            atexit.register(save_recording)
+
+    if playback is None:
+        intro_screen()
     choose_skill_ui(state)
+    loader.wait()
+    if STARTUP_REPORT:
+        startup.report()
+    if FRAME_LOG:
+        profiler.export(FRAME_LOG)
+    profiler.pause()
 
     running = True
+    dt = 0.0
     while running:
+        profiler.start_frame()
         for event in pygame.event.get():
 
+    # Any key or click while cards are still moving finishes the animations first,
+    # then is handled as usual
+
+            if (event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.KEYDOWN and event.key != pygame.K_F3) \
+                    and animator.busy:
+                animator.finish()
+
+    # While a recording plays back, keys and clicks do nothing else (F3 still works)
+
+            if playback and playback.active and (event.type == pygame.MOUSEBUTTONDOWN
+                                                 or event.type == pygame.KEYDOWN and event.key != pygame.K_F3):
+                continue
+
     # Quit game
 
             if event.type == pygame.QUIT:
+                close_log()
+                profiler.close()
                 running = False
 
 
     # Looping background music
             if event.type == MUSIC_END_EVENT:
-                play_next_song()
+                audio.next_track()
 
     # Keyboard Input
 
             if event.type == pygame.KEYDOWN:
 
-        # N = auto resolve next round
+        # N = auto resolve next round (plays the precomputed strategy tables)
                 if event.key == pygame.K_n:
                     if not state.in_round:
                         deal_new_round(state)
-                    while state.in_round and hand_value(state.player_cards) < 17:
-                        player_hit(state)
-                    if state.in_round:
-                        player_stand(state)
+                    animator.call(lambda: autoplay_step(state))
+
+        # F3 = frame profiler overlay
+                if event.key == pygame.K_F3:
+                    toggle_profiler()
+
+        # T = turbo autoplay on/off
+                if event.key == pygame.K_t:
+                    turbo.toggle(state)
 
         # R = restart game fully
                 if event.key == pygame.K_r:
-                    state.__init__()      # reset GameState
-                    choose_skill_ui(state)
+                    reset_game(state)
 
     # Mouse Input
 
@@ -878,46 +1255,35 @@ def main():
                     player_double(state)
         # Increase bet
                 if BTN_BET_UP.collidepoint(mx,my):
-                    if state.current_bet + 50 <= state.balance:
-                        state.current_bet += 50
+                    bet_up(state)
 
         # Decrease bet
                 if BTN_BET_DOWN.collidepoint(mx,my):
-                    if state.current_bet - 50 >= 10:
-                        state.current_bet -= 50
-
-
-        # render
-        draw_hud(state)
-
-        # draw dealer
-        if state.dealer_cards:
-            for i, c in enumerate(state.dealer_cards):
-                pos = dealer_card_positions(len(state.dealer_cards))[i]
-                if i == 0 and state.in_round and not state.reveal_dealer:
-                    screen.blit(CARD_BACK, pos)
-                else:
-                    screen.blit(card_image_for(c), pos)
-
-        # draw player
-        if state.player_cards:
-            for i,c in enumerate(state.player_cards):
-                pos = player_card_positions(len(state.player_cards))[i]
-                # drop shadow
-                shadow = pygame.Surface((CARD_W, CARD_H), pygame.SRCALPHA)
-                shadow.fill((0,0,0,80))
-                screen.blit(shadow, (pos[0]+6, pos[1]+6))
-                screen.blit(card_image_for(c), pos)
-
-        # bottom hint
-        if state.in_round:
-            msg = FONT.render("Your turn — Hit / Stand / Double", True, (255,255,255))
-        else:
-            msg = FONT.render("Click Next Round to play (or press N for autoplay)", True, (220,220,220))
-        screen.blit(msg, (40, SCREEN_HEIGHT - 40))
-
-        pygame.display.flip()
-        clock.tick(FPS)
+                    bet_down(state)
+
+
+        profiler.mark("events")
+
+        # animations
+        animator.update(dt)
+        if playback:
+            playback.update(state, dt)
+        profiler.mark("animations")
+        if turbo.on:
+            turbo.run(state)
+            profiler.mark("turbo")
+
+        # render (only what changed since the last frame is repainted)
+        if not turbo.on or turbo.due():
+            if not view.hud_frozen:
+                draw_hud(state)
+            profiler.mark("hud")
+            draw_table(state)
+            draw_profiler_overlay()
+            renderer.present()
+            profiler.mark("present")
+        profiler.end_frame()
+        dt = clock.tick(FPS) / 1000
 
     pygame.quit()
 
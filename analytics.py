@@ -0,0 +1,318 @@
+# LuckyLoop+ streaming analytics
+# The numbers from "Lucky Loop Extended Analysis.R" (win rate, average balance and
+# reward, the bet era split, win rate / reward by level, skill, encounter and player
+# value, the loss streaks, the 5-round rolling balance per bet era and the player vs
+# dealer heatmap) computed in one streaming pass over results.csv in constant memory.
+# Every statistic is a mergeable accumulator, so the file can also be split into
+# byte ranges that are read in parallel and merged in file order.
+#
+# The R script sorts by Round before the rolling balance and the loss streaks, and
+# Round starts again at 1 in every game, so those two follow that order: each Round
+# number keeps its own summary of its rows (in file order, as arrange() keeps ties),
+# and the summaries are joined in Round order at the end. Memory grows with the
+# longest game, not with the file.
+#
+#   python analytics.py results.csv --workers 4
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from results_db import BET_ERA_CUTOFF, bet_era
+
+CHUNK_BYTES = 1 << 20
+ROLLING_WINDOW = 5
+
+
+class Group:
+    # running count / win count / reward and balance sums for one group
+    __slots__ = ("n", "wins", "reward", "balance")
+
+    def __init__(self):
+        self.n = 0; self.wins = 0; self.reward = 0; self.balance = 0
+
+    def add(self, win, reward, balance):
+        self.n += 1; self.wins += win; self.reward += reward; self.balance += balance
+
+    def merge(self, other):
+        self.n += other.n; self.wins += other.wins
+        self.reward += other.reward; self.balance += other.balance
+
+    def as_dict(self):
+        n = self.n or 1
+        return {"rounds": self.n, "win_rate": self.wins / n,
+                "avg_reward": self.reward / n, "avg_balance": self.balance / n}
+
+
+class Rolling:
+    # k-round rolling mean of the balance, keeping only the first and last k-1 values
+    # so windows that cross a segment boundary can be finished when segments merge
+    __slots__ = ("k", "n", "head", "tail", "windows", "lo", "hi", "last")
+
+    def __init__(self, k=ROLLING_WINDOW):
+        self.k = k; self.n = 0
+        self.head = []; self.tail = []
+        self.windows = 0; self.lo = None; self.hi = None; self.last = None
+
+    def _window(self, mean):
+        self.windows += 1
+        self.lo = mean if self.lo is None else min(self.lo, mean)
+        self.hi = mean if self.hi is None else max(self.hi, mean)
+        self.last = mean
+
+    def add(self, balance):
+        self.n += 1
+        if len(self.head) < self.k - 1:
+            self.head.append(balance)
+        self.tail.append(balance)
+        if len(self.tail) == self.k:
+            self._window(sum(self.tail) / self.k)
+            self.tail.pop(0)
+
+    def merge(self, other):
+        # any k-window over (my last k-1, their first k-1) spans the boundary
+        seam = self.tail + other.head
+        for i in range(len(seam) - self.k + 1):
+            self._window(sum(seam[i:i+self.k]) / self.k)
+        if other.windows:
+            self.windows += other.windows
+            self.lo = other.lo if self.lo is None else min(self.lo, other.lo)
+            self.hi = other.hi if self.hi is None else max(self.hi, other.hi)
+            self.last = other.last
+        self.head = (self.head + other.head)[:self.k - 1]
+        self.tail = (self.tail + other.tail)[-(self.k - 1):] if self.k > 1 else []
+        self.n += other.n
+
+
+class Streaks:
+    # loss streaks: losses, streaks, and whether the first/last row was a loss
+    __slots__ = ("losses", "streaks", "first_loss", "last_loss")
+
+    def __init__(self):
+        self.losses = 0; self.streaks = 0
+        self.first_loss = None; self.last_loss = None
+
+    def add(self, loss):
+        if loss:
+            self.losses += 1
+            if not self.last_loss:
+                self.streaks += 1
+        if self.first_loss is None:
+            self.first_loss = loss
+        self.last_loss = loss
+
+    def merge(self, other):
+        # other's rows come right after mine
+        self.losses += other.losses
+        self.streaks += other.streaks
+        if self.last_loss and other.first_loss:
+            self.streaks -= 1  # one streak runs across the boundary
+        if self.first_loss is None:
+            self.first_loss = other.first_loss
+        if other.last_loss is not None:
+            self.last_loss = other.last_loss
+
+
+class Report:
+    def __init__(self, window=ROLLING_WINDOW):
+        self.all = Group()
+        self.era = {}
+        self.level = {}
+        self.skill = {}
+        self.encounter = {}
+        self.player_value = {}
+        self.heatmap = {}
+        self.outcomes_by_skill = {}
+        self.window = window
+        self.rounds = {}   # Round -> (Rolling, Streaks) of its rows
+
+    def add(self, rnd, level, skill, encounter, pv, dv, result, reward, balance):
+        win = result == "win"
+        loss = result == "loss"
+        era = bet_era(rnd)
+        self.all.add(win, reward, balance)
+        for table, key in ((self.era, era), (self.level, level), (self.skill, skill),
+                           (self.encounter, encounter), (self.player_value, pv),
+                           (self.heatmap, (pv, dv))):
+            g = table.get(key)
+            if g is None:
+                g = table[key] = Group()
+            g.add(win, reward, balance)
+        k = (skill, result)
+        self.outcomes_by_skill[k] = self.outcomes_by_skill.get(k, 0) + 1
+        seq = self.rounds.get(rnd)
+        if seq is None:
+            seq = self.rounds[rnd] = (Rolling(self.window), Streaks())
+        seq[0].add(balance)
+        seq[1].add(loss)
+
+    def merge(self, other):
+        # other must come right after self in the file
+        self.all.merge(other.all)
+        for name in ("era", "level", "skill", "encounter", "player_value", "heatmap"):
+            mine = getattr(self, name)
+            for key, g in getattr(other, name).items():
+                if key in mine:
+                    mine[key].merge(g)
+                else:
+                    mine[key] = g
+        for k, v in other.outcomes_by_skill.items():
+            self.outcomes_by_skill[k] = self.outcomes_by_skill.get(k, 0) + v
+        for rnd, (rolling, streaks) in other.rounds.items():
+            if rnd in self.rounds:
+                self.rounds[rnd][0].merge(rolling)
+                self.rounds[rnd][1].merge(streaks)
+            else:
+                self.rounds[rnd] = (rolling, streaks)
+        return self
+
+    def in_round_order(self):
+        # (rolling balance per bet era, loss streaks) over the rows sorted by Round
+        rolling = {}
+        streaks = Streaks()
+        for rnd in sorted(self.rounds):
+            seq = self.rounds[rnd]
+            era = bet_era(rnd)
+            if era not in rolling:
+                rolling[era] = Rolling(self.window)
+            rolling[era].merge(seq[0])
+            streaks.merge(seq[1])
+        return rolling, streaks
+
+    def as_dict(self):
+        def table(t):
+            return {str(k): g.as_dict() for k, g in sorted(t.items(), key=lambda kv: str(kv[0]))}
+        s = self.all.as_dict()
+        rolling, streaks = self.in_round_order()
+        return {
+            "total_rounds": s["rounds"],
+            "win_rate": s["win_rate"],
+            "avg_balance": s["avg_balance"],
+            "avg_reward": s["avg_reward"],
+            "cumulative_reward": self.all.reward,
+            "avg_loss_streak": streaks.losses / streaks.streaks if streaks.streaks else 0.0,
+            "by_bet_era": table(self.era),
+            "by_level": table(self.level),
+            "by_skill": table(self.skill),
+            "by_encounter": table(self.encounter),
+            "by_player_value": table(self.player_value),
+            "heatmap": {f"{pv},{dv}": g.wins / g.n for (pv, dv), g in sorted(self.heatmap.items())},
+            "outcomes_by_skill": {f"{s}|{r}": n for (s, r), n in sorted(self.outcomes_by_skill.items())},
+            "rolling_balance": {era: {"window": r.k, "windows": r.windows, "min": r.lo, "max": r.hi,
+                                      "last": r.last} for era, r in sorted(rolling.items())},
+        }
+
+
+# Reading
+
+def _columns(header):
+    names = ["Round", "Level", "Skill", "Encounter", "PlayerValue", "DealerValue", "Result", "Reward", "Balance"]
+    try:
+        return [header.index(n) for n in names]
+    except ValueError as e:
+        raise ValueError(f"results file is missing a column: {e}")
+
+def _read_header(path):
+    with open(path, newline="") as f:
+        return next(csv.reader(f))
+
+def _to_int(v):
+    return int(float(v)) if v else 0
+
+def scan_segment(path, start, end, columns, window=ROLLING_WINDOW):
+    # read whole lines that start inside [start, end), in CHUNK_BYTES pieces
+    report = Report(window)
+    ri, li, si, ei, pi, di, resi, rwi, bi = columns
+    with open(path, "rb") as f:
+        # skip the header, or the rest of a line that started in the previous segment
+        f.seek(max(0, start - 1))
+        f.readline()
+        pos = f.tell()
+        while pos < end:
+            chunk = f.readlines(CHUNK_BYTES)
+            if not chunk:
+                break
+            lines = []
+            for ln in chunk:
+                if pos >= end:
+                    break
+                lines.append(ln.decode("utf-8"))
+                pos += len(ln)
+            for row in csv.reader(lines):
+                if not row:
+                    continue
+                report.add(_to_int(row[ri]), _to_int(row[li]), row[si], row[ei],
+                           _to_int(row[pi]), _to_int(row[di]), row[resi].lower(),
+                           _to_int(row[rwi]), _to_int(row[bi]))
+    return report
+
+def segments(path, parts):
+    size = os.path.getsize(path)
+    step = max(1, size // parts)
+    bounds = [i * step for i in range(parts)] + [size]
+    return [(bounds[i], bounds[i+1]) for i in range(parts) if bounds[i] < bounds[i+1]]
+
+def analyze(path, workers=1, window=ROLLING_WINDOW):
+    columns = _columns(_read_header(path))
+    parts = segments(path, max(1, workers))
+    if workers <= 1 or len(parts) == 1:
+        reports = [scan_segment(path, s, e, columns, window) for s, e in parts]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(scan_segment, [path]*len(parts), [s for s, _ in parts],
+                                    [e for _, e in parts], [columns]*len(parts), [window]*len(parts)))
+    total = Report(window)
+    for r in reports:
+        total.merge(r)
+    return total
+
+
+def print_report(d):
+    print("Total rounds:", d["total_rounds"])
+    print("Win rate:", round(d["win_rate"]*100, 2), "%")
+    print("Average balance:", round(d["avg_balance"], 2))
+    print("Average reward per round:", round(d["avg_reward"], 2), "\n")
+
+    def table(title, rows, cols):
+        print(title)
+        for key, v in rows.items():
+            print(f"  {key or '(none)':16s}" + "".join(f"  {c} {v[c]:10.4f}" for c in cols))
+        print()
+
+    table(f"By bet era (Low Bet = round <= {BET_ERA_CUTOFF}):", d["by_bet_era"], ["win_rate", "avg_reward", "avg_balance"])
+    table("Win rate / average reward by level:", d["by_level"], ["win_rate", "avg_reward"])
+    table("Win rate by skill:", d["by_skill"], ["win_rate"])
+    table("Win rate / average reward by encounter:", d["by_encounter"], ["win_rate", "avg_reward"])
+    table("Win rate by player value:", d["by_player_value"], ["win_rate"])
+    print("Average loss streak length:", round(d["avg_loss_streak"], 3))
+    print("Cumulative reward:", d["cumulative_reward"])
+    for era, r in d["rolling_balance"].items():
+        if r["windows"]:
+            print(f"Rolling balance ({r['window']} rounds), {era}: last {r['last']:.2f}"
+                  f"  min {r['min']:.2f}  max {r['max']:.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming version of the LuckyLoop+ R analysis")
+    ap.add_argument("csv", nargs="?", default="results.csv")
+    ap.add_argument("--workers", type=int, default=1, help="read this many file segments in parallel")
+    ap.add_argument("--window", type=int, default=ROLLING_WINDOW, help="rolling balance window")
+    ap.add_argument("--json", action="store_true", help="print every aggregate as JSON")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    d = analyze(args.csv, args.workers, args.window).as_dict()
+    dt = time.perf_counter() - t0
+    if args.json:
+        json.dump(d, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(d)
+    print(f"({d['total_rounds']} rounds in {dt:.2f}s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
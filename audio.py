@@ -0,0 +1,161 @@
+# LuckyLoop+ audio
+# Background music and sound effects behind one small interface. While a track plays,
+# the next one is read into memory and opened by the mixer (pygame.mixer.music.queue)
+# on a background thread, so the mixer switches to it by itself when the current one
+# ends and the main thread neither waits on the disk nor opens the decoder. Only if
+# the track ends before that's done is the next one loaded on the main thread. Each effect gets its own reserved mixer channels
+# (a voice limit): when all of an effect's channels are busy the oldest one is cut off
+# and reused, so fast deals can't pile up sounds or take channels from the others.
+# NullAudio has the same methods and does nothing, for headless runs or no sound card.
+
+import io
+import os
+import threading
+
+import pygame
+
+# reserved channels per effect
+EFFECT_VOICES = {"card": 2, "ding": 1, "buzz": 1, "levelup": 1}
+
+
+class NullAudio:
+    enabled = False
+
+    def start_music(self, paths, volume=0.3, end_event=None, fade_ms=1000):
+        pass
+
+    def next_track(self, fade_ms=1000):
+        pass
+
+    def load_effect(self, name, path, volume=1.0):
+        return False
+
+    def play(self, name):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class MixerAudio:
+    enabled = True
+
+    def __init__(self, voices=EFFECT_VOICES):
+        # needs pygame.mixer to be initialized
+        total = sum(voices.values())
+        if pygame.mixer.get_num_channels() < total + 2:
+            pygame.mixer.set_num_channels(total + 2)
+        pygame.mixer.set_reserved(total)   # channels 0..total-1 are never picked automatically
+        self.channels = {}
+        n = 0
+        for name, k in voices.items():
+            self.channels[name] = [pygame.mixer.Channel(n + i) for i in range(k)]
+            n += k
+        self.next_voice = dict.fromkeys(voices, 0)
+        self.sounds = {}
+        self.played = 0
+        self.cut_off = 0
+
+        self.tracks = []
+        self.track = -1
+        self._playing = None          # buffer of the current track (the mixer streams from it)
+        self._next = None             # (track index, bytes, buffer if queued in the mixer) read ahead
+        self._lock = threading.Lock()
+        self._reader = None
+
+    # Effects
+
+    def load_effect(self, name, path, volume=1.0):
+        # safe to call off the main thread; False if the file is missing or unreadable
+        if name not in self.channels or not os.path.exists(path):
+            return False
+        try:
+            snd = pygame.mixer.Sound(path)
+        except Exception:
+            return False
+        snd.set_volume(volume)
+        self.sounds[name] = snd
+        return True
+
+    def play(self, name):
+        snd = self.sounds.get(name)
+        if snd is None:
+            return
+        group = self.channels[name]
+        for ch in group:
+            if not ch.get_busy():
+                ch.play(snd)
+                break
+        else:
+            # every voice is busy: restart the one that started longest ago
+            i = self.next_voice[name]
+            group[i].play(snd)
+            self.cut_off += 1
+        self.next_voice[name] = (self.next_voice[name] + 1) % len(group)
+        self.played += 1
+
+    # Music
+
+    def _read(self, i):
+        with open(self.tracks[i], "rb") as f:
+            return f.read()
+
+    def _read_ahead(self, i):
+        def run():
+            try:
+                data = self._read(i)
+            except OSError:
+                return
+            buf = io.BytesIO(data)
+            try:
+                pygame.mixer.music.queue(buf, os.path.splitext(self.tracks[i])[1].lstrip("."))
+            except pygame.error:
+                buf = None   # next_track loads it instead
+            with self._lock:
+                self._next = (i, data, buf)
+        self._reader = threading.Thread(target=run, name="music-reader", daemon=True)
+        self._reader.start()
+
+    def _play(self, i, data, fade_ms):
+        buf = io.BytesIO(data)
+        pygame.mixer.music.load(buf, os.path.splitext(self.tracks[i])[1].lstrip("."))
+        pygame.mixer.music.play(fade_ms=fade_ms)
+        self._playing = buf
+        self.track = i
+
+    def start_music(self, paths, volume=0.3, end_event=None, fade_ms=1000):
+        self.tracks = [p for p in paths if os.path.exists(p)]
+        if not self.tracks:
+            return
+        pygame.mixer.music.set_volume(volume)
+        if end_event is not None:
+            pygame.mixer.music.set_endevent(end_event)
+        self._play(0, self._read(0), fade_ms)
+        self._read_ahead(1 % len(self.tracks))
+
+    def next_track(self, fade_ms=1000):
+        # call on the music end event; a queued track has already started (without
+        # the fade), otherwise the next one is loaded here
+        if not self.tracks:
+            return
+        i = (self.track + 1) % len(self.tracks)
+        if self._reader is not None:
+            self._reader.join()   # only waits when the track ended before the read-ahead
+        with self._lock:
+            ready, self._next = self._next, None
+        if ready is not None and ready[0] == i and ready[2] is not None and pygame.mixer.music.get_busy():
+            self._playing = ready[2]
+            self.track = i
+        else:
+            self._play(i, ready[1] if ready is not None and ready[0] == i else self._read(i), fade_ms)
+        self._read_ahead((i + 1) % len(self.tracks))
+
+    def stats(self):
+        return {"effects_played": self.played, "voices_cut_off": self.cut_off, "track": self.track}
+
+
+def create_audio(enabled=True):
+    # MixerAudio if the mixer is up and sound is wanted, otherwise NullAudio
+    if enabled and pygame.mixer.get_init():
+        return MixerAudio()
+    return NullAudio()
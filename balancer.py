@@ -0,0 +1,486 @@
+# LuckyLoop+ balance optimizer
+# Searches game values (level goals, base bets, rounds per level, encounter chance
+# and effects, skill values) for the configuration whose whole-game results come
+# closest to target outcomes, e.g. half the runs clearing level 1, a fifth clearing
+# level 2 and a median of 12 rounds. A config's loss is the sum of its squared
+# relative misses.
+#
+# The search is successive halving: a random sample of configs from the grid (plus
+# the current values) gets a few hundred runs each, the best third go on with three
+# times the runs, and so on until --max-runs; then the neighbours of the best (one
+# grid step away in one value) are raced the same way. Runs are played in seeded
+# chunks on a process pool, the same chunk seeds for every config, and each config's
+# results are cached by chunk (in balance_cache.json, for the engine, strategy code and
+# strategy tables they came from), so a config is never played twice and a longer race
+# only plays the new chunks.
+#
+# The player is a strategy from strategies.py; the strategy tables keep the moves
+# worked out for the shipped rules.
+#
+#   python balancer.py
+#   python balancer.py --goal cleared_level_2=0.15 --goal median_rounds=15 --candidates 96
+#   python balancer.py --param levels.2.threshold=900:1500:100 --param encounter_chance=0.1,0.2,0.3
+
+import argparse
+import hashlib
+import importlib
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import dealer_odds
+import engine
+import strategies
+import strategy_tables
+from running_stats import Moments
+
+CHUNK_RUNS = 250
+CACHE_FILE = "balance_cache.json"
+
+# the values searched when no --param is given
+SPACE = {
+    "levels.1.threshold": [400, 450, 500, 550, 600],
+    "levels.2.threshold": [900, 1000, 1100, 1200, 1300],
+    "base_bets.1": [50, 100],
+    "base_bets.2": [100, 150, 200],
+    "rounds_per_level": [5, 6, 8, 10],
+    "encounter_chance": [0.10, 0.14, 0.18, 0.22, 0.26],
+    "encounters.High Stakes.payout_mult": [1.5, 2, 2.5],
+}
+GOALS = {"cleared_level_1": 0.5, "cleared_level_2": 0.2, "median_rounds": 12}
+
+
+# Game values by name:
+#   levels.<level>.<key>  base_bets.<level>  rounds_per_level  encounter_chance
+#   dealer_stands_early_at  dealer_soft_12_stands_at
+#   encounters.<name>.<effect key>  skills.<name>.value
+
+def _slot(name):
+    # (container, key) holding the value called name
+    parts = name.split(".")
+    try:
+        if parts[0] == "levels" and len(parts) == 3:
+            container, key = engine.LEVELS[int(parts[1])], parts[2]
+        elif parts[0] == "base_bets" and len(parts) == 2:
+            container, key = engine.BASE_BETS, int(parts[1])
+        elif parts[0] == "encounters" and len(parts) == 3:
+            container, key = next(e for e in engine.ENCOUNTERS if e["name"] == parts[1])["effect"], parts[2]
+        elif parts[0] == "skills" and len(parts) == 3:
+            container, key = engine.SKILLS[parts[1]], parts[2]
+        elif len(parts) == 1:
+            container, key = engine, name.upper()
+        else:
+            raise KeyError(name)
+    except (KeyError, ValueError, StopIteration):
+        raise ValueError(f"unknown game value {name!r}") from None
+    if (hasattr(container, key) if container is engine else key in container):
+        return container, key
+    raise ValueError(f"unknown game value {name!r}")
+
+def get_value(name):
+    container, key = _slot(name)
+    return getattr(container, key) if container is engine else container[key]
+
+def set_value(name, value):
+    container, key = _slot(name)
+    if container is engine:
+        setattr(container, key, value)
+    else:
+        container[key] = value
+
+@contextmanager
+def applied(config):
+    # the engine plays with config's values until the block ends
+    saved = {name: get_value(name) for name in config}
+    try:
+        for name, value in config.items():
+            set_value(name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            set_value(name, value)
+
+def valid(config):
+    # level goals have to go up
+    goals = [config.get(f"levels.{lv}.threshold", engine.LEVELS[lv]["threshold"]) for lv in sorted(engine.LEVELS)]
+    return all(a < b for a, b in zip(goals, goals[1:]))
+
+
+# Results of many runs, mergeable and saved in the cache
+
+class RunStats:
+    def __init__(self):
+        self.n = 0
+        self.max_levels = Counter()
+        self.cleared = 0
+        self.rounds = Counter()
+        self.balance = Moments()
+
+    def add(self, r):
+        self.n += 1
+        self.max_levels[r.max_level] += 1
+        self.cleared += r.cleared
+        self.rounds[r.rounds] += 1
+        self.balance.add(r.final_balance)
+
+    def merge(self, other):
+        self.n += other.n
+        self.max_levels.update(other.max_levels)
+        self.cleared += other.cleared
+        self.rounds.update(other.rounds)
+        self.balance.merge(other.balance)
+
+    def _kth_rounds(self, k):
+        seen = 0
+        for value in sorted(self.rounds):
+            seen += self.rounds[value]
+            if seen > k:
+                return value
+        return 0
+
+    def metrics(self):
+        n = max(self.n, 1)
+        out = {}
+        for level in sorted(engine.LEVELS):
+            if level < engine.MAX_LEVEL:
+                out[f"cleared_level_{level}"] = sum(c for lv, c in self.max_levels.items() if lv > level) / n
+            else:
+                out[f"cleared_level_{level}"] = self.cleared / n
+        out["median_rounds"] = (self._kth_rounds((self.n - 1) // 2) + self._kth_rounds(self.n // 2)) / 2
+        out["avg_rounds"] = sum(v * c for v, c in self.rounds.items()) / n
+        out["avg_final_balance"] = self.balance.mean
+        return out
+
+    def to_dict(self):
+        return {"n": self.n, "max_levels": self.max_levels, "cleared": self.cleared, "rounds": self.rounds,
+                "balance": [self.balance.n, self.balance.mean, self.balance.m2]}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls()
+        stats.n = d["n"]
+        stats.max_levels = Counter({int(k): v for k, v in d["max_levels"].items()})
+        stats.cleared = d["cleared"]
+        stats.rounds = Counter({int(k): v for k, v in d["rounds"].items()})
+        stats.balance.n, stats.balance.mean, stats.balance.m2 = d["balance"]
+        return stats
+
+METRICS = tuple(RunStats().metrics())
+
+
+def play_chunk(config, strategy, skill, max_rounds, seed, chunk):
+    # CHUNK_RUNS whole games with config's values; chunk seeds are the same for every config
+    strategy_tables.load_tables()  # loaded for the shipped rules, before they change
+    player = strategies.load(strategy)
+    choose = player.choose_skill if skill is None else (lambda state: skill)
+    rng = random.Random(f"luckyloop-opt-{seed}-{chunk}")
+    stats = RunStats()
+    with applied(config):
+        for _ in range(CHUNK_RUNS):
+            state = engine.GameState(rng=rng)
+            stats.add(engine.play_run(state, player.decide, choose, max_rounds, player.bet))
+    return stats
+
+
+# Cache: config -> the results of each of its chunks played so far
+
+def code_key():
+    # results are only reused for the same game and strategy code and strategy tables
+    h = hashlib.sha256()
+    for module in (engine, strategies, strategy_tables, dealer_odds):
+        with open(module.__file__, "rb") as f:
+            h.update(f.read())
+    h.update(strategy_tables.rules_key())
+    h.update(strategy_tables.load_tables())
+    return h.hexdigest()[:16]
+
+def strategy_key(spec):
+    # a "module:attribute" strategy also keys on its module's code
+    if spec in strategies.STRATEGIES:
+        return spec
+    module = importlib.import_module(spec.split(":", 1)[0])
+    with open(module.__file__, "rb") as f:
+        return f"{spec}@{hashlib.sha256(f.read()).hexdigest()[:16]}"
+
+def config_key(config, strategy, skill, max_rounds, seed, baseline):
+    # values left at the game's own are dropped, so the same game always has the same key
+    changed = {k: v for k, v in config.items() if baseline.get(k, get_value(k)) != v}
+    return json.dumps([changed, strategy_key(strategy), skill, max_rounds, seed], sort_keys=True)
+
+class Cache:
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}   # key -> [RunStats of chunk 0, 1, ...]
+        self.loaded = {}    # key -> chunks read from the file
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            if data.get("code") == code_key():
+                self.entries = {k: [RunStats.from_dict(s) for s in chunks] for k, chunks in data["entries"].items()}
+                self.loaded = {k: len(chunks) for k, chunks in self.entries.items()}
+
+    def chunks(self, key):
+        return self.entries.setdefault(key, [])
+
+    def save(self):
+        if not self.path:
+            return
+        data = {"code": code_key(),
+                "entries": {k: [s.to_dict() for s in chunks] for k, chunks in self.entries.items()}}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+
+# Search
+
+def loss(metrics, goals):
+    return sum(((metrics[m] - t) / (abs(t) or 1)) ** 2 for m, t in goals.items())
+
+def sample(space, n, rng, baseline):
+    # the current values plus up to n distinct valid configs from the grid
+    names = sorted(space)
+    size = math.prod(len(space[k]) for k in names)
+    configs = [dict(baseline)]
+    seen = {json.dumps(baseline, sort_keys=True)}
+    if size <= n:
+        pool = (dict(zip(names, values)) for values in itertools.product(*(space[k] for k in names)))
+    else:
+        pool = ({k: rng.choice(space[k]) for k in names} for _ in range(50 * n))
+    for config in pool:
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen and valid(config):
+            seen.add(key)
+            configs.append(config)
+            if len(configs) > n:
+                break
+    return configs
+
+def neighbours(config, space):
+    # every config one grid step away in one value
+    for name, values in space.items():
+        if config[name] not in values:
+            continue
+        i = values.index(config[name])
+        for j in (i - 1, i + 1):
+            if 0 <= j < len(values):
+                other = dict(config, **{name: values[j]})
+                if valid(other):
+                    yield other
+
+class Optimizer:
+    def __init__(self, space, goals, strategy="tables", skill=None, max_rounds=1000, seed=0,
+                 workers=None, cache=None, progress=None):
+        self.space = space
+        self.goals = goals
+        self.strategy = strategy
+        self.skill = skill
+        self.max_rounds = max_rounds
+        self.seed = seed
+        self.workers = workers
+        self.cache = cache or Cache()
+        self.progress = progress
+        self.baseline = {name: get_value(name) for name in space}
+        self.results = {}    # key -> config
+        self.reached = {}    # key -> runs the search gave it
+        self.played = 0      # runs played (not from the cache)
+
+    def key(self, config):
+        return config_key(config, self.strategy, self.skill, self.max_rounds, self.seed, self.baseline)
+
+    def stats(self, config, runs=None):
+        # the config's first runs runs (all of them if None); a rung always scores the
+        # same chunks, so what's in the cache never changes which configs go on
+        total = RunStats()
+        for stats in self.cache.chunks(self.key(config))[:None if runs is None else -(-runs // CHUNK_RUNS)]:
+            total.merge(stats)
+        return total
+
+    def score(self, config, runs=None):
+        return loss(self.stats(config, runs).metrics(), self.goals)
+
+    def evaluate(self, configs, runs, pool):
+        # bring every config up to runs runs, playing only the chunks not cached
+        chunks = -(-runs // CHUNK_RUNS)
+        tasks = []
+        for config in configs:
+            key = self.key(config)
+            self.results[key] = config
+            self.reached[key] = max(runs, self.reached.get(key, 0))
+            tasks.extend((key, config, c) for c in range(len(self.cache.chunks(key)), chunks))
+        if not tasks:
+            return
+        args = [(config, self.strategy, self.skill, self.max_rounds, self.seed, c) for _, config, c in tasks]
+        if pool is None:
+            parts = [play_chunk(*a) for a in args]
+        else:
+            parts = list(pool.map(play_chunk, *zip(*args)))
+        # merged in chunk order, so the numbers don't depend on the number of workers
+        for (key, _, c), stats in zip(tasks, parts):
+            self.cache.chunks(key).append(stats)
+            self.played += stats.n
+
+    def race(self, configs, min_runs, max_runs, eta, pool, label):
+        # successive halving; returns the configs still in the race at the end
+        runs = min_runs
+        while True:
+            self.evaluate(configs, runs, pool)
+            configs = sorted(configs, key=lambda config: self.score(config, runs))
+            if self.progress:
+                self.progress(label, len(configs), runs, self.score(configs[0], runs))
+            if runs >= max_runs or len(configs) <= 1:
+                return configs
+            configs = configs[:max(1, math.ceil(len(configs) / eta))]
+            runs = min(max_runs, runs * eta)
+
+    def run(self, candidates=48, min_runs=500, max_runs=13_500, eta=3, refine=2):
+        rng = random.Random(f"luckyloop-opt-sample-{self.seed}")
+        pool = None
+        if self.workers != 1 and (self.workers or os.cpu_count() or 1) > 1:
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            best = self.race(sample(self.space, candidates, rng, self.baseline), min_runs, max_runs, eta,
+                             pool, "sample")
+            for step in range(refine):
+                top = best[:3]
+                seen = set()
+                fresh = []
+                for config in top:
+                    for other in neighbours(config, self.space):
+                        key = self.key(other)
+                        if key not in self.results and key not in seen:
+                            seen.add(key)
+                            fresh.append(other)
+                if not fresh:
+                    break
+                best = self.race(top + fresh, min_runs, max_runs, eta, pool, f"refine {step + 1}")
+            # the current values get the full runs too, to compare against
+            self.evaluate([self.baseline], max_runs, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self.ranking()
+
+    def reused(self):
+        # runs taken from the cache file instead of played
+        return sum(min(self.cache.loaded.get(key, 0), -(-runs // CHUNK_RUNS))
+                   for key, runs in self.reached.items()) * CHUNK_RUNS
+
+    def ranking(self):
+        # every config tried: the ones raced furthest first, then by loss
+        rows = []
+        for key, config in self.results.items():
+            stats = self.stats(config, self.reached[key])
+            metrics = stats.metrics()
+            rows.append({
+                "loss": loss(metrics, self.goals),
+                "runs": stats.n,
+                "metrics": metrics,
+                "changes": {k: v for k, v in config.items() if self.baseline[k] != v},
+                "config": config,
+                "current": config == self.baseline,
+            })
+        rows.sort(key=lambda r: (-r["runs"], r["loss"]))
+        return rows
+
+
+# Command line
+
+def parse_param(spec):
+    # name=a:b:step (inclusive) or name=a,b,c
+    name, sep, values = spec.partition("=")
+    if not sep:
+        raise ValueError(f"--param {spec!r} should be name=start:stop:step or name=a,b,c")
+    get_value(name)
+    if ":" in values:
+        start, stop, step = (float(v) for v in values.split(":"))
+        if step <= 0 or stop < start:
+            raise ValueError(f"--param {spec!r} needs start <= stop and step > 0")
+        out = [round(start + i * step, 10) for i in range(int(round((stop - start) / step)) + 1)]
+    else:
+        out = [float(v) for v in values.split(",")]
+    if all(v == int(v) for v in out) and isinstance(get_value(name), int):
+        out = [int(v) for v in out]
+    return name, out
+
+def parse_goal(spec):
+    metric, sep, value = spec.partition("=")
+    if not sep or metric not in METRICS:
+        raise ValueError(f"--goal {spec!r} should be metric=target with a metric from {', '.join(METRICS)}")
+    return metric, float(value)
+
+def print_progress(label, configs, runs, best):
+    print(f"  {label}: {configs} configs at {runs:,} runs, best loss {best:.4f}", file=sys.stderr)
+
+def print_report(rows, goals, top, seconds, played, reused):
+    print(f"{len(rows)} configs tried, {played:,} runs played and {reused:,} reused from the cache in {seconds:.1f}s")
+    header = f"  {'#':>3} {'loss':>8} {'runs':>7}  " + "  ".join(f"{m:>15}" for m in goals)
+    print(header)
+    print(f"  {'':>3} {'goal':>8} {'':>7}  " + "  ".join(f"{t:>15.3f}" for t in goals.values()))
+    current = next(r for r in rows if r["current"])
+    shown = rows[:top] + ([current] if current not in rows[:top] else [])
+    for i, r in enumerate(shown):
+        rank = "now" if r["current"] else str(rows.index(r) + 1)
+        values = "  ".join(f"{r['metrics'][m]:>15.3f}" for m in goals)
+        print(f"  {rank:>3} {r['loss']:>8.4f} {r['runs']:>7,}  {values}")
+        changes = ", ".join(f"{k}={v}" for k, v in sorted(r["changes"].items()))
+        print(f"        {changes or '(the current values)'}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Search LuckyLoop+ game values for target outcomes")
+    ap.add_argument("--param", action="append", default=[],
+                    help="name=start:stop:step or name=a,b,c (repeatable; default: a built-in grid)")
+    ap.add_argument("--goal", action="append", default=[],
+                    help=f"metric=target (repeatable), metrics: {', '.join(METRICS)}; default: "
+                         + ", ".join(f"{m}={t}" for m, t in GOALS.items()))
+    ap.add_argument("--strategy", default="tables",
+                    help=f"one of {', '.join(strategies.STRATEGIES)}, or module:attribute")
+    ap.add_argument("--skill", default=None, choices=sorted(engine.SKILLS), help="picked at every skill screen")
+    ap.add_argument("--max-rounds", type=int, default=1000)
+    ap.add_argument("--candidates", type=int, default=48, help="random configs to start from")
+    ap.add_argument("--min-runs", type=int, default=500, help="runs per config in the first rung")
+    ap.add_argument("--max-runs", type=int, default=13_500, help="runs per config in the last rung")
+    ap.add_argument("--eta", type=int, default=3, help="keep the best 1/eta and give them eta times the runs")
+    ap.add_argument("--refine", type=int, default=2, help="neighbourhood races after the first")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    ap.add_argument("--cache", default=CACHE_FILE)
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--json", help="also write every config tried to this file")
+    args = ap.parse_args()
+
+    try:
+        space = dict(parse_param(p) for p in args.param) if args.param else dict(SPACE)
+        goals = dict(parse_goal(g) for g in args.goal) if args.goal else dict(GOALS)
+        strategies.load(args.strategy)
+    except (ValueError, ImportError, AttributeError) as e:
+        ap.error(str(e))
+    if args.eta < 2 or args.min_runs < 1 or args.max_runs < args.min_runs:
+        ap.error("needs --eta >= 2 and 1 <= --min-runs <= --max-runs")
+
+    cache = Cache(None if args.no_cache else args.cache)
+    opt = Optimizer(space, goals, args.strategy, args.skill, args.max_rounds, args.seed, args.workers,
+                    cache, print_progress)
+    t0 = time.perf_counter()
+    rows = opt.run(args.candidates, args.min_runs, args.max_runs, args.eta, args.refine)
+    dt = time.perf_counter() - t0
+    cache.save()
+    print_report(rows, goals, args.top, dt, opt.played, opt.reused())
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"goals": goals, "space": space, "configs": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
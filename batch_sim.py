@@ -0,0 +1,257 @@
+# LuckyLoop+ batch round simulator
+# Plays N independent rounds at once with NumPy arrays, following the same rules
+# as engine.py: the LEVELS deck counts, dealer_hits_soft_17 and blackjack_payout,
+# the ENCOUNTERS effects and the SKILLS reward modifiers from resolve_round.
+# Each round is dealt from a freshly shuffled shoe (the game itself keeps one shoe
+# until the cut card), and the player hits under 17 or plays the strategy tables.
+#
+#   python batch_sim.py --rounds 10000000 --level 2 --skill "Reward Booster"
+
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from engine import (
+    LEVELS, SKILLS, ENCOUNTERS, ENCOUNTER_CHANCE, STARTING_BALANCE, BASE_BETS,
+    DEALER_STANDS_EARLY_AT, DEALER_SOFT_12_STANDS_AT, CLASS_VALUES, DECK_CLASS_COUNTS,
+    reward_multiplier
+)
+
+
+# Shoe layout: a shoe is a count per engine card class
+CLASS_VALUE = np.array(CLASS_VALUES, dtype=np.int16)
+DECK_COUNTS = np.array(DECK_CLASS_COUNTS, dtype=np.int16)
+
+WIN, PUSH, LOSS = 1, 0, -1
+NO_ENCOUNTER = -1
+
+# reward is what resolve_round logs; net also takes off the extra stake a double deducts
+BatchResult = namedtuple("BatchResult", ["encounter", "pv", "dv", "result", "reward", "net"])
+
+
+def _new_shoes(decks):
+    # counts are stored class-major (10 x n) so the per-draw cumsum runs over contiguous rows
+    counts = DECK_COUNTS[:, None] * decks[None, :].astype(np.int16)
+    remaining = decks.astype(np.int16) * 52
+    return counts, remaining
+
+def _draw(counts, remaining, rows, rng):
+    # one card per round in `rows`, drawn without replacement from that round's shoe
+    u = (rng.random(rows.size) * remaining[rows]).astype(np.int16)
+    c = counts[:, rows]
+    np.cumsum(c, axis=0, out=c)
+    cls = (c <= u).sum(axis=0, dtype=np.int16)
+    counts[cls, rows] -= 1
+    remaining[rows] -= 1
+    return cls
+
+def _add(total, soft, rows, cls):
+    # hands are a running total (aces as 11) plus the number of aces still counted as 11
+    t = total[rows] + CLASS_VALUE[cls]
+    s = soft[rows] + (cls == 0)
+    # one added card can need at most two aces dropped to 1
+    for _ in range(2):
+        fix = (t > 21) & (s > 0)
+        t -= 10 * fix
+        s -= fix
+    total[rows] = t
+    soft[rows] = s
+
+
+def _roll_encounters(n, rng, encounter_chance):
+    enc = np.full(n, NO_ENCOUNTER, dtype=np.int8)
+    hit = rng.random(n) < encounter_chance
+    enc[hit] = rng.integers(0, len(ENCOUNTERS), hit.sum())
+    return enc
+
+def _encounter_table(key, default):
+    # per-encounter effect lookup, indexed by encounter id + 1 (slot 0 = no encounter)
+    return np.array([default] + [e["effect"].get(key, default) for e in ENCOUNTERS])
+
+
+def _strategy_lookup(level, can_double, skill=None):
+    # strategy table for this level and skill, indexed by (encounter slot, soft, total, upcard)
+    import strategy_tables
+    table = np.frombuffer(strategy_tables.load_tables(), dtype=np.uint8)
+    table = table.reshape(len(strategy_tables.LEVEL_KEYS), len(strategy_tables.SKILL_SLOTS),
+                          len(strategy_tables.ENCOUNTER_SLOTS), 2, 2,
+                          strategy_tables.TOTALS, strategy_tables.UPCARDS)
+    return table[strategy_tables.LEVEL_KEYS.index(level), strategy_tables.skill_slot(skill), :, can_double]
+
+def simulate(n, level=1, skill=None, bet=None, balance=STARTING_BALANCE,
+             stand_on=17, strategy=False, encounter_chance=ENCOUNTER_CHANCE, rng=None):
+    # play n rounds; returns a BatchResult of per-round arrays
+    # the player hits under stand_on, or plays the strategy tables when strategy=True
+    rng = rng if rng is not None else np.random.default_rng()
+    conf = LEVELS[level]
+    bet = BASE_BETS.get(level, 15) if bet is None else bet
+
+    enc = _roll_encounters(n, rng, encounter_chance)
+    slot = enc.astype(np.int16) + 1
+
+    decks = np.maximum(1, conf["decks"] + _encounter_table("decks_delta", 0)[slot])
+    counts, remaining = _new_shoes(decks)
+
+    pv = np.zeros(n, dtype=np.int16); psoft = np.zeros(n, dtype=np.int16)
+    dv = np.zeros(n, dtype=np.int16); dsoft = np.zeros(n, dtype=np.int16)
+    pcards = np.full(n, 2, dtype=np.int16)
+    allrows = np.arange(n)
+
+    # deal in game order: p1, p2, d1, d2, then the Bonus Card extra
+    _add(pv, psoft, allrows, _draw(counts, remaining, allrows, rng))
+    _add(pv, psoft, allrows, _draw(counts, remaining, allrows, rng))
+    _add(dv, dsoft, allrows, _draw(counts, remaining, allrows, rng))
+    upcard = _draw(counts, remaining, allrows, rng)  # d1 is dealt face down
+    _add(dv, dsoft, allrows, upcard)
+    extra = np.flatnonzero(_encounter_table("player_extra_card", False)[slot])
+    if extra.size:
+        _add(pv, psoft, extra, _draw(counts, remaining, extra, rng))
+        pcards[extra] += 1
+
+    doubled = np.zeros(n, dtype=bool)
+    if strategy:
+        # player: strategy tables (double only when the balance covers it)
+        table = _strategy_lookup(level, int(balance >= bet), skill)
+        rows = np.flatnonzero(pv < 21)
+        while rows.size:
+            act = table[slot[rows], (psoft[rows] > 0).astype(np.intp), pv[rows], upcard[rows]]
+            dbl = rows[act == 2]
+            doubled[dbl] = True
+            rows = rows[act != 0]
+            if not rows.size:
+                break
+            _add(pv, psoft, rows, _draw(counts, remaining, rows, rng))
+            pcards[rows] += 1
+            rows = rows[(pv[rows] < 21) & ~doubled[rows]]
+    else:
+        # player: hit under stand_on
+        rows = np.flatnonzero(pv < stand_on)
+        while rows.size:
+            _add(pv, psoft, rows, _draw(counts, remaining, rows, rng))
+            pcards[rows] += 1
+            rows = rows[pv[rows] < stand_on]
+
+    # dealer: encounter stop thresholds override the normal stand-on-17 rule,
+    # and dealer_hits_soft_17 hits any 17 on a coin flip
+    stop = np.select(
+        [_encounter_table("dealer_stands_early", False)[slot],
+         _encounter_table("dealer_hits_soft_12", False)[slot]],
+        [DEALER_STANDS_EARLY_AT, DEALER_SOFT_12_STANDS_AT], 17
+    ).astype(np.int16)
+    overridden = stop != 17
+    dealer_natural = dv == 21
+    rows = allrows
+    while rows.size:
+        d = dv[rows]
+        draw = d < stop[rows]
+        if conf["dealer_hits_soft_17"]:
+            flip = (~overridden[rows]) & (d == 17)
+            draw[flip] = rng.random(int(flip.sum())) < 0.5
+        rows = rows[draw]
+        if rows.size:
+            _add(dv, dsoft, rows, _draw(counts, remaining, rows, rng))
+
+    # payout (engine.payout, vectorized)
+    skill_mult = reward_multiplier(skill, None)
+    mult = skill_mult * _encounter_table("payout_mult", 1)[slot]
+    p_black = (pcards == 2) & (pv == 21)
+    d_black = dealer_natural
+    # a double takes the extra stake up front and doubles the bet that gets paid out
+    stake = bet * (1 + doubled)
+    bj_reward = np.round(stake * conf["blackjack_payout"] * mult)
+
+    conds = [p_black & ~d_black, d_black & ~p_black, pv > 21, dv > 21, pv > dv, pv < dv]
+    result = np.select(conds, [WIN, LOSS, LOSS, WIN, WIN, LOSS], PUSH).astype(np.int8)
+    reward = np.select(conds, [bj_reward, -stake, -stake, stake, stake, -stake], 0).astype(np.float64)
+
+    if skill == "Safety Net":
+        safe = (result == LOSS) & (balance - bet * doubled + reward < 0)
+        reward[safe] = np.trunc(reward[safe] / 2)
+
+    reward = np.round(reward * mult).astype(np.int64)
+    return BatchResult(enc, pv, dv, result, reward, reward - bet * doubled)
+
+
+# Summaries
+
+def summarize(res, by_encounter=True):
+    n = len(res.result)
+    out = {
+        "rounds": n,
+        "win_rate": float(np.mean(res.result == WIN)) if n else 0.0,
+        "push_rate": float(np.mean(res.result == PUSH)) if n else 0.0,
+        "loss_rate": float(np.mean(res.result == LOSS)) if n else 0.0,
+        "avg_reward": float(np.mean(res.reward)) if n else 0.0,
+        "avg_net": float(np.mean(res.net)) if n else 0.0,
+    }
+    if by_encounter:
+        out["by_encounter"] = {}
+        for i, name in enumerate(["None"] + [e["name"] for e in ENCOUNTERS]):
+            m = res.encounter == i - 1
+            k = int(m.sum())
+            if k:
+                out["by_encounter"][name] = {
+                    "rounds": k,
+                    "win_rate": float(np.mean(res.result[m] == WIN)),
+                    "avg_reward": float(np.mean(res.reward[m])),
+                }
+    return out
+
+def run(rounds, chunk_size=250_000, seed=None, **kwargs):
+    # simulate in chunks so tens of millions of rounds fit in memory, merging the summaries
+    rng = np.random.default_rng(seed)
+    totals = None
+    done = 0
+    while done < rounds:
+        n = min(chunk_size, rounds - done)
+        s = summarize(simulate(n, rng=rng, **kwargs))
+        totals = s if totals is None else _merge(totals, s)
+        done += n
+    return totals
+
+def _merge(a, b):
+    n = a["rounds"] + b["rounds"]
+    out = {"rounds": n}
+    for k in ("win_rate", "push_rate", "loss_rate", "avg_reward", "avg_net"):
+        out[k] = (a[k] * a["rounds"] + b[k] * b["rounds"]) / n
+    enc = dict(a["by_encounter"])
+    for name, e in b["by_encounter"].items():
+        if name in enc:
+            o = enc[name]
+            m = o["rounds"] + e["rounds"]
+            enc[name] = {
+                "rounds": m,
+                "win_rate": (o["win_rate"] * o["rounds"] + e["win_rate"] * e["rounds"]) / m,
+                "avg_reward": (o["avg_reward"] * o["rounds"] + e["avg_reward"] * e["rounds"]) / m,
+            }
+        else:
+            enc[name] = e
+    out["by_encounter"] = enc
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulate LuckyLoop+ rounds in bulk")
+    ap.add_argument("--rounds", type=int, default=1_000_000)
+    ap.add_argument("--level", type=int, default=1, choices=sorted(LEVELS))
+    ap.add_argument("--skill", default=None, choices=sorted(SKILLS))
+    ap.add_argument("--bet", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--strategy", action="store_true", help="play the strategy tables instead of hit under 17")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    s = run(args.rounds, seed=args.seed, level=args.level, skill=args.skill, bet=args.bet,
+            strategy=args.strategy)
+    dt = time.perf_counter() - t0
+
+    print(f"Rounds: {s['rounds']:,} in {dt:.2f}s ({s['rounds']/dt:,.0f} rounds/s)")
+    print(f"Win rate: {s['win_rate']*100:.2f}%  Push: {s['push_rate']*100:.2f}%  Loss: {s['loss_rate']*100:.2f}%")
+    print(f"Average reward per round: {s['avg_reward']:.2f}  (net of double stakes: {s['avg_net']:.2f})")
+    for name, e in s["by_encounter"].items():
+        print(f"  {name:15s} {e['rounds']:>10,}  win {e['win_rate']*100:6.2f}%  avg reward {e['avg_reward']:8.2f}")
+
+if __name__ == "__main__":
+    main()
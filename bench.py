@@ -0,0 +1,415 @@
+# LuckyLoop+ benchmarks
+# Times the hot paths of the game: hand_value, the shoe at 1/2/4 decks, whole rounds
+# (engine only, and deal_new_round -> resolve_round through the pygame front end with
+# the animations and sounds switched off the way turbo mode does), log_round, and the
+# HUD and card rendering under SDL's dummy video driver. Every benchmark is run
+# several times after a calibration pass and reported as time per operation. Results
+# are saved as JSON together with the machine they ran on, and compare checks them
+# against a saved baseline and exits with 1 when something got slower.
+#
+#   python bench.py run --out baseline.json
+#   python bench.py run --compare baseline.json
+#   python bench.py compare baseline.json bench_results.json --threshold 0.1
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("LUCKYLOOP_AUDIO", "off")
+
+import argparse
+import datetime
+import fnmatch
+import gc
+import importlib.util
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import engine
+import results_log
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GAME_FILE = os.path.join(HERE, "Final Project.py")
+RESULTS_FILE = "bench_results.json"
+FORMAT_VERSION = 1
+SEED = 1051
+
+
+# Front end
+# "Final Project.py" can't be imported by name, so it is loaded from its path once and
+# started with the window on the dummy video driver. Its results.csv is left alone.
+
+_ui = None
+
+def load_ui():
+    global _ui
+    if _ui is None:
+        spec = importlib.util.spec_from_file_location("luckyloop_ui", GAME_FILE)
+        ui = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(ui)
+        ui.ensure_csv = lambda: None
+        cwd = os.getcwd()
+        os.chdir(HERE)    # asset paths are relative to the game folder
+        try:
+            ui.init_game()
+        finally:
+            os.chdir(cwd)
+        _ui = ui
+    return _ui
+
+
+# Benchmarks
+# Each one is set up once and returns run(n), which does n operations.
+
+def random_hands(rng, count=1000):
+    return [[engine.CARDS[rng.randrange(len(engine.CARDS))] for _ in range(rng.randint(2, 5))]
+            for _ in range(count)]
+
+def bench_hand_value():
+    hands = random_hands(random.Random(SEED))
+    k = len(hands)
+    def run(n):
+        hand_value = engine.hand_value
+        for i in range(n):
+            hand_value(hands[i % k])
+    return run
+
+def bench_shoe_reset(decks):
+    def setup():
+        shoe = engine.Shoe(decks, rng=random.Random(SEED))
+        def run(n):
+            for _ in range(n):
+                shoe.reset()
+        return run
+    return setup
+
+def bench_shoe_draw(decks):
+    # reshuffles included, as in play
+    def setup():
+        shoe = engine.Shoe(decks, rng=random.Random(SEED))
+        def run(n):
+            draw = shoe.draw
+            for _ in range(n):
+                draw()
+        return run
+    return setup
+
+def bench_engine_round():
+    state = engine.GameState(rng=random.Random(SEED))
+    def run(n):
+        for _ in range(n):
+            if state.game_over:
+                state.__init__(rng=state.rng)
+            engine.play_round(state)
+    return run
+
+def bench_frontend_round():
+    # one deal_new_round -> player moves -> resolve_round cycle through the front end;
+    # turbo mode skips the tweens and sounds, log_round is timed on its own below
+    ui = load_ui()
+    ui.log_round = lambda *a, **k: None
+    ui.game.__init__(rng=random.Random(SEED))
+    ui.turbo.on = True
+    ui.turbo.skill = None
+    def run(n):
+        for _ in range(n):
+            ui.turbo.play_round(ui.game)
+    return run
+
+def bench_log_round():
+    # log_round into a scratch results.csv, including the final flush to disk
+    folder = tempfile.mkdtemp(prefix="luckyloop-bench-")
+    results_log.RESULTS_DB = None
+    def run(n):
+        cwd = os.getcwd()
+        os.chdir(folder)
+        try:
+            for i in range(n):
+                results_log.log_round(i, 1, "Safety Net", "Lucky Streak", 19, 22, "win", 20, 120 + i,
+                                      persistent_skills=["Safety Net"])
+            results_log.close_log()
+            os.remove(results_log.CSV_FILE)
+        finally:
+            os.chdir(cwd)
+    return run
+
+def clear_table(ui):
+    # forget every drawn item (but the prebuilt buttons) so the next frame redraws it all
+    for name in list(ui.renderer.items):
+        if name != "buttons":
+            del ui.renderer.items[name]
+    ui.renderer.full = True
+
+def table_state(ui, seed=SEED):
+    # a finished round with every card landed and face up
+    state = ui.game
+    state.__init__(rng=random.Random(seed))
+    engine.play_round(state)
+    ui.view.new_round(reveal=True)
+    for hand, cards in (("player", state.player_cards), ("dealer", state.dealer_cards)):
+        ui.view.placed[hand] = ui.view.shown[hand] = len(cards)
+    ui.turbo.on = False
+    return state
+
+def bench_render_cold():
+    # a full repaint with every text surface rasterized again
+    ui = load_ui()
+    state = table_state(ui)
+    def run(n):
+        for _ in range(n):
+            clear_table(ui)
+            ui.text_cache.clear()
+            ui.draw_hud(state)
+            ui.draw_table(state)
+            ui.renderer.present()
+    return run
+
+def bench_render_warm():
+    # a full repaint with the text cache warm
+    ui = load_ui()
+    state = table_state(ui)
+    def run(n):
+        for _ in range(n):
+            clear_table(ui)
+            ui.draw_hud(state)
+            ui.draw_table(state)
+            ui.renderer.present()
+    return run
+
+def bench_render_cards():
+    # a new set of cards on the table each frame; only the card areas are repainted
+    ui = load_ui()
+    states = []
+    for seed in range(32):
+        state = table_state(ui, SEED + seed)
+        states.append((list(state.player_cards), list(state.dealer_cards)))
+    state = ui.game
+    clear_table(ui)
+    ui.draw_hud(state)
+    ui.draw_table(state)
+    ui.renderer.present()
+    def run(n):
+        for i in range(n):
+            player, dealer = states[i % len(states)]
+            state.player_cards = engine.Hand(player)
+            state.dealer_cards = engine.Hand(dealer)
+            for hand, cards in (("player", player), ("dealer", dealer)):
+                ui.view.placed[hand] = ui.view.shown[hand] = len(cards)
+            ui.draw_table(state)
+            ui.renderer.present()
+    return run
+
+def bench_render_idle():
+    # a frame where nothing changed
+    ui = load_ui()
+    state = table_state(ui)
+    clear_table(ui)
+    ui.draw_hud(state)
+    ui.draw_table(state)
+    ui.renderer.present()
+    def run(n):
+        for _ in range(n):
+            ui.draw_hud(state)
+            ui.draw_table(state)
+            ui.renderer.present()
+    return run
+
+# name -> setup function
+BENCHMARKS = {
+    "rules.hand_value": bench_hand_value,
+    **{f"shoe.reset[{d}]": bench_shoe_reset(d) for d in (1, 2, 4)},
+    **{f"shoe.draw[{d}]": bench_shoe_draw(d) for d in (1, 2, 4)},
+    "round.engine": bench_engine_round,
+    "round.frontend": bench_frontend_round,
+    "log.log_round": bench_log_round,
+    "render.hud_cold": bench_render_cold,
+    "render.hud_warm": bench_render_warm,
+    "render.cards": bench_render_cards,
+    "render.idle": bench_render_idle,
+}
+
+
+# Timing
+
+def time_run(run, n):
+    gc_was_on = gc.isenabled()
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        run(n)
+        return time.perf_counter() - t0
+    finally:
+        if gc_was_on:
+            gc.enable()
+
+def measure(run, repeat=5, min_time=0.2):
+    # pick n so one repeat takes about min_time seconds, then time repeat runs of n
+    n = 1
+    while True:
+        dt = time_run(run, n)
+        if dt >= min_time / 10:
+            break
+        n *= 10 if dt < min_time / 100 else 2
+    n = max(1, int(n * min_time / dt))
+    per_op = [time_run(run, n) / n for _ in range(repeat)]
+    median = statistics.median(per_op)
+    return {
+        "ops": n,
+        "repeat": repeat,
+        "median_ns": median * 1e9,
+        "min_ns": min(per_op) * 1e9,
+        "stdev_ns": statistics.stdev(per_op) * 1e9 if repeat > 1 else 0.0,
+        "ops_per_s": 1 / median,
+    }
+
+def machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    info = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "commit": commit,
+        "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+    }
+    if "pygame" in sys.modules:
+        info["pygame"] = sys.modules["pygame"].version.ver
+    return info
+
+def select(patterns):
+    if not patterns:
+        return list(BENCHMARKS)
+    return [name for name in BENCHMARKS if any(fnmatch.fnmatch(name, p) or p in name for p in patterns)]
+
+def run_benchmarks(names, repeat=5, min_time=0.2, progress=None):
+    results = {}
+    for name in names:
+        run = BENCHMARKS[name]()
+        results[name] = measure(run, repeat, min_time)
+        if progress:
+            progress(name, results[name])
+    return {"version": FORMAT_VERSION, "machine": machine_info(), "results": results}
+
+
+# Comparing
+
+def compare(baseline, current, threshold=0.10):
+    # rows of (name, baseline ns, current ns, ratio, status); a benchmark only counts as
+    # a regression when both its median and its best run are slower than the threshold,
+    # so one noisy repeat doesn't fail the check
+    rows = []
+    base, cur = baseline["results"], current["results"]
+    for name in cur:
+        if name not in base:
+            rows.append((name, None, cur[name]["median_ns"], None, "new"))
+            continue
+        b, c = base[name], cur[name]
+        ratio = c["median_ns"] / b["median_ns"]
+        if ratio > 1 + threshold and c["min_ns"] / b["min_ns"] > 1 + threshold:
+            status = "REGRESSION"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, b["median_ns"], c["median_ns"], ratio, status))
+    for name in base:
+        if name not in cur:
+            rows.append((name, base[name]["median_ns"], None, None, "missing"))
+    return rows
+
+def machine_differences(baseline, current):
+    keys = ("machine", "processor", "cpu_count", "python", "implementation", "video_driver")
+    a, b = baseline.get("machine", {}), current.get("machine", {})
+    return [(k, a.get(k), b.get(k)) for k in keys if a.get(k) != b.get(k)]
+
+
+# Output
+
+def fmt_ns(ns):
+    if ns is None:
+        return "-"
+    if ns >= 1e6:
+        return f"{ns/1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns/1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+def print_result(name, r):
+    print(f"  {name:<18} {fmt_ns(r['median_ns']):>10}/op  (best {fmt_ns(r['min_ns'])}, "
+          f"+-{r['stdev_ns']/r['median_ns']*100:.1f}%, {r['ops_per_s']:,.0f} ops/s)")
+
+def print_comparison(baseline, current, threshold):
+    for key, a, b in machine_differences(baseline, current):
+        print(f"warning: {key} differs (baseline {a!r}, now {b!r})", file=sys.stderr)
+    rows = compare(baseline, current, threshold)
+    print(f"  {'benchmark':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, b, c, ratio, status in rows:
+        change = f"{(ratio - 1) * 100:+.1f}%" if ratio is not None else "-"
+        print(f"  {name:<18} {fmt_ns(b):>10} {fmt_ns(c):>10} {change:>8}  {status}")
+    regressions = [r[0] for r in rows if r[4] == "REGRESSION"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {threshold:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"No regressions over {threshold:.0%}")
+    return not regressions
+
+def read_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark LuckyLoop+ and compare against a baseline")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="run benchmarks and save the results")
+    p.add_argument("patterns", nargs="*", help="only run benchmarks matching these (e.g. 'shoe.*' or render)")
+    p.add_argument("--out", default=RESULTS_FILE)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    p.add_argument("--compare", metavar="BASELINE", help="compare with a saved baseline afterwards")
+    p.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+
+    p = sub.add_parser("compare", help="compare two result files")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=0.10)
+
+    sub.add_parser("list", help="list the benchmarks")
+    args = ap.parse_args()
+
+    if args.command == "list":
+        for name in BENCHMARKS:
+            print(name)
+        return
+
+    if args.command == "compare":
+        ok = print_comparison(read_results(args.baseline), read_results(args.current), args.threshold)
+        sys.exit(0 if ok else 1)
+
+    names = select(args.patterns)
+    if not names:
+        print("No benchmarks match", " ".join(args.patterns), file=sys.stderr)
+        sys.exit(2)
+    baseline = read_results(args.compare) if args.compare else None
+    current = run_benchmarks(names, args.repeat, args.min_time, progress=print_result)
+    with open(args.out, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Saved {len(names)} results to {args.out}")
+    if baseline is not None:
+        sys.exit(0 if print_comparison(baseline, current, args.threshold) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# LuckyLoop+ card atlas
+# The 52 card faces and the card back, scaled to the table's card size and packed into
+# one image (card_atlas.png) with an index of where each card sits (card_atlas.json).
+# The game loads that single image and hands out subsurface views of it instead of
+# decoding and scaling 53 PNGs at every start. The atlas is rebuilt when the card
+# size changes or when any file in the card folder is added, removed or modified.
+# In lazy mode no atlas is used and each card is decoded the first time it's drawn.
+#
+#   python card_atlas.py --rebuild
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pygame
+
+from engine import RANK_MAP, SUITS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ATLAS_FILE = os.path.join(HERE, "card_atlas.png")
+INDEX_FILE = os.path.join(HERE, "card_atlas.json")
+INDEX_VERSION = 1
+
+CARD_FOLDER = os.path.join("Playing Cards", "PNG-cards-1.3")
+BACK_KEY = "back"
+BACK_FILES = ("card_back.png", "back.png", "cardback.png")
+COLUMNS = 13
+
+
+def card_keys():
+    # every face key ("ace_of_hearts", ...) in atlas order, then the back
+    return [f"{RANK_MAP[r]}_of_{s}" for s in SUITS for r in range(1, 14)] + [BACK_KEY]
+
+def candidates(key):
+    # file names to try for a card, best first
+    if key == BACK_KEY:
+        return list(BACK_FILES)
+    rank_name, suit = key.split("_of_")
+    names = []
+    if rank_name in ("jack", "queen", "king"):
+        names.append(f"{rank_name}_of_{suit}2.png")
+    names.append(f"{rank_name}_of_{suit}.png")
+    return names
+
+def find_sources(folder):
+    # {key: file name} for the cards that have an image, from one directory listing
+    try:
+        present = set(os.listdir(folder))
+    except OSError:
+        return {}
+    sources = {}
+    for key in card_keys():
+        for name in candidates(key):
+            if name in present:
+                sources[key] = name
+                break
+    return sources
+
+def _stamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def load_scaled(path, size):
+    img = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        img = img.convert_alpha()
+    elif img.get_bitsize() < 24:
+        # smoothscale needs 24/32-bit pixels; without a window convert by blitting
+        full = pygame.Surface(img.get_size(), pygame.SRCALPHA)
+        full.blit(img, (0, 0))
+        img = full
+    return pygame.transform.smoothscale(img, size)
+
+
+# Building
+
+def build_atlas(folder=CARD_FOLDER, size=(160, 230), atlas_path=ATLAS_FILE, index_path=INDEX_FILE):
+    # returns the index, or None when the folder has no card images
+    sources = find_sources(folder)
+    if not sources:
+        return None
+    w, h = size
+    keys = card_keys()
+    rows = -(-len(keys) // COLUMNS)
+    atlas = pygame.Surface((COLUMNS * w, rows * h), pygame.SRCALPHA)
+    slots = {}
+    stamps = {}
+    for i, key in enumerate(keys):
+        name = sources.get(key)
+        if name is None:
+            continue
+        path = os.path.join(folder, name)
+        try:
+            img = load_scaled(path, size)
+        except Exception as e:
+            print("Error loading:", path, e)
+            continue
+        x, y = (i % COLUMNS) * w, (i // COLUMNS) * h
+        atlas.blit(img, (x, y))
+        slots[key] = [x, y]
+        stamps[name] = _stamp(path)
+
+    index = {
+        "version": INDEX_VERSION,
+        "card_size": [w, h],
+        "folder": os.path.abspath(folder),
+        "folder_mtime": os.stat(folder).st_mtime_ns,
+        "sources": stamps,
+        "slots": slots,
+    }
+    tmp = atlas_path[:-4] + ".tmp.png"
+    pygame.image.save(atlas, tmp)
+    os.replace(tmp, atlas_path)
+    tmp = index_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path)
+    return index
+
+def index_is_current(index, folder, size):
+    # the atlas matches the folder if no file was added, removed or changed since
+    try:
+        if (index.get("version") != INDEX_VERSION or index.get("card_size") != list(size)
+                or index.get("folder") != os.path.abspath(folder)
+                or index.get("folder_mtime") != os.stat(folder).st_mtime_ns):
+            return False
+        return all(_stamp(os.path.join(folder, name)) == stamp for name, stamp in index["sources"].items())
+    except (OSError, KeyError, TypeError):
+        return False
+
+def read_index(index_path=INDEX_FILE):
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Loading
+
+class CardSheet:
+    def __init__(self, folder=CARD_FOLDER, size=(160, 230), lazy=False,
+                 atlas_path=ATLAS_FILE, index_path=INDEX_FILE):
+        self.folder = folder
+        self.size = tuple(size)
+        self.lazy = lazy
+        self.atlas = None
+        self.slots = {}
+        self.sources = None
+        self._loaded = {}    # lazy mode: key -> surface (None = no image)
+        if not lazy:
+            self._open_atlas(atlas_path, index_path)
+
+    def _open_atlas(self, atlas_path, index_path):
+        index = read_index(index_path)
+        if index is None or not index_is_current(index, self.folder, self.size) or not os.path.exists(atlas_path):
+            try:
+                index = build_atlas(self.folder, self.size, atlas_path, index_path)
+            except (OSError, pygame.error):
+                index = None  # read-only install: fall back to loading cards one by one
+            if index is None:
+                self.lazy = True
+                return
+        atlas = pygame.image.load(atlas_path)
+        if pygame.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+        self.atlas = atlas
+        self.slots = index["slots"]
+
+    def image(self, key):
+        # the scaled card surface for key, or None if there is no image for it
+        if not self.lazy:
+            slot = self.slots.get(key)
+            if slot is None:
+                return None
+            return self.atlas.subsurface(pygame.Rect(slot, self.size))
+        if key in self._loaded:
+            return self._loaded[key]
+        if self.sources is None:
+            self.sources = find_sources(self.folder)
+        img = None
+        name = self.sources.get(key)
+        if name:
+            path = os.path.join(self.folder, name)
+            try:
+                img = load_scaled(path, self.size)
+            except Exception as e:
+                print("Error loading:", path, e)
+        self._loaded[key] = img
+        return img
+
+    def back(self):
+        return self.image(BACK_KEY)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the LuckyLoop+ card atlas")
+    ap.add_argument("--folder", default=CARD_FOLDER)
+    ap.add_argument("--width", type=int, default=160)
+    ap.add_argument("--height", type=int, default=230)
+    ap.add_argument("--rebuild", action="store_true", help="rebuild even if the atlas is current")
+    args = ap.parse_args()
+
+    size = (args.width, args.height)
+    index = read_index()
+    if not args.rebuild and index is not None and index_is_current(index, args.folder, size):
+        print(f"{ATLAS_FILE} is up to date ({len(index['slots'])} cards)")
+        return
+    t0 = time.perf_counter()
+    index = build_atlas(args.folder, size)
+    if index is None:
+        print(f"No card images found in {args.folder}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Packed {len(index['slots'])} cards into {ATLAS_FILE} in {time.perf_counter()-t0:.2f}s")
+
+if __name__ == "__main__":
+    main()
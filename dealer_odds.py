@@ -0,0 +1,139 @@
+# LuckyLoop+ exact dealer odds
+# Computes the exact distribution of the dealer's final total for an upcard and
+# the remaining shoe, by recursing over every possible hole card and draw.
+# The dealer policies are the ones engine.dealer_play uses:
+#   - stand on 17
+#   - the level's dealer_hits_soft_17 (hits any 17 on a coin flip, like the game)
+#   - Dealer Mistake: draw until 14, Foggy Table: draw until 18
+# Results are memoized on (shoe counts, upcard, policy), so repeated queries are instant.
+#
+#   python dealer_odds.py --level 2 --encounter "Foggy Table"
+
+import argparse
+from collections import namedtuple
+from functools import lru_cache
+
+from engine import (
+    LEVELS, ENCOUNTERS, CLASS_VALUES, DECK_CLASS_COUNTS, dealer_stop_threshold
+)
+
+# stop_threshold: the encounter override (None = normal play)
+# hits_soft_17: draw on 17 with a 50% chance
+DealerPolicy = namedtuple("DealerPolicy", ["stop_threshold", "hits_soft_17"])
+
+STAND_17 = DealerPolicy(None, False)
+
+BUST = "bust"
+BLACKJACK = "blackjack"
+
+CLASS_NAMES = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10")
+
+
+def policy_for(level, encounter=None):
+    return DealerPolicy(dealer_stop_threshold(encounter), LEVELS[level]["dealer_hits_soft_17"])
+
+def full_shoe(decks=1):
+    return tuple(c * decks for c in DECK_CLASS_COUNTS)
+
+def remove_card(counts, cls):
+    if counts[cls] <= 0:
+        raise ValueError(f"no {CLASS_NAMES[cls]} left in the shoe")
+    return counts[:cls] + (counts[cls] - 1,) + counts[cls+1:]
+
+
+def _add(total, soft, cls):
+    total += CLASS_VALUES[cls]
+    soft += cls == 0
+    while total > 21 and soft:
+        total -= 10; soft -= 1
+    return total, soft
+
+def _draw_chance(total, policy):
+    if policy.stop_threshold is not None:
+        return 1.0 if total < policy.stop_threshold else 0.0
+    if total < 17:
+        return 1.0
+    if total == 17 and policy.hits_soft_17:
+        return 0.5
+    return 0.0
+
+@lru_cache(maxsize=None)
+def _play(counts, total, soft, policy):
+    # distribution of final totals from here, as a tuple of (outcome, probability)
+    out = {}
+    draw = _draw_chance(total, policy)
+    n = sum(counts)
+    if n == 0:
+        # the game reshuffles an empty shoe; dealers never get close, so just stand
+        draw = 0.0
+    if draw < 1.0:
+        key = BUST if total > 21 else total
+        out[key] = out.get(key, 0.0) + (1.0 - draw)
+    if draw > 0.0:
+        for cls, c in enumerate(counts):
+            if not c:
+                continue
+            t, s = _add(total, soft, cls)
+            p = draw * c / n
+            for k, v in _play(remove_card(counts, cls), t, s, policy):
+                out[k] = out.get(k, 0.0) + p * v
+    return tuple(sorted(out.items(), key=lambda kv: (isinstance(kv[0], str), kv[0])))
+
+@lru_cache(maxsize=None)
+def _dealer_outcomes(counts, upcard, policy):
+    out = {}
+    n = sum(counts)
+    for cls, c in enumerate(counts):
+        if not c:
+            continue
+        p = c / n
+        t, s = _add(*_add(0, 0, upcard), cls)
+        if t == 21:
+            # natural: the dealer never draws to 21, and it beats any non-blackjack 21
+            out[BLACKJACK] = out.get(BLACKJACK, 0.0) + p
+            continue
+        for k, v in _play(remove_card(counts, cls), t, s, policy):
+            out[k] = out.get(k, 0.0) + p * v
+    return tuple(out.items())
+
+def dealer_outcomes(counts, upcard, policy=STAND_17):
+    # counts: remaining shoe per card class, with the upcard already removed
+    # upcard: card class (0 = ace ... 9 = ten-valued)
+    # returns {final total or "bust" or "blackjack": probability}
+    return dict(_dealer_outcomes(tuple(counts), upcard, policy))
+
+def bust_chance(counts, upcard, policy=STAND_17):
+    return dealer_outcomes(counts, upcard, policy).get(BUST, 0.0)
+
+def cache_info():
+    return {"queries": _dealer_outcomes.cache_info(), "states": _play.cache_info()}
+
+def clear_cache():
+    _dealer_outcomes.cache_clear()
+    _play.cache_clear()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Exact dealer outcome odds for a fresh LuckyLoop+ shoe")
+    ap.add_argument("--level", type=int, default=1, choices=sorted(LEVELS))
+    ap.add_argument("--encounter", default=None, choices=[e["name"] for e in ENCOUNTERS])
+    ap.add_argument("--decks", type=int, default=None, help="default: the level's deck count")
+    args = ap.parse_args()
+
+    encounter = next((e for e in ENCOUNTERS if e["name"] == args.encounter), None)
+    decks = args.decks or LEVELS[args.level]["decks"]
+    if encounter and encounter["effect"].get("decks_delta"):
+        decks = max(1, decks + encounter["effect"]["decks_delta"])
+    policy = policy_for(args.level, encounter)
+    shoe = full_shoe(decks)
+
+    keys = sorted({k for up in range(10) for k in dealer_outcomes(remove_card(shoe, up), up, policy)},
+                  key=lambda k: (isinstance(k, str), k))
+    print(f"Level {args.level}, {decks} deck(s), {args.encounter or 'no encounter'}")
+    print("Up   " + "".join(f"{str(k):>10}" for k in keys))
+    for up in range(10):
+        dist = dealer_outcomes(remove_card(shoe, up), up, policy)
+        print(f"{CLASS_NAMES[up]:<5}" + "".join(f"{dist.get(k, 0.0)*100:9.2f}%" for k in keys))
+
+if __name__ == "__main__":
+    main()
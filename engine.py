@@ -0,0 +1,508 @@
+# LuckyLoop+ rules engine
+# The blackjack rules, level/skill/encounter tables and round flow with no pygame,
+# rendering or audio, so rounds can be simulated headless in batch jobs.
+# "Final Project.py" is the pygame front end built on top of this module.
+
+import random
+import uuid
+from collections import namedtuple
+
+
+# Game values
+
+STARTING_BALANCE = 300
+BASE_BETS = {1: 100, 2: 200, 3: 500}  # tutorial rounds start higher
+ROUNDS_PER_LEVEL = 5  # rounds to reach the goal before the level ends
+
+
+LEVELS = {
+    1: {"decks": 1, "dealer_hits_soft_17": False, "blackjack_payout": 1.5, "threshold": 500},
+    2: {"decks": 2, "dealer_hits_soft_17": True, "blackjack_payout": 1.33, "threshold": 1200},
+    3: {"decks": 4, "dealer_hits_soft_17": True, "blackjack_payout": 1.2, "threshold": 2500}
+}
+MAX_LEVEL = max(LEVELS.keys())
+
+ENCOUNTER_CHANCE = 0.18
+
+SKILLS = {
+    "Luck Charm": {"desc": "+5% illustrative win chance for this level", "type":"win_chance", "value":0.05},
+    "Card Peek": {"desc": "Reveal dealer's hole card for the level", "type":"peek", "value":None},
+    "Extra Double": {"desc": "Allow one extra double-down this level", "type":"extra_double", "value":1},
+    "Reward Booster": {"desc": "Multiply win rewards by 1.5 this level", "type":"reward_mult", "value":1.5},
+    "Safety Net": {"desc": "First loss that would drop below 0 is halved", "type":"safety_net", "value":None}
+}
+
+ENCOUNTERS = [
+    {"name":"Lucky Deck", "effect":{"decks_delta":-1}, "desc":"Fewer decks this round — easier!"},
+    {"name":"Dealer Mistake", "effect":{"dealer_stands_early":True}, "desc":"Dealer stands early this round"},
+    {"name":"High Stakes", "effect":{"payout_mult":2, "house_edge":0.05}, "desc":"Double payout but house edge increases"},
+    {"name":"Bonus Card", "effect":{"player_extra_card":True}, "desc":"Player draws an extra card automatically"},
+    {"name":"Foggy Table", "effect":{"dealer_hits_soft_12":True}, "desc":"Dealer hits more aggressively this round"},
+]
+
+# dealer stop totals for the encounters that override normal dealer play
+DEALER_STANDS_EARLY_AT = 14
+DEALER_SOFT_12_STANDS_AT = 18
+
+
+# Card helpers
+
+RANK_MAP = {
+    1: "ace", 2:"2", 3:"3", 4:"4", 5:"5", 6:"6", 7:"7",
+    8:"8", 9:"9", 10:"10", 11:"jack", 12:"queen", 13:"king"
+}
+SUITS = ["hearts", "spades", "diamonds", "clubs"]
+
+Card = namedtuple("Card", ["rank","suit","value"])
+def make_card(ridx, suit):
+    name = RANK_MAP[ridx]
+    if name == "ace": v = 11
+    elif name in ("jack","queen","king"): v = 10
+    else: v = int(name)
+    return Card(name, suit, v)
+
+# Cards are stored in the shoe as one-byte codes, (rank - 1) * 4 + suit index,
+# and every code maps to one shared Card, so dealing never allocates
+CARDS = tuple(make_card(r, s) for r in range(1,14) for s in SUITS)
+DECK_CODES = bytes(range(len(CARDS)))
+
+SHOE_PENETRATION = 0.75  # reshuffle once this share of the shoe has been dealt
+
+class Shoe:
+    # persists across rounds; deal_round calls start_round() to reshuffle at the cut card
+    def __init__(self, decks=1, rng=random, penetration=SHOE_PENETRATION):
+        self.rng = rng
+        self.penetration = penetration
+        self.codes = bytearray()
+        self.decks = 0
+        self.pos = 0
+        self.set_decks(decks)
+    def set_decks(self, decks):
+        # encounters change the deck count in place; a different count means a fresh shuffle
+        decks = max(1, decks)
+        if decks != self.decks:
+            self.decks = decks
+            self.reset()
+    def reset(self):
+        self.codes[:] = DECK_CODES * self.decks
+        self.rng.shuffle(self.codes)
+        self.pos = 0
+    def start_round(self):
+        if self.pos >= self.penetration * len(self.codes):
+            self.reset()
+    def draw(self):
+        if self.pos >= len(self.codes):
+            self.reset()
+        code = self.codes[self.pos]
+        self.pos += 1
+        return CARDS[code]
+    # the dealer's hits; the same as draw() except in tournament.PairedShoe
+    draw_dealer = draw
+    def remaining(self):
+        return len(self.codes) - self.pos
+    def class_counts(self):
+        # cards left per card class (see CLASS_VALUES), e.g. for dealer_odds
+        counts = [0] * 10
+        for code in self.codes[self.pos:]:
+            counts[min(code // 4, 9)] += 1
+        return tuple(counts)
+
+# Suits never matter to the rules, so simulators and odds tables work on card
+# classes: class 0 is the ace, classes 1-8 are 2-9 and class 9 is every ten-valued card.
+CLASS_VALUES = (11, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+DECK_CLASS_COUNTS = (4, 4, 4, 4, 4, 4, 4, 4, 4, 16)
+
+def card_class(card):
+    return 0 if card.value == 11 else card.value - 1
+
+class Hand:
+    # a hand that keeps its value up to date as cards are added, so checking the
+    # total, softness, blackjack or bust never rescans the cards; it also acts
+    # like the plain card list the front end draws from
+    __slots__ = ("cards", "total", "soft")
+
+    def __init__(self, cards=()):
+        self.cards = []
+        self.total = 0
+        self.soft = 0   # aces still counted as 11
+        for c in cards:
+            self.add(c)
+
+    def add(self, card):
+        self.cards.append(card)
+        self.total += card.value
+        if card.value == 11:
+            self.soft += 1
+        while self.total > 21 and self.soft:
+            self.total -= 10; self.soft -= 1
+    append = add
+
+    @property
+    def blackjack(self):
+        return self.total == 21 and len(self.cards) == 2
+
+    @property
+    def bust(self):
+        return self.total > 21
+
+    def __len__(self): return len(self.cards)
+    def __iter__(self): return iter(self.cards)
+    def __getitem__(self, i): return self.cards[i]
+    def __bool__(self): return bool(self.cards)
+    def __repr__(self): return f"Hand({self.cards!r}, total={self.total})"
+
+def hand_value(cards):
+    if isinstance(cards, Hand):
+        return cards.total
+    total = 0; aces = 0
+    for c in cards:
+        if c.rank == "ace":
+            aces += 1; total += 11
+        elif c.rank in ("jack","queen","king"):
+            total += 10
+        else:
+            total += int(c.rank)
+    while total > 21 and aces:
+        total -= 10; aces -= 1
+    return total
+
+def hand_total(cards):
+    # (value, aces still counted as 11); the hand is soft when the second item is > 0
+    if isinstance(cards, Hand):
+        return cards.total, cards.soft
+    total = 0; soft = 0
+    for c in cards:
+        total += c.value
+        soft += c.value == 11
+        while total > 21 and soft:
+            total -= 10; soft -= 1
+    return total, soft
+
+
+# Encounters
+
+def roll_encounter(rng=random):
+    if rng.random() < ENCOUNTER_CHANCE:
+        return rng.choice(ENCOUNTERS)
+    return None
+
+
+# Game state
+
+class GameState:
+    shoe_class = Shoe
+
+    def __init__(self, persistent_skills=None, rng=None):
+        # skills persist between games
+        self.active_skills = persistent_skills or []
+        # a new id for every game (restarts included), used by the results store
+        self.run_id = uuid.uuid4().hex
+
+        # every shuffle, encounter roll and coin flip uses this RNG (the global
+        # random module unless a seeded random.Random is passed); a restart
+        # through __init__ keeps the existing stream
+        if rng is not None:
+            self.rng = rng
+        elif not hasattr(self, "rng"):
+            self.rng = random
+
+        # round-specific values
+        self.balance = STARTING_BALANCE
+        self.level = 1
+        self.round_no = 0
+        self.level_round_no = 0
+        self.max_rounds_per_level = ROUNDS_PER_LEVEL
+        self.shoe = self.shoe_class(LEVELS[self.level]["decks"], self.rng)
+        self.player_skill = None
+        self.skill_used_flags = {}
+        self.encounter = None
+        self.game_over = False
+        self.player_cards = Hand()
+        self.dealer_cards = Hand()
+        self.current_bet = BASE_BETS.get(self.level, 15)
+        self.in_round = False
+        self.reveal_dealer = False
+        self.local_shoe = None
+
+    def start_level(self, level):
+        self.level = level
+        self.level_round_no = 0
+        conf = LEVELS[level]
+        self.shoe.set_decks(conf["decks"])
+        self.player_skill = None
+        self.skill_used_flags = {}
+        self.encounter = None
+        self.game_over = False
+        self.current_bet = BASE_BETS.get(self.level, 15)
+        self.in_round = False
+        self.reveal_dealer = False
+
+
+# Round flow
+# Each step only changes the GameState; callers (the pygame front end or a batch
+# job) decide what to animate, play or log in between.
+
+LEVEL_UP = "level_up"
+GAME_OVER = "game_over"
+
+RoundResult = namedtuple("RoundResult", [
+    "round_no", "level", "skill", "encounter",
+    "pv", "dv", "result", "reward", "balance"
+])
+
+def deal_round(state: GameState):
+    # returns False when no round could be dealt (game over or bet not covered)
+    if state.game_over:
+        return False
+    if state.balance < state.current_bet:
+        state.game_over = True
+        return False
+    # increment both global and level-specific round counters
+    state.round_no += 1
+    state.level_round_no += 1
+
+    conf = LEVELS[state.level]
+
+    enc = roll_encounter(state.rng)
+    state.encounter = enc
+
+    # determine decks for this round
+    decks = conf["decks"]
+    if enc and enc["effect"].get("decks_delta"):
+        decks = max(1, decks + enc["effect"]["decks_delta"])
+    local_shoe = state.shoe
+    local_shoe.set_decks(decks)
+    local_shoe.start_round()
+    state.local_shoe = local_shoe
+
+    p1 = local_shoe.draw()
+    p2 = local_shoe.draw()
+    d1 = local_shoe.draw()
+    d2 = local_shoe.draw()
+    state.player_cards = Hand((p1, p2))
+    state.dealer_cards = Hand((d1, d2))
+
+    # optional extra card when encounter
+    if enc and enc["effect"].get("player_extra_card"):
+        state.player_cards.append(local_shoe.draw())
+
+    state.in_round = True
+    state.reveal_dealer = (state.player_skill == "Card Peek")
+    return True
+
+def check_level_rounds(state: GameState):
+    # after max_rounds_per_level the player either advances or it's game over
+    conf = LEVELS[state.level]
+    if state.level_round_no > state.max_rounds_per_level:
+        if state.balance >= conf["threshold"]:
+            if state.level < MAX_LEVEL:
+                state.start_level(state.level + 1)
+                return LEVEL_UP
+            # no higher level; just reset rounds for replay
+            state.level_round_no = 0
+        else:
+            state.game_over = True
+            return GAME_OVER
+    return None
+
+def hit(state: GameState):
+    if not state.in_round: return None
+    card = state.local_shoe.draw()
+    state.player_cards.append(card)
+    return card
+
+def double_down(state: GameState):
+    # player must have enough to DOUBLE the bet; the card itself is drawn by hit()
+    if not state.in_round or state.balance < state.current_bet:
+        return False
+    state.balance -= state.current_bet
+    state.current_bet *= 2
+    return True
+
+def dealer_stop_threshold(encounter):
+    if encounter and encounter["effect"].get("dealer_stands_early"):
+        return DEALER_STANDS_EARLY_AT
+    if encounter and encounter["effect"].get("dealer_hits_soft_12"):
+        return DEALER_SOFT_12_STANDS_AT
+    return None
+
+def dealer_play(state: GameState, on_card=None):
+    # on_card(card) is called after each dealer draw (the front end animates it)
+    dealer_hits_soft_17 = LEVELS[state.level]["dealer_hits_soft_17"]
+    stop_threshold = dealer_stop_threshold(state.encounter)
+    while True:
+        dv = state.dealer_cards.total
+        if stop_threshold is not None:
+            draw = dv < stop_threshold
+        elif dv < 17:
+            draw = True
+        else:
+            draw = dv == 17 and dealer_hits_soft_17 and state.rng.random() < 0.5
+        if not draw:
+            break
+        card = state.local_shoe.draw_dealer()
+        state.dealer_cards.append(card)
+        if on_card:
+            on_card(card)
+
+def reward_multiplier(skill, encounter):
+    reward_mult = 1.0
+    if skill:
+        sk = SKILLS.get(skill)
+        if sk and sk["type"] == "reward_mult":
+            reward_mult *= sk["value"]
+    if encounter and encounter["effect"].get("payout_mult"):
+        reward_mult *= encounter["effect"]["payout_mult"]
+    return reward_mult
+
+def payout(pv, dv, p_black, d_black, bet, balance, conf, skill=None, encounter=None):
+    # returns (result, reward) for a finished hand
+    reward_mult = reward_multiplier(skill, encounter)
+
+    if p_black and not d_black:
+        result = "win"; reward = int(round(bet * conf["blackjack_payout"] * reward_mult))
+    elif d_black and not p_black:
+        result = "loss"; reward = -bet
+    elif pv > 21:
+        result = "loss"; reward = -bet
+    elif dv > 21:
+        result = "win"; reward = bet
+    elif pv > dv:
+        result = "win"; reward = bet
+    elif pv < dv:
+        result = "loss"; reward = -bet
+    else:
+        result = "push"; reward = 0
+
+    # safety net
+    if skill == "Safety Net" and result == "loss" and (balance + reward) < 0:
+        reward = int(reward / 2)
+
+    reward = int(round(reward * reward_mult))
+    return result, reward
+
+def settle_round(state: GameState):
+    # pay out a hand the dealer has finished playing
+    pv = state.player_cards.total
+    dv = state.dealer_cards.total
+    p_black = state.player_cards.blackjack
+    d_black = state.dealer_cards.blackjack
+    result, reward = payout(pv, dv, p_black, d_black, state.current_bet, state.balance,
+                            LEVELS[state.level], state.player_skill, state.encounter)
+    state.balance += reward
+    state.in_round = False
+    state.reveal_dealer = True
+    return RoundResult(
+        state.round_no, state.level, state.player_skill or "",
+        (state.encounter["name"] if state.encounter else ""),
+        pv, dv, result, reward, state.balance
+    )
+
+def advance_level(state: GameState):
+    # level up as soon as the balance reaches the threshold
+    if state.balance >= LEVELS[state.level]["threshold"] and state.level < MAX_LEVEL:
+        state.start_level(state.level + 1)
+        return True
+    return False
+
+def check_bankrupt(state: GameState):
+    if state.balance <= 0:
+        state.game_over = True
+        return True
+    return False
+
+
+# Between rounds (the +/- buttons and the skill screen)
+
+BET_STEP = 50
+MIN_BET = 10
+
+def raise_bet(state: GameState):
+    if state.current_bet + BET_STEP <= state.balance:
+        state.current_bet += BET_STEP
+
+def lower_bet(state: GameState):
+    if state.current_bet - BET_STEP >= MIN_BET:
+        state.current_bet -= BET_STEP
+
+def bet_towards(state: GameState, amount):
+    # step the bet toward amount the way the +/- buttons would (BET_STEP at a time, same limits)
+    while amount >= state.current_bet + BET_STEP and state.current_bet + BET_STEP <= state.balance:
+        state.current_bet += BET_STEP
+    while amount <= state.current_bet - BET_STEP and state.current_bet - BET_STEP >= MIN_BET:
+        state.current_bet -= BET_STEP
+
+def choose_skill(state: GameState, skill):
+    # skill = None for no skill
+    state.player_skill = skill
+    state.skill_used_flags = {}
+
+def restart(state: GameState, keep_skills=True):
+    # a new game on the same random stream; the game over screen keeps the unlocked
+    # skills, the R key starts over with nothing
+    state.__init__(persistent_skills=state.active_skills if keep_skills else None)
+
+
+# Headless play
+
+def hit_under_17(state: GameState):
+    # the N-key autoplay: hit below 17, then stand
+    return "hit" if state.player_cards.total < 17 else "stand"
+
+def play_hand(state: GameState, decide=hit_under_17):
+    # run the player's decisions for a dealt hand; stops on stand, double or bust
+    while state.in_round:
+        action = decide(state)
+        if action == "hit":
+            hit(state)
+            if state.player_cards.bust:
+                return
+        elif action == "double":
+            if double_down(state):
+                hit(state)
+            return
+        else:
+            return
+
+def play_round(state: GameState, decide=hit_under_17):
+    # one full round without any UI; returns the RoundResult, or None if no hand was settled
+    if not deal_round(state):
+        return None
+    if check_level_rounds(state):
+        return None
+    play_hand(state, decide)
+    dealer_play(state)
+    res = settle_round(state)
+    advance_level(state)
+    check_bankrupt(state)
+    return res
+
+RunResult = namedtuple("RunResult", ["rounds", "max_level", "final_balance", "peak_balance", "cleared"])
+
+def no_skill(state: GameState):
+    # the Esc choice on the skill screen
+    return None
+
+def play_run(state: GameState, decide=hit_under_17, choose_skill=no_skill, max_rounds=1000, bet=None):
+    # a whole game from a fresh GameState until game over (or max_rounds, since
+    # the last level can be replayed forever); choose_skill stands in for choose_skill_ui
+    # and bet(state), if given, is the bet wanted before each round (None = keep it)
+    state.player_skill = choose_skill(state)
+    max_level = state.level
+    peak = state.balance
+    cleared = False
+    while not state.game_over and state.round_no < max_rounds:
+        level = state.level
+        if bet is not None:
+            amount = bet(state)
+            if amount is not None:
+                bet_towards(state, amount)
+        play_round(state, decide)
+        if state.level != level and not state.game_over:
+            state.player_skill = choose_skill(state)
+        max_level = max(max_level, state.level)
+        peak = max(peak, state.balance)
+        # the last level's goal reached at least once
+        if state.level == MAX_LEVEL and state.balance >= LEVELS[MAX_LEVEL]["threshold"]:
+            cleared = True
+    return RunResult(state.round_no, max_level, state.balance, peak, cleared)
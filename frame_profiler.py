@@ -0,0 +1,111 @@
+# LuckyLoop+ frame profiler
+# Splits each frame's work into named phases (event handling, HUD, cards, display
+# update, ...) with one perf_counter call per phase boundary. Keeps the last few
+# hundred frames for percentiles and per-phase averages, counts dropped frames (a
+# frame started more than 1.5 frame budgets after the previous one) and can write
+# every frame to a CSV file. Does nothing until enabled.
+
+import csv
+import time
+from collections import deque
+
+# every phase any screen reports, in CSV column order
+PHASES = ("events", "animations", "turbo", "hud", "dealer", "player", "hint", "present", "draw", "flip")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+class FrameProfiler:
+    def __init__(self, budget=1/60, window=600, phases=PHASES):
+        self.enabled = False
+        self.budget = budget
+        self.phases = phases
+        self.index = {p: i for i, p in enumerate(phases)}
+        self.recent = deque(maxlen=window)   # (work seconds, per-phase seconds) per frame
+        self.frames = 0
+        self.dropped = 0
+        self.t0 = time.perf_counter()
+        self._start = None      # when the current frame started
+        self._last_start = None
+        self._t = None          # last phase boundary
+        self._row = None
+        self._screen = None
+        self._file = None
+        self._writer = None
+        self._pending = []
+
+    def start_frame(self, screen="table"):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._last_start is not None and now - self._last_start > 1.5 * self.budget:
+            self.dropped += 1
+        self._start = self._last_start = self._t = now
+        self._row = [0.0] * len(self.phases)
+        self._screen = screen
+
+    def mark(self, phase):
+        # the time since the last mark (or the frame start) was spent in phase
+        if self._t is None:
+            return
+        now = time.perf_counter()
+        self._row[self.index[phase]] += now - self._t
+        self._t = now
+
+    def end_frame(self):
+        if self._start is None:
+            return
+        work = time.perf_counter() - self._start
+        self.frames += 1
+        self.recent.append((work, self._row))
+        if self._writer is not None:
+            self._pending.append([self.frames, self._screen, f"{(self._start - self.t0)*1000:.3f}",
+                                  f"{work*1000:.3f}"] + [f"{v*1000:.3f}" for v in self._row])
+            if len(self._pending) >= 120:
+                self.flush()
+        self._start = self._t = None
+
+    def pause(self):
+        # forget the last frame start, so time spent outside the frame loops
+        # (loading, a blocking dialog) isn't counted as a dropped frame
+        self._last_start = None
+
+    def summary(self):
+        work = sorted(w for w, _ in self.recent)
+        n = len(self.recent) or 1
+        means = [sum(row[i] for _, row in self.recent) / n for i in range(len(self.phases))]
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "p50_ms": percentile(work, 50) * 1000,
+            "p95_ms": percentile(work, 95) * 1000,
+            "p99_ms": percentile(work, 99) * 1000,
+            "phase_ms": {p: m * 1000 for p, m in zip(self.phases, means) if m > 0},
+        }
+
+    # Export
+
+    def export(self, path):
+        # write every frame from now on to a CSV file (times in ms)
+        self.close()
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(["frame", "screen", "start_ms", "work_ms"] + list(self.phases))
+        self.enabled = True
+
+    def flush(self):
+        if self._writer is not None and self._pending:
+            self._writer.writerows(self._pending)
+            self._file.flush()
+        self._pending = []
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = self._writer = None
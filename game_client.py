@@ -0,0 +1,161 @@
+# LuckyLoop+ game server client
+# Connection is a blocking client for one request at a time (what the pygame front end
+# needs). RemoteRules stands in for the engine functions the front end's round flow
+# calls (deal_round, hit, dealer_play, settle_round, ...): the player's moves are
+# sent to the server, whose reply lists the engine calls it made (see protocol.py),
+# and each call here takes the next of them and applies its result to the front end's
+# own GameState, which then only mirrors the server's game. The front end animates
+# and logs it as usual without knowing where the cards came from.
+#
+#   LUCKYLOOP_SERVER=127.0.0.1:7777 python "Final Project.py"
+#   LUCKYLOOP_SERVER=/tmp/luckyloop.sock python "Final Project.py"
+
+import socket
+from collections import deque
+
+from engine import CARDS, RoundResult
+from protocol import encode, decode, parse_address, apply_snapshot, hand_from
+
+
+class ServerError(Exception):
+    pass
+
+
+class Connection:
+    def __init__(self, address, timeout=10.0):
+        kind, *where = parse_address(address)
+        if kind == "unix":
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(where[0])
+        else:
+            self.sock = socket.create_connection(tuple(where), timeout=timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def request(self, op, **fields):
+        self.sock.sendall(encode(dict(fields, op=op)))
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("the game server closed the connection")
+        reply = decode(line)
+        if not reply.get("ok"):
+            raise ServerError(reply.get("error", "request failed"))
+        return reply
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class RemoteRules:
+    # the engine's round flow functions, played on the server
+    def __init__(self, conn, seed=None):
+        self.conn = conn
+        reply = conn.request("new", **({} if seed is None else {"seed": seed}))
+        self.session = reply["session"]
+        self.snapshot = reply["state"]
+        self.pending = deque()
+
+    def start(self, state):
+        # show the new session's game in state
+        apply_snapshot(state, self.snapshot)
+
+    def _step(self, name, action=None, **fields):
+        # the next result from the server, asking for it with action when none is waiting
+        if not self.pending:
+            if action is None:
+                raise ServerError(f"{name} called with no server step waiting")
+            reply = self.conn.request("act", session=self.session, action=action, **fields)
+            self.pending.extend(reply["steps"])
+            self.snapshot = reply["state"]
+        step = self.pending.popleft() if self.pending else None
+        if step is None or step[0] != name:
+            raise ServerError(f"out of step with the server: expected {name}, got {step and step[0]}")
+        return step
+
+    def _sync(self, state):
+        # once an action's steps are used up, take the whole state the server ended with
+        if not self.pending:
+            apply_snapshot(state, self.snapshot)
+
+    def deal_round(self, state):
+        step = self._step("deal_round", "deal")
+        apply_snapshot(state, step[2] or self.snapshot)
+        self._sync(state)
+        return step[1]
+
+    def check_level_rounds(self, state):
+        screen = self._step("check_level_rounds")[1]
+        self._sync(state)
+        return screen
+
+    def hit(self, state):
+        code = self._step("hit", "hit")[1]
+        card = None
+        if code is not None:
+            card = CARDS[code]
+            state.player_cards.append(card)
+        self._sync(state)
+        return card
+
+    def double_down(self, state):
+        _, ok, state.balance, state.current_bet = self._step("double_down", "double")
+        self._sync(state)
+        return ok
+
+    def dealer_play(self, state, on_card=None):
+        # the whole hand comes back at once (with the hole card); on_card is still
+        # called for every card the dealer drew
+        codes = self._step("dealer_play", "stand")[1]
+        known = len(state.dealer_cards)
+        state.dealer_cards = hand_from(codes[:known])
+        for code in codes[known:]:
+            card = CARDS[code]
+            state.dealer_cards.append(card)
+            if on_card:
+                on_card(card)
+        self._sync(state)
+
+    def settle_round(self, state):
+        res = RoundResult(*self._step("settle_round")[1])
+        state.balance = res.balance
+        state.in_round = False
+        state.reveal_dealer = True
+        self._sync(state)
+        return res
+
+    def advance_level(self, state):
+        leveled = self._step("advance_level")[1]
+        self._sync(state)
+        return leveled
+
+    def check_bankrupt(self, state):
+        bankrupt = self._step("check_bankrupt")[1]
+        if bankrupt:
+            state.game_over = True
+        self._sync(state)
+        return bankrupt
+
+    def raise_bet(self, state):
+        self._step("raise_bet", "bet_up")
+        self._sync(state)
+
+    def lower_bet(self, state):
+        self._step("lower_bet", "bet_down")
+        self._sync(state)
+
+    def choose_skill(self, state, skill):
+        self._step("choose_skill", "skill", skill=skill)
+        self._sync(state)
+
+    def restart(self, state, keep_skills=True):
+        self._step("restart", "restart" if keep_skills else "reset")
+        self._sync(state)
+
+    def close(self):
+        try:
+            self.conn.request("close", session=self.session)
+        except (OSError, ServerError):
+            pass
+        self.conn.close()
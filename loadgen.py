@@ -0,0 +1,222 @@
+# LuckyLoop+ server load generator
+# Opens --clients connections, each playing --sessions games at once over its one
+# connection (requests carry ids, so they're pipelined), every game played by the
+# strategy tables on a local copy of the state the server sends back. Reports the
+# requests and rounds per second, the round-trip latency percentiles seen by the
+# clients, the server's own handling time, and its memory per session.
+#
+#   python loadgen.py --spawn --clients 50 --sessions 40 --rounds 50
+#   python loadgen.py --address /tmp/luckyloop.sock --duration 30
+#   python loadgen.py --spawn --hold 10000      (also keep 10,000 idle sessions open)
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import engine
+import strategy_tables
+from protocol import DEFAULT_HOST, DEFAULT_PORT, MAX_LINE, encode, decode, parse_address, apply_snapshot
+
+
+class AsyncConnection:
+    # many requests in flight on one connection, matched to their replies by id
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = {}
+        self.next_id = 0
+        self.latencies = []   # seconds per request
+        self.listener = asyncio.ensure_future(self.listen())
+
+    @classmethod
+    async def open(cls, address):
+        kind, *where = parse_address(address)
+        if kind == "unix":
+            reader, writer = await asyncio.open_unix_connection(where[0], limit=MAX_LINE)
+        else:
+            reader, writer = await asyncio.open_connection(*where, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    async def listen(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                reply = decode(line)
+                future = self.waiting.pop(reply.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        finally:
+            for future in self.waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("the game server closed the connection"))
+
+    async def request(self, op, **fields):
+        self.next_id += 1
+        rid = self.next_id
+        future = self.waiting[rid] = asyncio.get_running_loop().create_future()
+        t0 = time.perf_counter()
+        self.writer.write(encode(dict(fields, op=op, id=rid)))
+        reply = await future
+        self.latencies.append(time.perf_counter() - t0)
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error"))
+        return reply
+
+    async def close(self):
+        self.listener.cancel()
+        self.writer.close()
+
+
+async def play_session(conn, seed, rounds, deadline, skills):
+    # one bot game: strategy-table moves, a random skill at every skill screen,
+    # restarting after every game over; returns the rounds played
+    bot = random.Random(seed)
+    state = engine.GameState()   # only a mirror of the server's game
+    reply = await conn.request("new", seed=seed)
+    sid = reply["session"]
+    apply_snapshot(state, reply["state"])
+
+    async def act(action, **fields):
+        reply = await conn.request("act", session=sid, action=action, **fields)
+        apply_snapshot(state, reply["state"])
+        return {step[0]: step[1] for step in reply["steps"] if len(step) > 1}
+
+    played = 0
+    await act("skill", skill=bot.choice(skills))
+    while played < rounds and time.perf_counter() < deadline:
+        results = await act("deal")
+        if state.game_over:
+            await act("restart")
+            await act("skill", skill=bot.choice(skills))
+            continue
+        if results.get("check_level_rounds") == engine.LEVEL_UP:
+            await act("skill", skill=bot.choice(skills))
+            continue
+        while state.in_round:
+            results = await act(strategy_tables.decide(state))
+        played += 1
+        if results.get("advance_level"):
+            await act("skill", skill=bot.choice(skills))
+        if state.game_over:
+            await act("restart")
+            await act("skill", skill=bot.choice(skills))
+    await conn.request("close", session=sid)
+    return played
+
+async def run_client(address, first_seed, sessions, rounds, deadline):
+    conn = await AsyncConnection.open(address)
+    skills = list(engine.SKILLS) + [None]
+    try:
+        played = await asyncio.gather(*(play_session(conn, first_seed + i, rounds, deadline, skills)
+                                        for i in range(sessions)))
+    finally:
+        await conn.close()
+    return sum(played), conn.latencies
+
+async def hold_sessions(address, n):
+    # idle sessions, to see what the server's memory does with many of them open
+    conn = await AsyncConnection.open(address)
+    await asyncio.gather(*(conn.request("new") for _ in range(n)))
+    return conn
+
+async def load_test(address, clients, sessions, rounds, duration, seed, hold):
+    control = await AsyncConnection.open(address)
+    before = (await control.request("stats"))
+    held = await hold_sessions(address, hold) if hold else None
+    holding = (await control.request("stats")) if hold else None
+    deadline = time.perf_counter() + duration if duration else float("inf")
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*(run_client(address, seed * 1_000_003 + c * sessions, sessions, rounds, deadline)
+                                     for c in range(clients)))
+    dt = time.perf_counter() - t0
+    after = await control.request("stats")
+    if held:
+        await held.close()
+    await control.close()
+    latencies = sorted(l for _, ls in results for l in ls)
+    return {
+        "clients": clients,
+        "sessions": clients * sessions,
+        "seconds": dt,
+        "rounds": sum(r for r, _ in results),
+        "requests": len(latencies),
+        "latency_us": {p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1e6
+                       for p in (50, 90, 99, 99.9)} if latencies else {},
+        "latency_max_us": latencies[-1] * 1e6 if latencies else None,
+        "server": after,
+        "held_sessions": hold,
+        "kb_per_session": ((holding["rss_kb"] - before["rss_kb"]) / hold
+                           if hold and holding["rss_kb"] is not None else None),
+    }
+
+
+def spawn_server():
+    # a server on a temporary Unix socket (TCP on systems without them)
+    here = os.path.dirname(os.path.abspath(__file__))
+    if hasattr(asyncio, "start_unix_server") and os.name == "posix":
+        address = os.path.join(tempfile.mkdtemp(prefix="luckyloop-"), "server.sock")
+        args = ["--unix", address]
+    else:
+        address = f"{DEFAULT_HOST}:{DEFAULT_PORT + 1}"
+        args = ["--port", str(DEFAULT_PORT + 1)]
+    proc = subprocess.Popen([sys.executable, os.path.join(here, "server.py"), *args],
+                            stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()   # the "server on ..." line once it listens
+    return proc, address
+
+def print_report(r):
+    s = r["server"]
+    print(f"{r['clients']} clients, {r['sessions']:,} sessions: {r['rounds']:,} rounds, "
+          f"{r['requests']:,} requests in {r['seconds']:.2f}s")
+    print(f"  {r['requests']/r['seconds']:,.0f} requests/s, {r['rounds']/r['seconds']:,.0f} rounds/s")
+    if r["latency_us"]:
+        print("  round trip: " + ", ".join(f"p{p:g} {us:,.0f} us" for p, us in r["latency_us"].items())
+              + f", max {r['latency_max_us']:,.0f} us")
+    print(f"  server: {s['handle_us']:.1f} us per request on average (max {s['handle_max_us']:,.0f} us), "
+          f"{s['errors']} errors, {s['rss_kb'] or 0:,} KB resident")
+    if r["kb_per_session"] is not None:
+        print(f"  {r['held_sessions']:,} idle sessions took {r['kb_per_session']:.1f} KB each")
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test a LuckyLoop+ game server")
+    ap.add_argument("--address", default=f"{DEFAULT_HOST}:{DEFAULT_PORT}", help="host:port or a Unix socket path")
+    ap.add_argument("--spawn", action="store_true", help="start a server of its own for the test")
+    ap.add_argument("--clients", type=int, default=20, help="connections")
+    ap.add_argument("--sessions", type=int, default=10, help="games played at once per connection")
+    ap.add_argument("--rounds", type=int, default=100, help="rounds per game")
+    ap.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    ap.add_argument("--hold", type=int, default=0, help="idle sessions to keep open during the test")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    strategy_tables.load_tables()
+    proc = None
+    address = args.address
+    if args.spawn:
+        proc, address = spawn_server()
+    try:
+        report = asyncio.run(load_test(address, args.clients, args.sessions, args.rounds, args.duration,
+                                       args.seed, args.hold))
+    except OSError as e:
+        sys.exit(f"cannot reach the game server at {address} ({e})")
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# LuckyLoop+ game server protocol
+# One JSON object per line in each direction, over TCP or a Unix socket. Every
+# request has an "op" and may carry an "id", which the reply echoes, so a client can
+# have several requests in flight on one connection.
+#
+#   {"op": "new", "seed": 7}                         -> {"session": "3f2a...", "state": {...}}
+#   {"op": "act", "session": s, "action": "hit"}     -> {"steps": [...], "state": {...}}
+#   {"op": "act", "session": s, "action": "skill", "skill": "Card Peek"}   (null = no skill)
+#   {"op": "state", "session": s}                    -> {"state": {...}}
+#   {"op": "close", "session": s}
+#   {"op": "stats"}                                  -> sessions, requests, handling time, memory
+#   {"op": "ping"}
+#
+# Replies are {"ok": true, ...} or {"ok": false, "error": "..."}. The seed is optional
+# (for tests and load generation); without one the server picks a random one.
+#
+# Actions are the player's moves: deal, hit, stand, double, bet_up, bet_down, skill,
+# restart (after a game over, skills kept) and reset (nothing kept). The server turns
+# down what the game's screens wouldn't allow: deal while a hand is being played, skill
+# unless a skill screen is up (a new game, a level up, a restart or reset) and restart
+# unless the game is over.
+#
+# "steps" lists the engine calls the action made on the server, in the order the
+# pygame front end makes them, each as [name, result]: ["deal_round", ok, state],
+# ["check_level_rounds", screen], ["hit", card], ["double_down", ok, balance, bet],
+# ["dealer_play", cards], ["settle_round", RoundResult fields], ["advance_level",
+# leveled], ["check_bankrupt", bust], ["raise_bet"], ["lower_bet"], ["choose_skill"],
+# ["restart"]. The deal's state is null unless the level ended right after it
+# (otherwise it's the reply's state).
+# Cards are engine.CARDS indexes; the dealer's hole card is null until it's revealed.
+
+import json
+
+from engine import CARDS, ENCOUNTERS, Card, Hand
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7777
+MAX_LINE = 64 * 1024
+
+ACTIONS = ("deal", "hit", "stand", "double", "bet_up", "bet_down", "skill", "restart", "reset")
+
+CARD_CODES = {card: code for code, card in enumerate(CARDS)}
+HOLE_CARD = Card("hidden", "hidden", 0)   # the client's stand-in for the face-down card
+ENCOUNTERS_BY_NAME = {e["name"]: e for e in ENCOUNTERS}
+
+
+_encoder = json.JSONEncoder(separators=(",", ":"))
+
+def encode(message):
+    return (_encoder.encode(message) + "\n").encode()
+
+def decode(line):
+    message = json.loads(line)
+    if not isinstance(message, dict):
+        raise ValueError("a message is a JSON object")
+    return message
+
+def parse_address(text):
+    # "host:port", ":port" or a Unix socket path -> ("tcp", host, port) or ("unix", path)
+    host, sep, port = text.rpartition(":")
+    if sep and port.isdigit() and "/" not in text:
+        return "tcp", host or DEFAULT_HOST, int(port)
+    return "unix", text
+
+
+# Game state as sent to clients
+
+def card_codes(hand):
+    return [CARD_CODES[c] for c in hand]
+
+def snapshot(state):
+    dealer = card_codes(state.dealer_cards)
+    if dealer and state.in_round and not state.reveal_dealer:
+        dealer[0] = None
+    return {
+        "balance": state.balance,
+        "bet": state.current_bet,
+        "level": state.level,
+        "round": state.round_no,
+        "level_round": state.level_round_no,
+        "rounds_per_level": state.max_rounds_per_level,
+        "skill": state.player_skill,
+        "skills": state.active_skills,
+        "encounter": state.encounter["name"] if state.encounter else None,
+        "player": card_codes(state.player_cards),
+        "dealer": dealer,
+        "in_round": state.in_round,
+        "reveal": state.reveal_dealer,
+        "game_over": state.game_over,
+        "run": state.run_id,
+    }
+
+def hand_from(codes):
+    return Hand(HOLE_CARD if c is None else CARDS[c] for c in codes)
+
+def apply_snapshot(state, snap):
+    # make a local GameState show the server's game
+    state.balance = snap["balance"]
+    state.current_bet = snap["bet"]
+    state.level = snap["level"]
+    state.round_no = snap["round"]
+    state.level_round_no = snap["level_round"]
+    state.max_rounds_per_level = snap["rounds_per_level"]
+    state.player_skill = snap["skill"]
+    state.active_skills = list(snap["skills"])
+    state.encounter = ENCOUNTERS_BY_NAME.get(snap["encounter"])
+    state.player_cards = hand_from(snap["player"])
+    state.dealer_cards = hand_from(snap["dealer"])
+    state.in_round = snap["in_round"]
+    state.reveal_dealer = snap["reveal"]
+    state.game_over = snap["game_over"]
+    state.run_id = snap["run"]
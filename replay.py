@@ -0,0 +1,368 @@
+# LuckyLoop+ session record and replay
+# A session is the seed of the game's random.Random plus every action that changed
+# the game, one character each: deals, hit/stand/double, bet changes, skill picks and
+# restarts. The shoe, the encounter rolls and the dealer's soft-17 coin flip all draw
+# from that one seeded stream, so applying the same actions again deals the same cards
+# and logs the same rounds. The recorder also keeps a SHA-256 of the results.csv rows
+# the session logged, and a replay checks the rows it produces against it.
+#
+#   LUCKYLOOP_RECORD=sessions python "Final Project.py"      record (one file per session)
+#   python replay.py run sessions/session-....json --log replayed.csv
+#   python replay.py check sessions --workers 4
+#   python replay.py show sessions/session-....json            watch it in the game window
+#   python replay.py generate --sessions 1000 --out sessions   bot sessions to check against
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+from engine import GameState, LEVEL_UP, GAME_OVER
+from results_log import RESULTS_HEADER, round_row
+
+FORMAT = "luckyloop-session"
+FORMAT_VERSION = 1
+
+# action codes
+DEAL = "D"
+HIT = "H"
+STAND = "S"
+DOUBLE = "X"
+BET_UP = "+"
+BET_DOWN = "-"
+RESTART = "G"     # restart from the game over screen (skills kept)
+RESET = "R"       # R key: restart with nothing kept
+NO_SKILL = "_"    # Esc on the skill screen; skills are "0".."9", indexes into the session's skill list
+
+
+def skill_code(skill, skills):
+    return NO_SKILL if skill is None else str(skills.index(skill))
+
+def is_skill_code(code):
+    return code == NO_SKILL or code.isdigit()
+
+def skill_from_code(code, skills):
+    return None if code == NO_SKILL else skills[int(code)]
+
+def row_bytes(row):
+    # a results.csv row exactly as csv.writer writes it
+    buf = io.StringIO()
+    csv.writer(buf).writerow(row)
+    return buf.getvalue().encode("utf-8")
+
+def log_row(res, state):
+    return round_row(res.round_no, res.level, res.skill, res.encounter, res.pv, res.dv,
+                     res.result, res.reward, res.balance, state.active_skills)
+
+
+# Recording
+
+class SessionRecorder:
+    def __init__(self, seed, enabled=True):
+        self.seed = seed
+        self.enabled = enabled
+        self.skills = list(engine.SKILLS)
+        self.actions = []
+        self.rounds = 0
+        self.log_hash = hashlib.sha256()
+        self.started = time.time()
+        self.saved_to = None
+
+    def add(self, code):
+        if self.enabled:
+            self.actions.append(code)
+
+    def skill(self, skill):
+        if self.enabled:
+            self.actions.append(skill_code(skill, self.skills))
+
+    def round_logged(self, res, state):
+        if self.enabled:
+            self.rounds += 1
+            self.log_hash.update(row_bytes(log_row(res, state)))
+
+    def to_dict(self):
+        return {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "seed": self.seed,
+            "recorded": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "skills": self.skills,
+            "rounds": self.rounds,
+            "log_sha256": self.log_hash.hexdigest(),
+            "actions": "".join(self.actions),
+        }
+
+    def save(self, path):
+        # a path ending in .json is the file; anything else is a folder (made if it's
+        # missing) that gets a new file named after the start time and seed. Saving
+        # again overwrites the same file
+        if not self.enabled:
+            return None
+        if self.saved_to is None:
+            if not path.lower().endswith(".json"):
+                os.makedirs(path, exist_ok=True)
+                stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+                path = os.path.join(path, f"session-{stamp}-{self.seed}.json")
+            self.saved_to = path
+        tmp = self.saved_to + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, self.saved_to)
+        return self.saved_to
+
+
+def load_session(path):
+    with open(path) as f:
+        session = json.load(f)
+    if session.get("format") != FORMAT or session.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} LuckyLoop+ session")
+    return session
+
+
+# Replaying
+
+class Session:
+    # engine state driven by action codes the same way the front end's round flow
+    # (deal_new_round, player_hit, ..., the skill and game over screens) drives it;
+    # on_round(res, state) is called for every hand settled, where the game logs it
+    def __init__(self, seed, skills=None, on_round=None):
+        self.state = GameState(rng=random.Random(seed))
+        self.skills = skills or list(engine.SKILLS)
+        self.on_round = on_round
+        self.steps = {DEAL: self.deal, HIT: self.hit, STAND: self.stand, DOUBLE: self.double,
+                      BET_UP: self.bet_up, BET_DOWN: self.bet_down, RESTART: self.restart, RESET: self.reset}
+
+    def apply(self, code):
+        # returns LEVEL_UP or GAME_OVER when the game would show that screen next
+        step = self.steps.get(code)
+        if step is not None:
+            return step()
+        if is_skill_code(code):
+            engine.choose_skill(self.state, skill_from_code(code, self.skills))
+            return None
+        raise ValueError(f"unknown action {code!r}")
+
+    def deal(self):
+        state = self.state
+        if state.game_over:
+            return None
+        if not engine.deal_round(state):
+            return GAME_OVER
+        return engine.check_level_rounds(state)
+
+    def _resolve(self):
+        state = self.state
+        engine.dealer_play(state)
+        res = engine.settle_round(state)
+        if self.on_round:
+            self.on_round(res, state)
+        if engine.advance_level(state):
+            return LEVEL_UP
+        if engine.check_bankrupt(state):
+            return GAME_OVER
+        return None
+
+    def _draw(self):
+        state = self.state
+        if engine.hit(state) is not None and state.player_cards.bust:
+            return self._resolve()
+        return None
+
+    def hit(self):
+        return self._draw()
+
+    def stand(self):
+        if self.state.in_round:
+            return self._resolve()
+        return None
+
+    def double(self):
+        state = self.state
+        screen = None
+        if engine.double_down(state):
+            screen = self._draw()
+            if state.in_round:
+                screen = self._resolve()
+        return screen
+
+    def bet_up(self):
+        engine.raise_bet(self.state)
+
+    def bet_down(self):
+        engine.lower_bet(self.state)
+
+    def restart(self):
+        engine.restart(self.state)
+
+    def reset(self):
+        engine.restart(self.state, keep_skills=False)
+
+
+def replay(session, log_path=None):
+    # re-run a session headless; returns (rounds, log sha256, final GameState) and
+    # writes the rows to log_path (with the header, like a new results.csv) if given
+    digest = hashlib.sha256()
+    rounds = 0
+    out = open(log_path, "wb") if log_path else None
+
+    def on_round(res, state):
+        nonlocal rounds
+        data = row_bytes(log_row(res, state))
+        digest.update(data)
+        rounds += 1
+        if out:
+            out.write(data)
+
+    try:
+        if out:
+            out.write(row_bytes(RESULTS_HEADER))
+        game = Session(session["seed"], session["skills"], on_round)
+        apply = game.apply
+        for code in session["actions"]:
+            apply(code)
+    finally:
+        if out:
+            out.close()
+    return rounds, digest.hexdigest(), game.state
+
+def check_file(path):
+    # (path, ok, rounds, recorded rounds, seconds, error)
+    t0 = time.perf_counter()
+    try:
+        session = load_session(path)
+        rounds, digest, _ = replay(session)
+    except (OSError, ValueError, KeyError, IndexError) as e:
+        return path, False, 0, 0, time.perf_counter() - t0, str(e)
+    ok = digest == session["log_sha256"] and rounds == session["rounds"]
+    return path, ok, rounds, session["rounds"], time.perf_counter() - t0, None
+
+def session_files(paths):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files.extend(os.path.join(p, n) for n in sorted(os.listdir(p)) if n.endswith(".json"))
+        else:
+            files.append(p)
+    return files
+
+def check_all(paths, workers=None):
+    files = session_files(paths)
+    if workers == 1 or len(files) < 2:
+        return [check_file(f) for f in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(check_file, files, chunksize=max(1, len(files) // 64)))
+
+
+# Bot sessions
+# Recorded the same way the game records a player, for a regression corpus: the bot
+# plays the strategy tables, sometimes changes the bet and picks a random skill.
+
+def generate(seed, rounds=500, bet_changes=0.1):
+    import strategy_tables
+    strategy_tables.load_tables()
+    bot = random.Random(f"luckyloop-bot-{seed}")
+    recorder = SessionRecorder(seed)
+    game = Session(seed, recorder.skills, recorder.round_logged)
+    codes = {"hit": HIT, "stand": STAND, "double": DOUBLE}
+
+    def pick_skill():
+        pick = bot.choice(recorder.skills + [None])
+        recorder.skill(pick)
+        game.apply(skill_code(pick, recorder.skills))
+
+    def act(code):
+        # like the game: game over -> restart -> skill screen, level up -> skill screen
+        recorder.add(code)
+        screen = game.apply(code)
+        if screen == GAME_OVER:
+            act(RESTART)
+        elif screen == LEVEL_UP or code in (RESTART, RESET):
+            pick_skill()
+
+    pick_skill()
+    state = game.state
+    while recorder.rounds < rounds:
+        if bot.random() < bet_changes:
+            act(bot.choice((BET_UP, BET_DOWN)))
+        act(DEAL)
+        while state.in_round:
+            act(codes[strategy_tables.decide(state)])
+    return recorder
+
+
+# Command line
+
+def show(path):
+    # play the session in the game window (it stays playable once the replay ends)
+    os.environ["LUCKYLOOP_REPLAY"] = os.path.abspath(path)
+    here = os.path.dirname(os.path.abspath(__file__))
+    runpy.run_path(os.path.join(here, "Final Project.py"), run_name="__main__")
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay recorded LuckyLoop+ sessions")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="replay one session headless")
+    p.add_argument("session")
+    p.add_argument("--log", help="write the replayed rounds to this CSV file")
+
+    p = sub.add_parser("check", help="replay sessions and compare their round logs with the recording")
+    p.add_argument("paths", nargs="+", help="session files or folders of them")
+    p.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+
+    p = sub.add_parser("show", help="replay one session in the game window")
+    p.add_argument("session")
+
+    p = sub.add_parser("generate", help="record bot sessions")
+    p.add_argument("--sessions", type=int, default=100)
+    p.add_argument("--rounds", type=int, default=500, help="rounds per session")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default="sessions")
+    args = ap.parse_args()
+
+    if args.command == "show":
+        show(args.session)
+        return
+
+    if args.command == "generate":
+        os.makedirs(args.out, exist_ok=True)
+        for i in range(args.sessions):
+            recorder = generate(args.seed * 1_000_003 + i, args.rounds)
+            recorder.save(os.path.join(args.out, f"bot-{args.seed}-{i:05d}.json"))
+        print(f"Recorded {args.sessions} sessions of {args.rounds} rounds in {args.out}")
+        return
+
+    if args.command == "run":
+        session = load_session(args.session)
+        t0 = time.perf_counter()
+        rounds, digest, state = replay(session, args.log)
+        dt = time.perf_counter() - t0
+        ok = digest == session["log_sha256"] and rounds == session["rounds"]
+        print(f"{len(session['actions']):,} actions, {rounds:,} rounds in {dt*1000:.1f} ms; "
+              f"final balance ${state.balance}, level {state.level}")
+        print("Round log matches the recording" if ok else
+              f"Round log DIFFERS from the recording ({session['rounds']:,} rounds recorded)")
+        sys.exit(0 if ok else 1)
+
+    t0 = time.perf_counter()
+    results = check_all(args.paths, args.workers)
+    dt = time.perf_counter() - t0
+    failed = [r for r in results if not r[1]]
+    for path, ok, rounds, recorded, _, error in failed:
+        print(f"  MISMATCH {path}: " + (error or f"{rounds:,} rounds replayed, {recorded:,} recorded"))
+    total = sum(r[2] for r in results)
+    print(f"Replayed {len(results):,} sessions ({total:,} rounds) in {dt:.2f}s "
+          f"({total/max(dt, 1e-9):,.0f} rounds/s): {len(results) - len(failed):,} match, {len(failed):,} differ")
+    sys.exit(1 if failed or not results else 0)
+
+if __name__ == "__main__":
+    main()
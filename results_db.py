@@ -0,0 +1,228 @@
+# LuckyLoop+ results database
+# An optional SQLite copy of the round log with a run id for every game
+# (GameState lifetime), typed columns and indexes. Inserts are batched, and each
+# batch also updates running totals per level, skill, encounter and bet era, so the
+# aggregates the R script computes come back without rescanning the rounds.
+#
+#   python results_db.py import results.csv     # load an existing CSV log
+#   python results_db.py report                 # print the aggregates
+
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+
+DB_FILE = "results.db"
+
+# the R script's bet era split
+BET_ERA_CUTOFF = 51
+
+# dimensions with running totals, and the rounds column each one groups by
+AGG_DIMENSIONS = ("level", "skill", "encounter", "bet_era", "all")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    skill TEXT NOT NULL,
+    encounter TEXT NOT NULL,
+    player_value INTEGER NOT NULL,
+    dealer_value INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    reward INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    persistent_skills TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_run ON rounds(run_id, round);
+CREATE INDEX IF NOT EXISTS rounds_level ON rounds(level, result);
+CREATE INDEX IF NOT EXISTS rounds_skill ON rounds(skill, result);
+CREATE INDEX IF NOT EXISTS rounds_encounter ON rounds(encounter, result);
+CREATE INDEX IF NOT EXISTS rounds_result ON rounds(result);
+CREATE TABLE IF NOT EXISTS totals (
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    rounds INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    pushes INTEGER NOT NULL,
+    losses INTEGER NOT NULL,
+    reward_sum INTEGER NOT NULL,
+    balance_sum INTEGER NOT NULL,
+    PRIMARY KEY (dim, key)
+);
+"""
+
+
+def bet_era(rnd):
+    return "Low Bet" if rnd <= BET_ERA_CUTOFF else "High Bet"
+
+
+class ResultsStore:
+    def __init__(self, path=DB_FILE, batch_size=5000):
+        self.path = path
+        self.batch_size = batch_size
+        self._pending = []
+        # used from the results writer thread as well as the caller, one at a time
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    # Writing
+
+    def add(self, run_id, row):
+        # row: a results.csv row (see results_log.round_row)
+        self._pending.append((run_id, *row))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows):
+        # rows: (run_id, csv row) pairs
+        self._pending.extend((run_id, *row) for run_id, row in rows)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # pending rows are only dropped once they're committed, so a failed flush can
+        # be called again
+        rows = self._pending
+        if not rows:
+            return
+        rows = [(r[0], int(r[1]), int(r[2]), r[3] or "", r[4] or "", int(r[5]), int(r[6]),
+                 str(r[7]).lower(), int(r[8]), int(r[9]), r[10] or "") for r in rows]
+
+        totals = {}
+        for r in rows:
+            rnd, level, skill, encounter, result, reward, balance = r[1], r[2], r[3], r[4], r[7], r[8], r[9]
+            for dim, key in (("level", str(level)), ("skill", skill), ("encounter", encounter),
+                             ("bet_era", bet_era(rnd)), ("all", "")):
+                t = totals.get((dim, key))
+                if t is None:
+                    t = totals[(dim, key)] = [0, 0, 0, 0, 0, 0]
+                t[0] += 1
+                t[1] += result == "win"
+                t[2] += result == "push"
+                t[3] += result == "loss"
+                t[4] += reward
+                t[5] += balance
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO rounds (run_id, round, level, skill, encounter, player_value, dealer_value,"
+                " result, reward, balance, persistent_skills) VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+            self.conn.executemany(
+                "INSERT INTO totals VALUES (?,?,?,?,?,?,?,?) ON CONFLICT(dim, key) DO UPDATE SET"
+                " rounds = rounds + excluded.rounds, wins = wins + excluded.wins,"
+                " pushes = pushes + excluded.pushes, losses = losses + excluded.losses,"
+                " reward_sum = reward_sum + excluded.reward_sum,"
+                " balance_sum = balance_sum + excluded.balance_sum",
+                [(dim, key, *t) for (dim, key), t in totals.items()])
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    # Queries
+
+    def _by(self, dim):
+        if dim not in AGG_DIMENSIONS:
+            raise ValueError(f"unknown dimension {dim!r}, expected one of {AGG_DIMENSIONS}")
+        cur = self.conn.execute(
+            "SELECT key, rounds, wins, pushes, losses, reward_sum, balance_sum FROM totals"
+            " WHERE dim = ? ORDER BY key", (dim,))
+        out = {}
+        for key, rounds, wins, pushes, losses, reward_sum, balance_sum in cur:
+            if dim == "level":
+                key = int(key)
+            out[key] = {
+                "rounds": rounds,
+                "win_rate": wins / rounds,
+                "push_rate": pushes / rounds,
+                "loss_rate": losses / rounds,
+                "avg_reward": reward_sum / rounds,
+                "avg_balance": balance_sum / rounds,
+            }
+        return out
+
+    def summary(self):
+        return self._by("all").get("", {"rounds": 0})
+
+    def win_rate_by_level(self):
+        return {k: v["win_rate"] for k, v in self._by("level").items()}
+
+    def win_rate_by_skill(self):
+        return {k: v["win_rate"] for k, v in self._by("skill").items()}
+
+    def win_rate_by_encounter(self):
+        return {k: v["win_rate"] for k, v in self._by("encounter").items()}
+
+    def avg_reward_by_level(self):
+        return {k: v["avg_reward"] for k, v in self._by("level").items()}
+
+    def avg_reward_by_encounter(self):
+        return {k: v["avg_reward"] for k, v in self._by("encounter").items()}
+
+    def by_bet_era(self):
+        return self._by("bet_era")
+
+    def runs(self):
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT run_id FROM rounds")]
+
+    def cumulative_balance(self, run_id):
+        # [(round, balance, cumulative reward)] for one game, in round order
+        return self.conn.execute(
+            "SELECT round, balance, SUM(reward) OVER (ORDER BY round, id) FROM rounds"
+            " WHERE run_id = ? ORDER BY round, id", (run_id,)).fetchall()
+
+
+def import_csv(store, path, run_id="csv"):
+    # load a results.csv file (which has no run ids) as a single run
+    n = 0
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row:
+                store.add(run_id, row)
+                n += 1
+    store.flush()
+    return n
+
+def print_report(store):
+    s = store.summary()
+    if not s["rounds"]:
+        print("No rounds logged yet.")
+        return
+    print(f"Total rounds: {s['rounds']}")
+    print(f"Win rate: {s['win_rate']*100:.2f} %")
+    print(f"Average balance: {s['avg_balance']:.2f}")
+    print(f"Average reward per round: {s['avg_reward']:.2f}\n")
+    for title, dim in (("Bet era", "bet_era"), ("Level", "level"), ("Skill", "skill"), ("Encounter", "encounter")):
+        print(f"{title}:")
+        for key, v in store._by(dim).items():
+            print(f"  {str(key) or '(none)':16s} rounds {v['rounds']:>10}  win {v['win_rate']*100:6.2f}%"
+                  f"  avg reward {v['avg_reward']:8.2f}  avg balance {v['avg_balance']:9.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="LuckyLoop+ SQLite results store")
+    ap.add_argument("command", choices=["import", "report"])
+    ap.add_argument("csv", nargs="?", default="results.csv")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--run-id", default="csv")
+    args = ap.parse_args()
+
+    store = ResultsStore(args.db)
+    t0 = time.perf_counter()
+    if args.command == "import":
+        n = import_csv(store, args.csv, args.run_id)
+        print(f"Imported {n} rounds from {args.csv} in {time.perf_counter()-t0:.2f}s", file=sys.stderr)
+    else:
+        print_report(store)
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# LuckyLoop+ results log
+# Rows for results.csv (the file the R analysis reads) are buffered in memory and
+# appended by a background thread, either once enough rows are waiting or after a
+# short delay, so logging a round never opens the file on the game's main thread.
+# Whatever is still buffered is written on close(), flush() and at interpreter exit.
+# If a write fails (disk full, the CSV locked by another program) the rows are kept
+# and the error is raised from the next write, flush() or close(); flush() retries
+# the write and starts the background thread again once it works. The CSV and the
+# store keep their own progress, so a retry only redoes the one that failed.
+# Set LUCKYLOOP_RESULTS_DB to a file name to also keep the SQLite store in
+# results_db.py (with a run id per game) up to date from the same thread.
+
+import atexit
+import csv
+import io
+import locale
+import os
+import threading
+
+CSV_FILE = "results.csv"
+RESULTS_DB = os.environ.get("LUCKYLOOP_RESULTS_DB")
+
+RESULTS_HEADER = [
+    "Round",
+    "Level",
+    "Skill",
+    "Encounter",
+    "PlayerValue",
+    "DealerValue",
+    "Result",
+    "Reward",
+    "Balance",
+    "PersistentSkills"
+]
+
+
+def ensure_csv(path=CSV_FILE):
+    if not os.path.exists(path):
+        with open(path, "w", newline="") as f:
+            csv.writer(f).writerow(RESULTS_HEADER)
+
+def round_row(rnd, level, skill, encounter, pv, dv, result, reward, balance, persistent_skills=None):
+    return [
+        rnd,
+        level,
+        skill or "",
+        encounter or "",
+        pv,
+        dv,
+        result,
+        reward,
+        balance,
+        ",".join(persistent_skills) if persistent_skills else ""
+    ]
+
+
+class ResultsWriter:
+    def __init__(self, path=CSV_FILE, max_rows=2000, max_delay=1.0, fsync=True, store=None):
+        # max_rows: write as soon as this many rows are waiting
+        # max_delay: otherwise write whatever is waiting every max_delay seconds
+        # store: optional results_db.ResultsStore that gets every batch as well
+        self.path = path
+        self.store = store
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.fsync = fsync
+        self.rows_written = 0
+        self._rows = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._error = None   # the exception that stopped the background thread
+        ensure_csv(path)
+        self._start()
+        atexit.register(self.close)
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="results-writer", daemon=True)
+        self._thread.start()
+
+    def _check(self):
+        # called holding _cond
+        if self._closed:
+            raise ValueError("results writer is closed")
+        if self._error is not None:
+            raise self._error
+
+    def write(self, row, run_id=None):
+        with self._cond:
+            self._check()
+            self._rows.append((run_id, row))
+            if len(self._rows) >= self.max_rows:
+                self._cond.notify()
+
+    def write_many(self, rows, run_id=None):
+        with self._cond:
+            self._check()
+            self._rows.extend((run_id, row) for row in rows)
+            if len(self._rows) >= self.max_rows:
+                self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._rows)
+
+    def _take(self):
+        with self._cond:
+            rows, self._rows = self._rows, []
+        return rows
+
+    def _append(self, rows):
+        # a whole batch is appended and synced, or the file is cut back to where it was,
+        # so a failed batch can be written again without leaving part of it behind
+        buf = io.StringIO(newline="")
+        csv.writer(buf).writerows(row for _, row in rows)
+        data = buf.getvalue().encode(locale.getpreferredencoding(False))
+        with open(self.path, "ab", buffering=0) as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[f.write(view):]
+                if self.fsync:
+                    os.fsync(f.fileno())
+            except BaseException:
+                f.truncate(start)
+                raise
+        self.rows_written += len(rows)
+
+    def _write_pending(self):
+        # taken and appended under one lock, so batches reach the file in the order
+        # they were taken whichever thread writes them
+        with self._io_lock:
+            rows = self._take()
+            if rows:
+                try:
+                    self._append(rows)
+                except BaseException:
+                    with self._cond:
+                        self._rows[:0] = rows   # kept for the next attempt
+                    raise
+                if self.store is not None:
+                    # the store holds on to them until one of its flushes works
+                    self.store.add_many((run_id or "", row) for run_id, row in rows)
+            if self.store is not None:
+                self.store.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or len(self._rows) >= self.max_rows,
+                                    timeout=self.max_delay)
+                closing = self._closed
+            try:
+                self._write_pending()
+            except Exception as e:
+                with self._cond:
+                    self._error = e
+                return
+            if closing:
+                return
+
+    def flush(self):
+        # write everything buffered so far before returning
+        self._write_pending()
+        with self._cond:
+            failed, self._error = self._error, None
+        if failed is not None and not self._closed:
+            self._start()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        try:
+            self._write_pending()   # what's left, and a failed batch tried once more
+        finally:
+            if self.store is not None:
+                self.store.close()
+            atexit.unregister(self.close)
+
+
+# Module-level log used by the game
+
+_writer = None
+
+def get_writer(path=CSV_FILE):
+    global _writer
+    if _writer is None or _writer._closed:
+        store = None
+        if RESULTS_DB:
+            from results_db import ResultsStore
+            store = ResultsStore(RESULTS_DB)
+        _writer = ResultsWriter(path, store=store)
+    return _writer
+
+def log_round(rnd, level, skill, encounter, pv, dv, result, reward, balance, persistent_skills=None,
+              run_id=None):
+    get_writer().write(round_row(rnd, level, skill, encounter, pv, dv, result, reward, balance,
+                                 persistent_skills), run_id)
+
+def close_log():
+    if _writer is not None:
+        _writer.close()
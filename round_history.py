@@ -0,0 +1,82 @@
+# LuckyLoop+ round history
+# The last few hundred rounds of the session kept in fixed-size typed arrays (a ring
+# buffer, one array per field) plus running totals that are updated in O(1) per round:
+# win rate, average reward (EV) per round and the biggest drop from a game's peak balance.
+
+from array import array
+
+RESULT_CODES = {"win": 1, "push": 0, "loss": -1}
+
+
+class RoundHistory:
+    def __init__(self, capacity=512):
+        self.capacity = capacity
+        self.round_no = array("l", [0]) * capacity
+        self.level = array("b", [0]) * capacity
+        self.player_value = array("b", [0]) * capacity
+        self.dealer_value = array("b", [0]) * capacity
+        self.result = array("b", [0]) * capacity
+        self.reward = array("q", [0]) * capacity
+        self.balance = array("q", [0]) * capacity
+        self.head = 0    # slot the next round goes into
+        self.count = 0   # filled slots
+
+        # running totals over every round recorded, not only the ones still buffered
+        self.rounds = 0
+        self.wins = 0
+        self.pushes = 0
+        self.losses = 0
+        self.reward_sum = 0
+        self.peak = 0
+        self.max_drawdown = 0
+        self.run_id = None
+
+    def record(self, res, run_id=None):
+        # res: an engine.RoundResult
+        i = self.head
+        self.round_no[i] = res.round_no
+        self.level[i] = res.level
+        self.player_value[i] = min(res.pv, 127)
+        self.dealer_value[i] = min(res.dv, 127)
+        code = RESULT_CODES.get(res.result, 0)
+        self.result[i] = code
+        self.reward[i] = res.reward
+        self.balance[i] = res.balance
+        self.head = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+        self.rounds += 1
+        self.wins += code == 1
+        self.pushes += code == 0
+        self.losses += code == -1
+        self.reward_sum += res.reward
+
+        # drawdown is measured within a game; a restart starts a new peak
+        if run_id != self.run_id or self.rounds == 1:
+            self.run_id = run_id
+            self.peak = res.balance - res.reward
+        if res.balance > self.peak:
+            self.peak = res.balance
+        if self.peak - res.balance > self.max_drawdown:
+            self.max_drawdown = self.peak - res.balance
+
+    @property
+    def win_rate(self):
+        return self.wins / self.rounds if self.rounds else 0.0
+
+    @property
+    def ev_per_round(self):
+        return self.reward_sum / self.rounds if self.rounds else 0.0
+
+    def __len__(self):
+        return self.count
+
+    def index(self, k):
+        # buffer slot of the k-th oldest buffered round
+        return (self.head - self.count + k) % self.capacity
+
+    def balances(self, n=None):
+        # the last n balances (all buffered ones by default), oldest first
+        n = self.count if n is None else min(n, self.count)
+        return [self.balance[self.index(k)] for k in range(self.count - n, self.count)]
@@ -0,0 +1,69 @@
+# LuckyLoop+ running statistics
+# Mean and variance kept one value at a time (Welford's method) so simulations never
+# hold every result in memory, and mergeable, so per-worker or per-chunk results can
+# be combined in any order into exactly the numbers one pass would have given.
+
+import math
+
+# two-sided normal quantiles for the usual confidence levels
+Z = {0.90: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+
+def wilson(p, n, z):
+    # (center, half-width) of the Wilson score interval for a proportion p of n trials;
+    # unlike the normal interval it isn't zero wide when every trial came out the same
+    if not n:
+        return p, math.inf
+    shrink = 1 + z * z / n
+    return (p + z * z / (2 * n)) / shrink, z / shrink * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+
+
+class Moments:
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0    # sum of squared differences from the mean
+
+    def add(self, x):
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+
+    def merge(self, other):
+        if not other.n:
+            return
+        n = self.n + other.n
+        d = other.mean - self.mean
+        self.mean += d * other.n / n
+        self.m2 += other.m2 + d * d * self.n * other.n / n
+        self.n = n
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def stderr(self):
+        return math.sqrt(self.variance / self.n) if self.n else math.inf
+
+    def ci(self, confidence=0.95, binary=False):
+        # half-width of the normal confidence interval for the mean, or of the Wilson
+        # interval when every value is 0 or 1 (binary=True)
+        if binary:
+            return wilson(self.mean, self.n, Z[confidence])[1]
+        return Z[confidence] * self.stderr
+
+    def interval(self, confidence=0.95, binary=False):
+        center = wilson(self.mean, self.n, Z[confidence])[0] if binary else self.mean
+        half = self.ci(confidence, binary)
+        return center - half, center + half
+
+    def as_dict(self):
+        return {"n": self.n, "mean": self.mean, "stdev": self.stdev, "stderr": self.stderr}
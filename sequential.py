@@ -0,0 +1,322 @@
+# LuckyLoop+ sequential Monte Carlo
+# Answers one question (how likely a level is cleared, what a whole game or a hand
+# is worth, what a skill adds per hand) to a requested precision instead of a fixed
+# number of trials: trials are played in batches, every metric keeps a running mean
+# and variance (running_stats.Moments), and it stops as soon as each target metric's
+# confidence interval is within its half-width. The next batch is sized from the
+# current variance (at most doubling the trials so far), so easy questions finish
+# after the first chunk and hard ones get only as many trials as they need. The 0/1
+# metrics (cleared, win) use Wilson intervals, which stay open while every trial so
+# far came out the same, so a rare outcome can't stop the run at +-0.
+#
+# Trials are played in fixed-size chunks, each with its own seeded random.Random
+# and merged in chunk order, so the answer and the number of trials only depend on
+# the seed, never on the number of workers.
+#
+#   python sequential.py level --level 2 --target cleared=0.005
+#   python sequential.py level --level 1 --threshold 600 --rounds-per-level 8
+#   python sequential.py skill --skill "Reward Booster" --level 3 --target gain=2
+#   python sequential.py run --strategy hit17 --target final_balance=1% --target rounds=0.1
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import balancer
+import engine
+import strategies
+import strategy_tables
+import tournament
+from running_stats import Moments, Z, wilson
+
+# what is simulated; None keeps the game's own value
+Setup = namedtuple("Setup", [
+    "question", "strategy", "skill", "level", "threshold", "rounds_per_level", "balance", "max_rounds"
+])
+
+def new_game(setup, rng, state_class=engine.GameState):
+    # a game at the start of setup.level, with the balance a player arrives there with
+    state = state_class(rng=rng)
+    if setup.level > 1:
+        state.balance = engine.LEVELS[setup.level - 1]["threshold"]
+        state.start_level(setup.level)
+    if setup.balance is not None:
+        state.balance = setup.balance
+    if setup.rounds_per_level is not None:
+        state.max_rounds_per_level = setup.rounds_per_level
+    return state
+
+def place_bet(player, state):
+    amount = player.bet(state)
+    if amount is not None:
+        engine.bet_towards(state, amount)
+
+
+# Trials: each returns (metric values, rounds played)
+
+def level_trial(setup, player, choose, rng):
+    # play one level until it's cleared or the game is over
+    state = new_game(setup, rng)
+    level = state.level
+    goal = engine.LEVELS[level]["threshold"]
+    state.player_skill = choose(state)
+    hands = 0
+    while not state.game_over and state.level == level:
+        place_bet(player, state)
+        if engine.play_round(state, player.decide) is not None:
+            hands += 1
+        # the last level has no level up; reaching its goal is clearing it
+        if level == engine.MAX_LEVEL and state.balance >= goal:
+            break
+    cleared = state.level != level or (not state.game_over and state.balance >= goal)
+    return (float(cleared), hands), hands
+
+def run_trial(setup, player, choose, rng):
+    # a whole game from level 1
+    state = new_game(setup._replace(level=1), rng)
+    r = engine.play_run(state, player.decide, choose, setup.max_rounds, player.bet)
+    return (r.final_balance, r.rounds, r.max_level, float(r.cleared)), r.rounds
+
+def play_hand(player, state, skill):
+    engine.choose_skill(state, skill)
+    place_bet(player, state)
+    res = engine.play_round(state, player.decide)
+    if res is None:
+        return 0, 0.0
+    return res.reward, float(res.result == "win")
+
+def hand_trial(setup, player, choose, rng):
+    # the first hand at the level, from a fresh shoe
+    state = new_game(setup, rng)
+    return play_hand(player, state, choose(state)), 1
+
+def skill_trial(setup, player, choose, rng):
+    # the same hand (same cards, encounter and coin flips) with and without the skill
+    start = new_game(setup, rng, tournament.PairedState)
+    stream = rng.getrandbits(64)
+    with_skill, _ = play_hand(player, tournament.fork(start, stream), setup.skill)
+    without, _ = play_hand(player, tournament.fork(start, stream), None)
+    return (with_skill - without, with_skill), 2
+
+# metrics that are 0 or 1 every trial
+BINARY_METRICS = {"cleared", "win"}
+
+# name -> (metrics, trial, trials per chunk, default target)
+QUESTIONS = {
+    "level": (("cleared", "rounds"), level_trial, 500, "cleared=0.01"),
+    "run": (("final_balance", "rounds", "max_level", "cleared"), run_trial, 200, "final_balance=1%"),
+    "hand": (("reward", "win"), hand_trial, 2000, "reward=1"),
+    "skill": (("gain", "reward"), skill_trial, 1000, "gain=1"),
+}
+
+
+def chunk_rng(seed, chunk):
+    return random.Random(f"luckyloop-seq-{seed}-{chunk}")
+
+def play_chunk(setup, seed, chunk, n):
+    # (chunk, Moments per metric, rounds played)
+    metrics, trial, _, _ = QUESTIONS[setup.question]
+    strategy_tables.load_tables()  # loaded for the shipped rules, before the threshold changes
+    player = strategies.load(setup.strategy)
+    skill = setup.skill
+    choose = player.choose_skill if skill is None else (lambda state: skill)
+    rng = chunk_rng(seed, chunk)
+    moments = [Moments() for _ in metrics]
+    rounds = 0
+    config = {} if setup.threshold is None else {f"levels.{setup.level}.threshold": setup.threshold}
+    with balancer.applied(config):
+        for _ in range(n):
+            values, played = trial(setup, player, choose, rng)
+            rounds += played
+            for m, v in zip(moments, values):
+                m.add(v)
+    return chunk, moments, rounds
+
+
+# Targets: "metric=half-width", or "metric=P%" for P percent of the mean's size
+
+Target = namedtuple("Target", ["metric", "width", "relative"])
+
+def parse_target(spec, metrics):
+    metric, sep, value = spec.partition("=")
+    if not sep or metric not in metrics:
+        raise ValueError(f"target {spec!r} should be metric=half-width with a metric from {', '.join(metrics)}")
+    relative = value.endswith("%")
+    width = float(value.rstrip("%"))
+    if width <= 0:
+        raise ValueError(f"target {spec!r} needs a half-width above 0")
+    return Target(metric, width / 100 if relative else width, relative)
+
+def target_width(target, moments):
+    return target.width * abs(moments.mean) if target.relative else target.width
+
+def ci(metric, moments, confidence):
+    return moments.ci(confidence, binary=metric in BINARY_METRICS)
+
+def trials_needed(target, moments, confidence):
+    # trials at which the interval would reach the target, at the current variance
+    width = target_width(target, moments)
+    if width <= 0:
+        return math.inf
+    z = Z[confidence]
+    if target.metric not in BINARY_METRICS:
+        return (z * moments.stdev / width) ** 2
+    # the Wilson half-width at the current proportion: double, then bisect
+    p = moments.mean
+    hi = max(2, moments.n)
+    while wilson(p, hi, z)[1] > width:
+        hi *= 2
+    lo = hi // 2
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if wilson(p, mid, z)[1] > width:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def estimate(setup, targets, confidence=0.95, seed=0, workers=None, min_trials=None,
+             max_trials=10_000_000, progress=None):
+    # returns a report dict; progress(report) is called after every batch
+    metrics, _, chunk_trials, _ = QUESTIONS[setup.question]
+    index = {m: k for k, m in enumerate(metrics)}
+    min_trials = max(2, min_trials or chunk_trials)
+    total = [Moments() for _ in metrics]
+    rounds = 0
+    next_chunk = 0
+    batch = -(-min(min_trials, max_trials) // chunk_trials)
+    parallel = (workers or os.cpu_count() or 1) > 1
+    pool = None
+    t0 = time.perf_counter()
+    try:
+        while True:
+            chunks = [(c, min(chunk_trials, max_trials - c * chunk_trials))
+                      for c in range(next_chunk, next_chunk + batch)]
+            chunks = [(c, n) for c, n in chunks if n > 0]
+            next_chunk += len(chunks)
+            if len(chunks) > 1 and parallel and pool is None:
+                pool = ProcessPoolExecutor(max_workers=workers)
+            if pool is not None:
+                parts = list(pool.map(play_chunk, *zip(*[(setup, seed, c, n) for c, n in chunks])))
+            else:
+                parts = [play_chunk(setup, seed, c, n) for c, n in chunks]
+            # merged in chunk order, so the numbers don't depend on the number of workers
+            for _, moments, played in parts:
+                rounds += played
+                for a, b in zip(total, moments):
+                    a.merge(b)
+
+            n = total[0].n
+            open_targets = [t for t in targets
+                            if ci(t.metric, total[index[t.metric]], confidence) > target_width(t, total[index[t.metric]])]
+            done = n >= min_trials and not open_targets
+            out = report(setup, targets, total, confidence, rounds, time.perf_counter() - t0, done)
+            if progress:
+                progress(out)
+            if done or n >= max_trials or not chunks:
+                return out
+            need = max([min_trials] + [trials_needed(t, total[index[t.metric]], confidence) for t in open_targets])
+            more = min(max(need - n, chunk_trials), n, max_trials - n)
+            batch = max(1, math.ceil(more / chunk_trials))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def report(setup, targets, total, confidence, rounds, seconds, done):
+    metrics = QUESTIONS[setup.question][0]
+    wanted = {t.metric: t for t in targets}
+    out = {
+        "setup": setup._asdict(),
+        "confidence": confidence,
+        "trials": total[0].n,
+        "rounds": rounds,
+        "seconds": seconds,
+        "stopped": "precision reached" if done else "trial limit",
+        "metrics": {},
+    }
+    for m, moments in zip(metrics, total):
+        entry = dict(moments.as_dict(), ci=ci(m, moments, confidence),
+                     interval=moments.interval(confidence, binary=m in BINARY_METRICS))
+        t = wanted.get(m)
+        if t is not None:
+            entry["target"] = target_width(t, moments)
+            entry["met"] = entry["ci"] <= entry["target"]
+        out["metrics"][m] = entry
+    return out
+
+
+def print_progress(out):
+    parts = []
+    for m, e in out["metrics"].items():
+        if "target" in e:
+            parts.append(f"{m} {e['mean']:.4f} +-{e['ci']:.4f} (want {e['target']:.4f})")
+    print(f"  {out['trials']:>10,} trials  " + ", ".join(parts), file=sys.stderr)
+
+def print_report(out):
+    s = out["setup"]
+    print(f"{s['question']} at level {s['level']} with {s['strategy']}"
+          + (f", skill {s['skill']}" if s["skill"] else ""))
+    print(f"{out['trials']:,} trials ({out['rounds']:,} rounds) in {out['seconds']*1000:,.1f} ms; "
+          f"stopped: {out['stopped']}")
+    print(f"  {'metric':<14} {'mean':>12} {'+-' + format(out['confidence'], '.0%'):>10} {'target':>10}")
+    for m, e in out["metrics"].items():
+        target = f"{e['target']:>10.4f}{'' if e['met'] else '  not met'}" if "target" in e else ""
+        print(f"  {m:<14} {e['mean']:>12.4f} {e['ci']:>10.4f} {target}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Estimate LuckyLoop+ odds to a requested precision")
+    ap.add_argument("question", choices=list(QUESTIONS))
+    ap.add_argument("--target", action="append", default=[],
+                    help="metric=half-width or metric=P%% of the mean (repeatable; default: "
+                         + "; ".join(f"{q}: {v[3]}" for q, v in QUESTIONS.items()) + ")")
+    ap.add_argument("--confidence", type=float, default=0.95, choices=sorted(Z))
+    ap.add_argument("--strategy", default="tables",
+                    help=f"one of {', '.join(strategies.STRATEGIES)}, or module:attribute")
+    ap.add_argument("--skill", default=None, choices=sorted(engine.SKILLS),
+                    help="picked at every skill screen (skill: the one compared with no skill)")
+    ap.add_argument("--level", type=int, default=1, choices=sorted(engine.LEVELS))
+    ap.add_argument("--threshold", type=int, default=None, help="the level's goal instead of LEVELS")
+    ap.add_argument("--rounds-per-level", type=int, default=None, help="instead of max_rounds_per_level")
+    ap.add_argument("--balance", type=int, default=None, help="balance at the start of the level")
+    ap.add_argument("--max-rounds", type=int, default=1000, help="run: rounds per game")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    ap.add_argument("--min-trials", type=int, default=None, help="default: one chunk")
+    ap.add_argument("--max-trials", type=int, default=10_000_000)
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args()
+
+    if args.question == "skill" and args.skill is None:
+        ap.error("skill needs --skill")
+    try:
+        strategies.load(args.strategy)
+    except (ValueError, ImportError, AttributeError) as e:
+        ap.error(str(e))
+    metrics = QUESTIONS[args.question][0]
+    try:
+        targets = [parse_target(t, metrics) for t in args.target or [QUESTIONS[args.question][3]]]
+    except ValueError as e:
+        ap.error(str(e))
+
+    setup = Setup(args.question, args.strategy, args.skill, args.level, args.threshold,
+                  args.rounds_per_level, args.balance, args.max_rounds)
+    out = estimate(setup, targets, args.confidence, args.seed, args.workers, args.min_trials,
+                   args.max_trials, progress=None if args.quiet or args.json else print_progress)
+    if args.json:
+        json.dump(out, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(out)
+    sys.exit(0 if out["stopped"] == "precision reached" else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+# LuckyLoop+ game server
+# Hosts many independent games in one asyncio process, without rendering. Each
+# session is an engine GameState with its own seeded random stream (about 4 KB); the
+# round flow is the same as the pygame front end's, so a session plays exactly like the
+# game and, with --record, is saved in the replay.py format when it ends. The server
+# enforces what the front end's screens allow: no deal while a hand is being played, a
+# skill only when a skill screen is up, and restart only after a game over. Requests are
+# handled straight from the connection's read loop (there's nothing to wait for), and
+# replies are only flushed when the socket falls behind, so clients can pipeline.
+# See protocol.py for the messages.
+#
+#   python server.py --port 7777
+#   python server.py --unix /tmp/luckyloop.sock --record sessions
+#   LUCKYLOOP_SERVER=127.0.0.1:7777 python "Final Project.py"      play on the server
+#   python loadgen.py --spawn --clients 50 --sessions 40            load test
+
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import sys
+import time
+
+import engine
+from engine import GameState
+from protocol import (ACTIONS, DEFAULT_HOST, DEFAULT_PORT, MAX_LINE, CARD_CODES, encode, decode,
+                      snapshot, card_codes)
+from replay import (SessionRecorder, DEAL, HIT, STAND, DOUBLE, BET_UP, BET_DOWN, RESTART, RESET)
+from running_stats import Moments
+
+IDLE_TIMEOUT = 15 * 60   # seconds before an untouched session is dropped
+MAX_SESSIONS = 100_000
+WRITE_BUFFER = 64 * 1024  # flush replies once this much is waiting to be sent
+
+
+class RequestError(Exception):
+    pass
+
+
+class Table:
+    # one player's game; each action returns the steps it took (see protocol.py)
+    __slots__ = ("state", "recorder", "used", "skill_screens")
+
+    def __init__(self, seed, record=False):
+        self.state = GameState(rng=random.Random(seed))
+        self.recorder = SessionRecorder(seed) if record else None
+        self.used = time.monotonic()
+        self.skill_screens = 1   # skill screens waiting for a pick; a game opens with one
+
+    def record(self, code):
+        if self.recorder:
+            self.recorder.add(code)
+
+    def deal(self, steps):
+        state = self.state
+        if state.in_round:
+            raise RequestError("a hand is already being played")
+        self.record(DEAL)
+        if state.game_over:
+            return
+        ok = engine.deal_round(state)
+        if not ok:
+            steps.append(["deal_round", ok, None])
+            return
+        # the state right after the deal only needs sending when the level then ends
+        dealt = snapshot(state)
+        screen = engine.check_level_rounds(state)
+        if screen == engine.LEVEL_UP:
+            self.skill_screens += 1
+        steps.append(["deal_round", ok, dealt if screen else None])
+        steps.append(["check_level_rounds", screen])
+
+    def resolve(self, steps):
+        state = self.state
+        engine.dealer_play(state)
+        steps.append(["dealer_play", card_codes(state.dealer_cards)])
+        res = engine.settle_round(state)
+        steps.append(["settle_round", list(res)])
+        if self.recorder:
+            self.recorder.round_logged(res, state)
+        leveled = engine.advance_level(state)
+        if leveled:
+            self.skill_screens += 1
+        steps.append(["advance_level", leveled])
+        steps.append(["check_bankrupt", engine.check_bankrupt(state)])
+
+    def draw(self, steps):
+        state = self.state
+        card = engine.hit(state)
+        steps.append(["hit", None if card is None else CARD_CODES[card]])
+        if card is not None and state.player_cards.bust:
+            self.resolve(steps)
+
+    def hit(self, steps):
+        self.record(HIT)
+        self.draw(steps)
+
+    def stand(self, steps):
+        self.record(STAND)
+        if self.state.in_round:
+            self.resolve(steps)
+
+    def double(self, steps):
+        self.record(DOUBLE)
+        state = self.state
+        ok = engine.double_down(state)
+        steps.append(["double_down", ok, state.balance, state.current_bet])
+        if ok:
+            self.draw(steps)
+            if state.in_round:
+                self.resolve(steps)
+
+    def bet_up(self, steps):
+        self.record(BET_UP)
+        engine.raise_bet(self.state)
+        steps.append(["raise_bet"])
+
+    def bet_down(self, steps):
+        self.record(BET_DOWN)
+        engine.lower_bet(self.state)
+        steps.append(["lower_bet"])
+
+    def skill(self, steps, skill):
+        if skill is not None and skill not in engine.SKILLS:
+            raise RequestError(f"unknown skill {skill!r}")
+        if not self.skill_screens:
+            raise RequestError("no skill screen to pick from")
+        self.skill_screens -= 1
+        if self.recorder:
+            self.recorder.skill(skill)
+        engine.choose_skill(self.state, skill)
+        steps.append(["choose_skill"])
+
+    def restart(self, steps):
+        if not self.state.game_over:
+            raise RequestError("restart is only for a game that is over (reset starts over)")
+        self.record(RESTART)
+        engine.restart(self.state)
+        self.skill_screens = 1
+        steps.append(["restart"])
+
+    def reset(self, steps):
+        self.record(RESET)
+        engine.restart(self.state, keep_skills=False)
+        self.skill_screens = 1
+        steps.append(["restart"])
+
+PLAIN_ACTIONS = {name: getattr(Table, name) for name in ACTIONS if name != "skill"}
+
+
+def rss_kb():
+    # resident memory of this process, or None where it can't be read
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        return None
+
+
+class GameServer:
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT, record=None):
+        self.tables = {}
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.record = record
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.handling = Moments()   # microseconds per request
+        self.slowest = 0.0
+        self.ops = {"new": self.op_new, "act": self.op_act, "state": self.op_state,
+                    "close": self.op_close, "stats": self.op_stats, "ping": self.op_ping}
+
+    # requests
+
+    def handle(self, message):
+        op = self.ops.get(message.get("op"))
+        if op is None:
+            raise RequestError(f"unknown op {message.get('op')!r}")
+        return op(message)
+
+    def table(self, message):
+        table = self.tables.get(message.get("session"))
+        if table is None:
+            raise RequestError("unknown session")
+        table.used = time.monotonic()
+        return table
+
+    def op_new(self, message):
+        if len(self.tables) >= self.max_sessions:
+            raise RequestError("server full")
+        seed = message.get("seed")
+        if seed is None:
+            seed = random.getrandbits(63)
+        elif not isinstance(seed, int):
+            raise RequestError("seed must be an integer")
+        sid = secrets.token_hex(8)
+        table = self.tables[sid] = Table(seed, record=bool(self.record))
+        return {"session": sid, "state": snapshot(table.state)}
+
+    def op_act(self, message):
+        table = self.table(message)
+        action = message.get("action")
+        steps = []
+        if action == "skill":
+            table.skill(steps, message.get("skill"))
+        elif action in PLAIN_ACTIONS:
+            PLAIN_ACTIONS[action](table, steps)
+        else:
+            raise RequestError(f"unknown action {action!r}")
+        return {"steps": steps, "state": snapshot(table.state)}
+
+    def op_state(self, message):
+        return {"state": snapshot(self.table(message).state)}
+
+    def op_close(self, message):
+        table = self.table(message)
+        del self.tables[message["session"]]
+        self.save(table)
+        return {}
+
+    def op_stats(self, message):
+        return {
+            "sessions": len(self.tables),
+            "connections": self.connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "handle_us": self.handling.mean,
+            "handle_max_us": self.slowest,
+            "rss_kb": rss_kb(),
+        }
+
+    def op_ping(self, message):
+        return {}
+
+    def save(self, table):
+        if self.record and table.recorder and table.recorder.actions:
+            table.recorder.save(self.record)
+
+    # connections
+
+    async def serve_client(self, reader, writer):
+        self.connections += 1
+        handle = self.handle
+        clock = time.perf_counter
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    break   # a line longer than MAX_LINE
+                if not line:
+                    break
+                t0 = clock()
+                message = {}
+                try:
+                    message = decode(line)
+                    reply = handle(message)
+                    reply["ok"] = True
+                except (RequestError, ValueError, TypeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                    self.errors += 1
+                if "id" in message:
+                    reply["id"] = message["id"]
+                data = encode(reply)
+                # timed up to the send: on a busy box the write can hand the CPU to the client
+                us = (clock() - t0) * 1e6
+                writer.write(data)
+                self.requests += 1
+                self.handling.add(us)
+                if us > self.slowest:
+                    self.slowest = us
+                if writer.transport.get_write_buffer_size() > WRITE_BUFFER:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def expire(self):
+        # drop sessions nobody has touched for idle_timeout seconds
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            cutoff = time.monotonic() - self.idle_timeout
+            for sid in [sid for sid, t in self.tables.items() if t.used < cutoff]:
+                self.save(self.tables.pop(sid))
+
+    def close(self):
+        for table in self.tables.values():
+            self.save(table)
+        self.tables.clear()
+
+
+async def serve(game_server, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None, ready=None):
+    if unix:
+        if os.path.exists(unix):
+            os.unlink(unix)
+        server = await asyncio.start_unix_server(game_server.serve_client, path=unix, limit=MAX_LINE)
+        where = unix
+    else:
+        server = await asyncio.start_server(game_server.serve_client, host, port, limit=MAX_LINE)
+        where = "{}:{}".format(*server.sockets[0].getsockname()[:2])
+    expiry = asyncio.ensure_future(game_server.expire())
+    if ready:
+        ready(where)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        expiry.cancel()
+        game_server.close()
+        if unix and os.path.exists(unix):
+            os.unlink(unix)
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve LuckyLoop+ games over line-delimited JSON")
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    ap.add_argument("--max-sessions", type=int, default=MAX_SESSIONS)
+    ap.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, help="seconds")
+    ap.add_argument("--record", help="save every session that ends to this folder (replay.py format)")
+    args = ap.parse_args()
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+
+    game_server = GameServer(args.max_sessions, args.idle_timeout, args.record)
+    ready = lambda where: print(f"LuckyLoop+ server on {where}", flush=True)
+    try:
+        asyncio.run(serve(game_server, args.host, args.port, args.unix, ready))
+    except KeyboardInterrupt:
+        pass
+    print(f"{game_server.requests:,} requests served", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
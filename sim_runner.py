@@ -0,0 +1,128 @@
+# LuckyLoop+ multi-core run simulator
+# Plays whole games (a fresh GameState, level progression, until game over) across
+# a process pool. Runs are split into fixed-size chunks and every chunk gets its
+# own seeded random.Random stream, so the merged results are the same for a given
+# seed no matter how many workers ran them.
+#
+#   python sim_runner.py --runs 200000 --seed 7 --workers 8 --skill "Safety Net"
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+import engine
+import strategies
+
+CHUNK_RUNS = 2000
+
+
+def chunk_rng(seed, chunk):
+    # string seeds are hashed by random.Random, giving independent streams per chunk
+    return random.Random(f"luckyloop-{seed}-{chunk}")
+
+def fixed_skill(name, state):
+    # pick the same skill at every skill screen (None = Esc)
+    return name
+
+def play_chunk(seed, chunk, n_runs, skill=None, max_rounds=1000, strategy="hit17"):
+    # strategy: a strategies.load() name; skill, if given, replaces its skill choice
+    rng = chunk_rng(seed, chunk)
+    s = strategies.load(strategy)
+    choose = partial(fixed_skill, skill) if skill else s.choose_skill
+    results = []
+    for _ in range(n_runs):
+        state = engine.GameState(rng=rng)
+        results.append(engine.play_run(state, s.decide, choose, max_rounds, s.bet))
+    return chunk, os.getpid(), results
+
+def make_chunks(runs, chunk_runs=CHUNK_RUNS):
+    return [(i, min(chunk_runs, runs - start)) for i, start in enumerate(range(0, runs, chunk_runs))]
+
+def run_parallel(runs, seed=0, workers=None, chunk_runs=CHUNK_RUNS, skill=None,
+                 max_rounds=1000, progress=None, strategy="hit17"):
+    # returns the RunResults of every run, in chunk order
+    # progress(pid, worker_runs, done_runs, total_runs) is called as chunks finish
+    chunks = make_chunks(runs, chunk_runs)
+    done = {}
+    per_worker = {}
+
+    def collect(i, pid, results):
+        done[i] = results
+        per_worker[pid] = per_worker.get(pid, 0) + len(results)
+        if progress:
+            progress(pid, per_worker[pid], sum(len(r) for r in done.values()), runs)
+
+    if workers == 1:
+        for i, n in chunks:
+            collect(*play_chunk(seed, i, n, skill, max_rounds, strategy))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(play_chunk, seed, i, n, skill, max_rounds, strategy) for i, n in chunks]
+            for fut in as_completed(futures):
+                collect(*fut.result())
+
+    merged = []
+    for i in sorted(done):
+        merged.extend(done[i])
+    return merged
+
+
+def summarize(results):
+    n = len(results)
+    if not n:
+        return {"runs": 0}
+    rounds = [r.rounds for r in results]
+    out = {
+        "runs": n,
+        "total_rounds": sum(rounds),
+        "avg_rounds": sum(rounds) / n,
+        "median_rounds": statistics.median(rounds),
+        "avg_final_balance": sum(r.final_balance for r in results) / n,
+        "avg_peak_balance": sum(r.peak_balance for r in results) / n,
+        "cleared_rate": sum(r.cleared for r in results) / n,
+    }
+    for level in sorted(engine.LEVELS):
+        out[f"reached_level_{level}"] = sum(r.max_level >= level for r in results) / n
+    return out
+
+def print_progress(pid, worker_runs, done_runs, total_runs):
+    print(f"  worker {pid}: {worker_runs:,} runs  (total {done_runs:,}/{total_runs:,})", file=sys.stderr)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulate whole LuckyLoop+ games on every core")
+    ap.add_argument("--runs", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    ap.add_argument("--chunk-runs", type=int, default=CHUNK_RUNS)
+    ap.add_argument("--skill", default=None, choices=sorted(engine.SKILLS))
+    ap.add_argument("--max-rounds", type=int, default=1000)
+    ap.add_argument("--strategy", default="hit17",
+                    help=f"one of {', '.join(strategies.STRATEGIES)}, or module:attribute")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args()
+    try:
+        strategies.load(args.strategy)
+    except (ValueError, ImportError, AttributeError) as e:
+        ap.error(str(e))
+
+    t0 = time.perf_counter()
+    results = run_parallel(args.runs, args.seed, args.workers, args.chunk_runs, args.skill,
+                           args.max_rounds, progress=None if args.quiet else print_progress,
+                           strategy=args.strategy)
+    dt = time.perf_counter() - t0
+
+    s = summarize(results)
+    print(f"Runs: {s['runs']:,} ({s['total_rounds']:,} rounds) in {dt:.2f}s "
+          f"({s['total_rounds']/dt:,.0f} rounds/s)")
+    for k, v in s.items():
+        if k not in ("runs", "total_rounds"):
+            print(f"  {k}: {v:.4f}" if isinstance(v, float) else f"  {k}: {v}")
+
+if __name__ == "__main__":
+    main()
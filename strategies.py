@@ -0,0 +1,116 @@
+# LuckyLoop+ strategies
+# A strategy makes every choice the player makes: hit, stand or double for each hand
+# (decide), the bet before each round (bet; None keeps the current one, other amounts
+# are reached with the +/- steps the buttons use) and the skill at every skill screen
+# (choose_skill; None is Esc). Calling a strategy calls decide, so one can be passed
+# anywhere the engine takes a decide callback.
+#
+# Strategies are named by a string so they can be sent to worker processes: a name
+# from STRATEGIES, or "module:attribute" for one defined elsewhere (a Strategy
+# subclass or instance, or a plain decide(state) function).
+
+import importlib
+
+import engine
+import strategy_tables
+
+
+class Strategy:
+    # the defaults: hit under 17, keep the bet, no skill
+    name = None
+
+    def decide(self, state):
+        return engine.hit_under_17(state)
+
+    def bet(self, state):
+        return None
+
+    def choose_skill(self, state):
+        return None
+
+    def __call__(self, state):
+        return self.decide(state)
+
+    def play_run(self, state, max_rounds=1000):
+        return engine.play_run(state, self.decide, self.choose_skill, max_rounds, self.bet)
+
+
+class HitUnder17(Strategy):
+    # the old N-key autoplay
+    name = "hit17"
+
+class Tables(Strategy):
+    # the precomputed best move for the level and encounter (today's N-key autoplay)
+    name = "tables"
+
+    def decide(self, state):
+        return strategy_tables.decide(state)
+
+class NeverBust(Strategy):
+    # stand on any hard 12 or more, hit soft totals under 18
+    name = "never-bust"
+
+    def decide(self, state):
+        total, soft = engine.hand_total(state.player_cards)
+        if soft:
+            return "hit" if total < 18 else "stand"
+        return "hit" if total < 12 else "stand"
+
+class TablesWithSkill(Tables):
+    # the tables, always picking the same skill
+    def __init__(self, skill):
+        self.skill = skill
+        self.name = f"tables+{skill}"
+
+    def choose_skill(self, state):
+        return self.skill
+
+class Press(Tables):
+    # the tables, betting a quarter of the balance (never below the level's base bet)
+    name = "tables-press"
+
+    def bet(self, state):
+        return max(engine.BASE_BETS.get(state.level, 15), state.balance // 4)
+
+class ReachGoal(Tables):
+    # the tables, betting what one win needs to reach the level's goal
+    name = "tables-goal"
+
+    def bet(self, state):
+        need = engine.LEVELS[state.level]["threshold"] - state.balance
+        return max(engine.BASE_BETS.get(state.level, 15), need)
+
+class DecideOnly(Strategy):
+    # wraps a plain decide(state) function
+    def __init__(self, decide, name):
+        self.decide = decide
+        self.name = name
+
+
+# name -> factory
+STRATEGIES = {
+    "hit17": HitUnder17,
+    "tables": Tables,
+    "never-bust": NeverBust,
+    "tables-press": Press,
+    "tables-goal": ReachGoal,
+    **{f"tables+{skill}": (lambda skill=skill: TablesWithSkill(skill)) for skill in engine.SKILLS},
+}
+
+def load(spec):
+    # a Strategy for a name from STRATEGIES or a "module:attribute" reference
+    if spec in STRATEGIES:
+        return STRATEGIES[spec]()
+    if ":" not in spec:
+        raise ValueError(f"unknown strategy {spec!r} (known: {', '.join(STRATEGIES)}, or module:attribute)")
+    module, attr = spec.split(":", 1)
+    obj = getattr(importlib.import_module(module), attr)
+    if isinstance(obj, type):
+        obj = obj()
+    if all(hasattr(obj, m) for m in ("decide", "bet", "choose_skill")):
+        if not getattr(obj, "name", None):
+            obj.name = spec
+        return obj
+    if callable(obj):
+        return DecideOnly(obj, spec)
+    raise ValueError(f"{spec} is not a strategy or a decide function")
@@ -0,0 +1,221 @@
+# LuckyLoop+ strategy tables
+# Hit / stand / double decisions for every (player total, soft or hard, dealer upcard)
+# under each LEVELS entry, each ENCOUNTERS modifier and each skill that multiplies the
+# rewards (Reward Booster), computed from the exact
+# dealer odds in dealer_odds.py. The tables are written once to strategy_tables.bin
+# and only rebuilt when the rule config they were built from changes; lookups are
+# a single byte index.
+#
+# The EVs follow the game's own rules: a double takes the extra stake from the
+# balance up front and it is not paid back, so a doubled win nets +1 bet and a
+# doubled push costs 1 bet. The reward multiplier (High Stakes, Reward Booster) scales
+# what a hand settles for, but not that stake, so it moves the doubling choices.
+#
+#   python strategy_tables.py --show --level 2 --encounter "Dealer Mistake"
+
+import argparse
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+from engine import (
+    LEVELS, ENCOUNTERS, SKILLS, CLASS_VALUES, DECK_CLASS_COUNTS,
+    DEALER_STANDS_EARLY_AT, DEALER_SOFT_12_STANDS_AT, hand_total, card_class, reward_multiplier
+)
+import dealer_odds
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "strategy_tables.bin")
+MAGIC = b"LLST2"
+
+STAND, HIT, DOUBLE = 0, 1, 2
+ACTIONS = ("stand", "hit", "double")
+
+LEVEL_KEYS = sorted(LEVELS)
+ENCOUNTER_SLOTS = [None] + ENCOUNTERS  # slot 0 = no encounter
+SKILL_SLOTS = [None] + sorted(name for name, sk in SKILLS.items() if sk["type"] == "reward_mult")
+TOTALS = 22                            # player totals 0-21
+UPCARDS = 10                           # dealer upcard card classes
+RULES_SIZE = 2 * 2 * TOTALS * UPCARDS  # (can double, soft, total, upcard) per level/skill/encounter
+
+
+def rules_key():
+    # fingerprint of the rules the tables are built from; balance values such as the
+    # level goals are left out, so tuning them doesn't rebuild the tables
+    conf = {
+        "levels": {level: [LEVELS[level][k] for k in ("decks", "dealer_hits_soft_17", "blackjack_payout")]
+                   for level in LEVEL_KEYS},
+        "encounters": [[e["name"], e["effect"]] for e in ENCOUNTERS],
+        "reward_skills": [[name, SKILLS[name]["value"]] for name in SKILL_SLOTS[1:]],
+        "class_values": CLASS_VALUES, "deck_counts": DECK_CLASS_COUNTS,
+        "dealer_stops": [DEALER_STANDS_EARLY_AT, DEALER_SOFT_12_STANDS_AT],
+    }
+    return hashlib.sha256(json.dumps(conf, sort_keys=True).encode()).digest()[:16]
+
+def encounter_slot(encounter):
+    if not encounter:
+        return 0
+    for i, e in enumerate(ENCOUNTERS):
+        if e["name"] == encounter["name"]:
+            return i + 1
+    return 0
+
+def skill_slot(skill):
+    # skills that don't change the rewards share slot 0 with no skill
+    return SKILL_SLOTS.index(skill) if skill in SKILL_SLOTS else 0
+
+def table_index(level, slot, can_double, soft, total, upcard, skill=0):
+    rules = (LEVEL_KEYS.index(level) * len(SKILL_SLOTS) + skill) * len(ENCOUNTER_SLOTS) + slot
+    return rules * RULES_SIZE + ((int(can_double) * 2 + int(soft)) * TOTALS + total) * UPCARDS + upcard
+
+
+# Table generation
+
+def _add(total, soft, cls):
+    total += CLASS_VALUES[cls]
+    soft += cls == 0
+    while total > 21 and soft:
+        total -= 10; soft -= 1
+    return total, soft
+
+def _build_rules(level, encounter, skill=None):
+    # decisions for one level/skill/encounter, laid out like table_index with rules = 0
+    mult = reward_multiplier(skill, encounter)
+    decks = LEVELS[level]["decks"]
+    if encounter and encounter["effect"].get("decks_delta"):
+        decks = max(1, decks + encounter["effect"]["decks_delta"])
+    policy = dealer_odds.policy_for(level, encounter)
+    shoe = dealer_odds.full_shoe(decks)
+    out = bytearray(RULES_SIZE)
+
+    for up in range(UPCARDS):
+        counts = dealer_odds.remove_card(shoe, up)
+        dealer = dealer_odds.dealer_outcomes(counts, up, policy)
+        n = sum(counts)
+        draws = [(cls, c / n) for cls, c in enumerate(counts) if c]
+
+        @lru_cache(maxsize=None)
+        def stand_ev(t):
+            if t > 21:
+                return -1.0
+            ev = 0.0
+            for k, p in dealer.items():
+                if k == dealer_odds.BLACKJACK:
+                    ev -= p
+                elif k == dealer_odds.BUST or t > k:
+                    ev += p
+                elif t < k:
+                    ev -= p
+            return ev
+
+        @lru_cache(maxsize=None)
+        def best_ev(t, s):
+            # no double after the first decision in this recursion
+            if t >= 21:
+                return stand_ev(t)
+            return max(stand_ev(t), hit_ev(t, s))
+
+        @lru_cache(maxsize=None)
+        def hit_ev(t, s):
+            ev = 0.0
+            for cls, p in draws:
+                t2, s2 = _add(t, s, cls)
+                ev += p * (-1.0 if t2 > 21 else best_ev(t2, s2))
+            return ev
+
+        def double_ev(t, s):
+            # the extra stake is gone either way; only the settled hand is multiplied
+            one_card = sum(p * stand_ev(_add(t, s, cls)[0]) for cls, p in draws)
+            return -1.0 + 2.0 * mult * one_card
+
+        for soft in (0, 1):
+            for t in range(TOTALS):
+                s = soft if t >= 12 else 0  # a soft total under 12 can't happen
+                if t >= 21:
+                    evs = {STAND: mult * stand_ev(t)}
+                else:
+                    evs = {STAND: mult * stand_ev(t), HIT: mult * hit_ev(t, s)}
+                for can_double in (0, 1):
+                    options = dict(evs)
+                    if can_double and t < 21:
+                        options[DOUBLE] = double_ev(t, s)
+                    best = max(options, key=options.get)
+                    out[((can_double * 2 + soft) * TOTALS + t) * UPCARDS + up] = best
+    return bytes(out)
+
+def build_tables():
+    return b"".join(_build_rules(level, enc, skill)
+                    for level in LEVEL_KEYS for skill in SKILL_SLOTS for enc in ENCOUNTER_SLOTS)
+
+def save_tables(table, path=TABLE_FILE):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + rules_key() + table)
+    os.replace(tmp, path)
+
+
+# Loading
+
+_TABLE = None
+
+def load_tables(path=TABLE_FILE, rebuild=False):
+    # read the tables from disk, rebuilding them if missing or built for other rules
+    global _TABLE
+    if _TABLE is not None and not rebuild:
+        return _TABLE
+    header = MAGIC + rules_key()
+    table = None
+    if not rebuild and os.path.exists(path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data.startswith(header) and len(data) == len(header) + RULES_SIZE * len(LEVEL_KEYS) * len(SKILL_SLOTS) * len(ENCOUNTER_SLOTS):
+            table = data[len(header):]
+    if table is None:
+        table = build_tables()
+        try:
+            save_tables(table, path)
+        except OSError:
+            pass  # read-only install: keep the tables in memory
+    _TABLE = table
+    return table
+
+def lookup(level, encounter, total, soft, upcard, can_double=True, skill=None):
+    t = load_tables()
+    return ACTIONS[t[table_index(level, encounter_slot(encounter), can_double, soft > 0, min(total, 21), upcard,
+                                 skill_slot(skill))]]
+
+def decide(state):
+    # engine decide() callback: "hit", "stand" or "double" for the current hand
+    total, soft = hand_total(state.player_cards)
+    if total > 21:
+        return "stand"
+    upcard = card_class(state.dealer_cards[1])  # the first dealer card is dealt face down
+    return lookup(state.level, state.encounter, total, soft, upcard,
+                  can_double=state.balance >= state.current_bet, skill=state.player_skill)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or print the LuckyLoop+ strategy tables")
+    ap.add_argument("--rebuild", action="store_true", help="rebuild even if the tables are current")
+    ap.add_argument("--show", action="store_true", help="print the chart for one level/encounter")
+    ap.add_argument("--level", type=int, default=1, choices=LEVEL_KEYS)
+    ap.add_argument("--encounter", default=None, choices=[e["name"] for e in ENCOUNTERS])
+    ap.add_argument("--skill", default=None, choices=SKILL_SLOTS[1:], help="chart with this reward skill")
+    ap.add_argument("--no-double", action="store_true", help="chart for when the balance can't cover a double")
+    args = ap.parse_args()
+
+    load_tables(rebuild=args.rebuild)
+    print(f"Tables: {TABLE_FILE}")
+    if not args.show:
+        return
+    enc = next((e for e in ENCOUNTERS if e["name"] == args.encounter), None)
+    letters = {"stand": "S", "hit": "H", "double": "D"}
+    print(f"Level {args.level}, {args.encounter or 'no encounter'}" + (f", {args.skill}" if args.skill else ""))
+    print("       " + " ".join(f"{n:>2}" for n in dealer_odds.CLASS_NAMES))
+    for soft, lo in ((0, 4), (1, 12)):
+        for t in range(lo, 22):
+            row = [letters[lookup(args.level, enc, t, soft, up, not args.no_double, args.skill)] for up in range(UPCARDS)]
+            print(f"{'soft' if soft else 'hard'} {t:>2} " + " ".join(f"{a:>2}" for a in row))
+
+if __name__ == "__main__":
+    main()
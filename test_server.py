@@ -0,0 +1,96 @@
+# LuckyLoop+ game server protocol tests
+# The round flow the server enforces: moves the game's screens wouldn't allow are
+# turned down, and turned-down moves leave the game (and its recording) untouched.
+#
+#   python -m pytest test_server.py
+
+import pytest
+
+import engine
+from server import GameServer, RequestError
+
+
+def new_session(server, seed=7):
+    return server.handle({"op": "new", "seed": seed})["session"]
+
+def act(server, sid, action, **fields):
+    return server.handle(dict(fields, op="act", session=sid, action=action))
+
+def game_over(server, sid):
+    # bet the whole balance until it's gone
+    act(server, sid, "skill", skill=None)
+    table = server.tables[sid]
+    while not table.state.game_over:
+        if not table.state.in_round:
+            table.state.current_bet = table.state.balance
+            act(server, sid, "deal")
+        if table.state.in_round:
+            act(server, sid, "stand")
+        if server.tables[sid].skill_screens:
+            act(server, sid, "skill", skill=None)
+    return table
+
+
+def test_deal_rejected_while_in_round():
+    server = GameServer()
+    sid = new_session(server)
+    act(server, sid, "skill", skill=None)
+    state = act(server, sid, "deal")["state"]
+    assert state["in_round"]
+    with pytest.raises(RequestError):
+        act(server, sid, "deal")
+    again = server.handle({"op": "state", "session": sid})["state"]
+    assert again["round"] == state["round"] and again["balance"] == state["balance"]
+    act(server, sid, "stand")
+    assert act(server, sid, "deal")["state"]["round"] == state["round"] + 1
+
+def test_skill_only_on_a_skill_screen():
+    server = GameServer()
+    sid = new_session(server)
+    act(server, sid, "skill", skill="Card Peek")
+    with pytest.raises(RequestError):
+        act(server, sid, "skill", skill="Card Peek")
+    act(server, sid, "deal")
+    with pytest.raises(RequestError):
+        act(server, sid, "skill", skill="Card Peek")
+
+def test_level_up_opens_a_skill_screen():
+    server = GameServer()
+    sid = new_session(server)
+    act(server, sid, "skill", skill=None)
+    state = server.tables[sid].state
+    state.balance = engine.LEVELS[1]["threshold"]
+    state.level_round_no = state.max_rounds_per_level
+    steps = act(server, sid, "deal")["steps"]
+    assert ["check_level_rounds", engine.LEVEL_UP] in steps
+    act(server, sid, "skill", skill="Luck Charm")
+    with pytest.raises(RequestError):
+        act(server, sid, "skill", skill="Luck Charm")
+
+def test_restart_only_after_game_over():
+    server = GameServer()
+    sid = new_session(server)
+    with pytest.raises(RequestError):
+        act(server, sid, "restart")
+    game_over(server, sid)
+    state = act(server, sid, "restart")["state"]
+    assert not state["game_over"]
+    act(server, sid, "skill", skill=None)
+
+def test_reset_any_time_opens_a_skill_screen():
+    server = GameServer()
+    sid = new_session(server)
+    act(server, sid, "skill", skill=None)
+    act(server, sid, "deal")
+    act(server, sid, "reset")
+    act(server, sid, "skill", skill="Safety Net")
+
+def test_rejected_moves_are_not_recorded(tmp_path):
+    server = GameServer(record=str(tmp_path))
+    sid = new_session(server)
+    act(server, sid, "skill", skill=None)
+    act(server, sid, "deal")
+    for action in ("deal", "skill", "restart"):
+        with pytest.raises(RequestError):
+            act(server, sid, action)
+    assert server.tables[sid].recorder.actions == ["_", "D"]
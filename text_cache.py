@@ -0,0 +1,54 @@
+# LuckyLoop+ text cache
+# Rendered text surfaces and word-wrapped layouts, kept in a bounded LRU cache keyed
+# by (font, text, color, width) so the same strings aren't rasterized every frame.
+# Fonts are keyed by object identity, which is fine since the game creates them once.
+
+import textwrap
+from collections import OrderedDict
+
+
+class TextCache:
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key, make):
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+        self.misses += 1
+        item = self._items[key] = make()
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+            self.evictions += 1
+        return item
+
+    def render(self, font, text, color=(255,255,255)):
+        # the surface is shared, so callers must not draw onto it
+        return self._get((font, text, tuple(color), None), lambda: font.render(text, True, color))
+
+    def wrapped(self, font, text, color=(255,255,255), width=30):
+        # one surface per line of text wrapped at width characters
+        return self._get((font, text, tuple(color), width),
+                         lambda: tuple(font.render(ln, True, color) for ln in textwrap.wrap(text, width)))
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self._items), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+# shared by every screen
+text_cache = TextCache()
+
+def render_text(font, text, color=(255,255,255)):
+    return text_cache.render(font, text, color)
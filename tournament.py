@@ -0,0 +1,243 @@
+# LuckyLoop+ strategy tournament
+# Plays several strategies on the same cards and encounters (common random numbers):
+# trial i gives every strategy a GameState with an identically seeded random.Random,
+# so the shoe shuffles, encounter rolls and dealer coin flips are the same for all of
+# them. The dealer's hits come off the back of the shoe (PairedShoe), so a player
+# hitting one card more than another doesn't shift the cards the dealer gets.
+# Strategies are compared on these paired trials, whose differences vary far less
+# than those of independent runs; the report shows the variance reduction each
+# comparison got, i.e. how many times more independent trials it would have taken.
+#
+# "hands" plays one round at a level from a fresh shoe (the play decisions only) and
+# pairs very well; "runs" plays whole games (every hand, bet and skill pick counts),
+# which drift apart once balances and levels differ, so they pair less well. Trials
+# are split into chunks played on a process pool, every chunk plays all the
+# strategies, and the results only depend on --seed.
+#
+#   python tournament.py hit17 tables never-bust --trials 20000
+#   python tournament.py hit17 tables --mode hands --level 2 --trials 500000
+
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+import strategies
+from engine import CARDS
+from running_stats import Moments
+
+METRICS = {
+    "runs": ("final_balance", "rounds", "max_level", "cleared"),
+    "hands": ("reward", "win"),
+}
+CHUNK_TRIALS = {"runs": 500, "hands": 10_000}
+
+
+class PairedShoe(engine.Shoe):
+    # deals and player hits from the front, dealer hits from the back. The cards not yet
+    # seen are in random order whichever end they're taken from, so the game plays
+    # exactly as with a normal shoe
+    def reset(self):
+        super().reset()
+        self.end = len(self.codes)
+
+    def start_round(self):
+        if self.pos + len(self.codes) - self.end >= self.penetration * len(self.codes):
+            self.reset()
+
+    def draw(self):
+        if self.pos >= self.end:
+            self.reset()
+        code = self.codes[self.pos]
+        self.pos += 1
+        return CARDS[code]
+
+    def draw_dealer(self):
+        if self.pos >= self.end:
+            self.reset()
+        self.end -= 1
+        return CARDS[self.codes[self.end]]
+
+    def remaining(self):
+        return self.end - self.pos
+
+    def class_counts(self):
+        counts = [0] * 10
+        for code in self.codes[self.pos:self.end]:
+            counts[min(code // 4, 9)] += 1
+        return tuple(counts)
+
+class PairedState(engine.GameState):
+    shoe_class = PairedShoe
+
+
+def start_state(seed, trial, level=1):
+    # trial's game at level, with the balance a player arrives there with
+    state = PairedState(rng=random.Random(f"luckyloop-crn-{seed}-{trial}"))
+    if level > 1:
+        state.balance = engine.LEVELS[level - 1]["threshold"]
+        state.start_level(level)
+    return state
+
+def fork(state, seed):
+    # a copy with the same cards to come and a random stream seeded with seed, so
+    # every strategy in a trial starts from one shuffle instead of shuffling again
+    s = copy.copy(state)
+    s.rng = random.Random(seed)
+    s.shoe = copy.copy(state.shoe)
+    s.shoe.codes = bytearray(state.shoe.codes)
+    s.shoe.rng = s.rng
+    return s
+
+def play_run(strategy, state, max_rounds=1000):
+    r = strategy.play_run(state, max_rounds)
+    return r.final_balance, r.rounds, r.max_level, float(r.cleared)
+
+def play_hand(strategy, state, max_rounds=None):
+    engine.choose_skill(state, strategy.choose_skill(state))
+    amount = strategy.bet(state)
+    if amount is not None:
+        engine.bet_towards(state, amount)
+    res = engine.play_round(state, strategy.decide)
+    return res.reward, float(res.result == "win")
+
+PLAY = {"runs": play_run, "hands": play_hand}
+
+
+class Standings:
+    # per strategy and metric: Moments of the results; per pair (i, j) and metric:
+    # Moments of the paired differences (j - i)
+    def __init__(self, n_strategies, metrics):
+        self.metrics = metrics
+        self.single = [[Moments() for _ in metrics] for _ in range(n_strategies)]
+        self.pairs = {(i, j): [Moments() for _ in metrics]
+                      for i in range(n_strategies) for j in range(i + 1, n_strategies)}
+
+    def add(self, results):
+        # results: one tuple of metric values per strategy, from the same trial
+        for s, values in enumerate(results):
+            for m, v in zip(self.single[s], values):
+                m.add(v)
+        for (i, j), moments in self.pairs.items():
+            for m, a, b in zip(moments, results[i], results[j]):
+                m.add(b - a)
+
+    def merge(self, other):
+        for mine, theirs in zip(self.single, other.single):
+            for a, b in zip(mine, theirs):
+                a.merge(b)
+        for key, moments in self.pairs.items():
+            for a, b in zip(moments, other.pairs[key]):
+                a.merge(b)
+
+    def comparison(self, i, j, metric):
+        # difference of j over i, with its CI and the variance reduction from pairing
+        m = self.metrics.index(metric)
+        d = self.pairs[(i, j)][m]
+        a, b = self.single[i][m], self.single[j][m]
+        independent = a.variance + b.variance
+        return {
+            "diff": d.mean,
+            "ci95": d.ci(0.95),
+            "z": d.mean / d.stderr if d.stderr else 0.0,
+            # None when the two never differed
+            "variance_reduction": independent / d.variance if d.variance else None,
+        }
+
+
+def play_chunk(specs, mode, seed, first, n, level=1, max_rounds=1000):
+    players = [strategies.load(spec) for spec in specs]
+    play = PLAY[mode]
+    standings = Standings(len(players), METRICS[mode])
+    for trial in range(first, first + n):
+        start = start_state(seed, trial, level)
+        stream = start.rng.getrandbits(64)
+        standings.add([play(p, fork(start, stream), max_rounds) for p in players])
+    return first, standings
+
+def run_tournament(specs, mode="runs", trials=10_000, seed=0, workers=None, level=1, max_rounds=1000,
+                   chunk_trials=None):
+    chunk = chunk_trials or CHUNK_TRIALS[mode]
+    chunks = [(first, min(chunk, trials - first)) for first in range(0, trials, chunk)]
+    if workers == 1:
+        parts = [play_chunk(specs, mode, seed, first, n, level, max_rounds) for first, n in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(play_chunk, specs, mode, seed, first, n, level, max_rounds)
+                       for first, n in chunks]
+            parts = [f.result() for f in futures]
+    # merged in trial order, so the numbers don't depend on the number of workers
+    total = Standings(len(specs), METRICS[mode])
+    for _, part in sorted(parts, key=lambda p: p[0]):
+        total.merge(part)
+    return total
+
+
+def report(specs, standings, metric):
+    names = [strategies.load(s).name or s for s in specs]
+    out = {"strategies": {}, "versus": {}}
+    for name, moments in zip(names, standings.single):
+        out["strategies"][name] = {m: moments[k].as_dict() for k, m in enumerate(standings.metrics)}
+    for j in range(1, len(specs)):
+        out["versus"][names[j]] = {m: standings.comparison(0, j, m) for m in standings.metrics}
+    return names, out
+
+def print_report(names, out, metric, trials, seconds):
+    print(f"{trials:,} trials per strategy in {seconds:.2f}s")
+    print(f"  {'strategy':<24} {metric:>14} {'+-95%':>10}")
+    for name in names:
+        m = out["strategies"][name][metric]
+        print(f"  {name:<24} {m['mean']:>14.3f} {1.96*m['stderr']:>10.3f}")
+    if len(names) < 2:
+        return
+    print(f"\n  versus {names[0]} (paired on the same cards):")
+    print(f"  {'strategy':<24} {'difference':>12} {'+-95%':>10} {'z':>7} {'var. reduction':>15}")
+    for name in names[1:]:
+        c = out["versus"][name][metric]
+        flag = "  significant" if abs(c["z"]) > 1.96 else ""
+        vr = c["variance_reduction"]
+        vr = f"{vr:>14.1f}x" if vr is not None else f"{'identical':>15}"
+        print(f"  {name:<24} {c['diff']:>+12.3f} {c['ci95']:>10.3f} {c['z']:>7.2f} {vr}{flag}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare LuckyLoop+ strategies on common random numbers")
+    ap.add_argument("strategies", nargs="+",
+                    help=f"the first one is the baseline; any of {', '.join(strategies.STRATEGIES)}, "
+                         "or module:attribute")
+    ap.add_argument("--mode", choices=sorted(METRICS), default="runs")
+    ap.add_argument("--trials", type=int, default=10_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    ap.add_argument("--level", type=int, default=1, choices=sorted(engine.LEVELS), help="level to start at")
+    ap.add_argument("--max-rounds", type=int, default=1000, help="runs mode")
+    ap.add_argument("--metric", help="what to rank on (default: final_balance, or reward for hands)")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    for spec in args.strategies:
+        try:
+            strategies.load(spec)
+        except (ValueError, ImportError, AttributeError) as e:
+            ap.error(str(e))
+    metric = args.metric or METRICS[args.mode][0]
+    if metric not in METRICS[args.mode]:
+        ap.error(f"--metric for {args.mode} is one of {', '.join(METRICS[args.mode])}")
+
+    t0 = time.perf_counter()
+    standings = run_tournament(args.strategies, args.mode, args.trials, args.seed, args.workers,
+                               args.level, args.max_rounds)
+    dt = time.perf_counter() - t0
+    names, out = report(args.strategies, standings, metric)
+    if args.json:
+        json.dump(out, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(names, out, metric, args.trials, dt)
+
+if __name__ == "__main__":
+    main()
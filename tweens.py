@@ -0,0 +1,107 @@
+# LuckyLoop+ animation scheduler
+# Time-based tweens and callbacks run in order, advanced once per frame by the main
+# loop instead of in their own blocking loops, so events keep being handled while
+# cards move. A long queue plays faster, a frame that overruns the budget finishes
+# the tween in progress, and finish() plays everything out at once (click to skip).
+
+from collections import deque
+
+
+class Tween:
+    # a straight move from start to end over duration seconds
+    __slots__ = ("start", "end", "duration", "elapsed", "image", "on_start", "on_done", "started")
+
+    def __init__(self, start, end, duration, image=None, on_start=None, on_done=None):
+        self.start = start
+        self.end = end
+        self.duration = max(duration, 1e-6)
+        self.elapsed = 0.0
+        self.image = image
+        self.on_start = on_start
+        self.on_done = on_done
+        self.started = False
+
+    @property
+    def pos(self):
+        t = min(1.0, self.elapsed / self.duration)
+        return (int(self.start[0] + (self.end[0] - self.start[0]) * t),
+                int(self.start[1] + (self.end[1] - self.start[1]) * t))
+
+
+class Animator:
+    def __init__(self, max_step=0.1, compress_after=6, compress_rate=0.25):
+        # max_step: a frame longer than this (seconds) skips the current tween
+        # compress_after / compress_rate: with more tweens than this waiting, play
+        # 1 + compress_rate x the extra ones times faster
+        self.queue = deque()
+        self.max_step = max_step
+        self.compress_after = compress_after
+        self.compress_rate = compress_rate
+        self.skipped = 0
+
+    @property
+    def busy(self):
+        return bool(self.queue)
+
+    @property
+    def current(self):
+        # the tween on screen right now, if any
+        if self.queue and isinstance(self.queue[0], Tween) and self.queue[0].started:
+            return self.queue[0]
+        return None
+
+    def add(self, tween):
+        self.queue.append(tween)
+        return tween
+
+    def call(self, fn):
+        # run fn once everything queued before it has played
+        self.queue.append(fn)
+
+    def _begin(self, tween):
+        tween.started = True
+        if tween.on_start:
+            tween.on_start()
+
+    def _end(self, tween):
+        self.queue.popleft()
+        tween.elapsed = tween.duration
+        if tween.on_done:
+            tween.on_done()
+
+    def update(self, dt):
+        over_budget = dt > self.max_step
+        waiting = sum(isinstance(s, Tween) for s in self.queue)
+        speed = 1.0 + max(0, waiting - self.compress_after) * self.compress_rate
+        dt *= speed
+        while self.queue:
+            step = self.queue[0]
+            if not isinstance(step, Tween):
+                self.queue.popleft()
+                step()
+                continue
+            if not step.started:
+                self._begin(step)
+            if over_budget:
+                self.skipped += 1
+                self._end(step)
+                over_budget = False
+                dt = 0.0
+                continue
+            step.elapsed += dt
+            if step.elapsed < step.duration:
+                break
+            dt = step.elapsed - step.duration
+            self._end(step)
+
+    def finish(self):
+        # play out every queued tween and callback now (callbacks may queue more)
+        while self.queue:
+            step = self.queue[0]
+            if isinstance(step, Tween):
+                if not step.started:
+                    self._begin(step)
+                self._end(step)
+            else:
+                self.queue.popleft()
+                step()